@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+FILL_DRIVER_STATUS_SQL = '''
+UPDATE base_member m SET driver_status = statuses.driver_status
+FROM (
+    SELECT DISTINCT ON (o.driver_id) o.driver_id, CASE o.status
+        WHEN 'in_progress' THEN 'in_progress'
+        WHEN 'pickup' THEN 'pickup'
+        WHEN 'picked_up' THEN 'picked_up'
+        WHEN 'way_back' THEN 'way_back'
+        ELSE 'assigned'
+    END AS driver_status
+    FROM tasks_order o
+    WHERE o.driver_id IS NOT NULL AND NOT o.deleted AND NOT o.is_concatenated_order
+        AND o.status IN ('in_progress', 'pickup', 'picked_up', 'way_back', 'assigned')
+    ORDER BY o.driver_id, CASE o.status
+        WHEN 'in_progress' THEN 0
+        WHEN 'pickup' THEN 1
+        WHEN 'picked_up' THEN 2
+        WHEN 'way_back' THEN 3
+        ELSE 4
+    END
+) AS statuses
+WHERE m.id = statuses.driver_id;
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0089_merge_20220802_1723'),
+        ('tasks', '0173_orderlocation_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='driver_status',
+            field=models.CharField(db_index=True, default='unassigned', editable=False, max_length=15),
+        ),
+        migrations.RunSQL(FILL_DRIVER_STATUS_SQL, migrations.RunSQL.noop),
+    ]
@@ -17,7 +17,7 @@ from model_utils import FieldTracker
 from custom_auth.models import ApplicationUser, ApplicationUserManager
 from driver.models.mixins import MemberImprovePathMixin
 from driver.push_messages.composers import ForceOfflinePushMessage
-from driver.utils import DEFAULT_DRIVER_STATUS, DRIVER_STATUSES_PARAMS, WorkStatus
+from driver.utils import DEFAULT_DRIVER_STATUS, WorkStatus
 from merchant.image_specs import ThumbnailGenerator
 from merchant.models import SkillSet
 from merchant.models.mixins import MerchantSendNotificationMixin
@@ -199,6 +199,8 @@ class Member(MerchantFieldCallControl, MemberImprovePathMixin, ResizeImageMixin,
 
     car = models.OneToOneField('Car', null=True, blank=True, on_delete=models.SET_NULL)
     work_status = models.CharField(default=WorkStatus.NOT_WORKING, choices=work_status_choices, max_length=15)
+    # Denormalised status by active orders, see `driver.queries.refresh_drivers_statuses`
+    driver_status = models.CharField(default=DEFAULT_DRIVER_STATUS, max_length=15, db_index=True, editable=False)
     has_internet_connection = models.BooleanField(default=False)
     is_offline_forced = models.BooleanField(default=False)
     last_ping = models.DateTimeField(blank=True, null=True)
@@ -275,9 +277,25 @@ class Member(MerchantFieldCallControl, MemberImprovePathMixin, ResizeImageMixin,
             if self.phone and self.current_merchant:
                 self.phone = e164_phone_format(phone=self.phone, regions=self.current_merchant.countries)
 
+        deferred_fields = self.get_deferred_fields()
+        if deferred_fields and not self._state.adding and not args and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            # Only loaded fields are saved, the same as Django does for the deferred instances, except driver status
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'driver_status' and field.attname not in deferred_fields
+            ]
+
         with MerchantFieldCallControl.allow_field_call():
             super(Member, self).save(*args, **kwargs)
 
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # Driver status is changed by orders, so it isn't overwritten by a full save of a stale instance.
+        # Member without the row is inserted with all fields, the same as by the default save.
+        if update_fields is None:
+            values = [value for value in values if value[0].name != 'driver_status']
+        return super(Member, self)._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
     @property
     def is_online(self):
         return self.work_status == WorkStatus.WORKING
@@ -340,8 +358,11 @@ class Member(MerchantFieldCallControl, MemberImprovePathMixin, ResizeImageMixin,
         return event.initiator if event and event.new_value == 'True' else None
 
     def set_last_ping(self):
+        from driver.utils.heartbeat import heartbeats
+
         old_last_ping = self.last_ping
         self.last_ping = now()
+        heartbeats.record(self.id, self.last_ping)
 
         if not self.has_internet_connection:
             old_dict = {'last_ping': old_last_ping, 'has_internet_connection': self.has_internet_connection}
@@ -361,9 +382,7 @@ class Member(MerchantFieldCallControl, MemberImprovePathMixin, ResizeImageMixin,
                 old_dict, new_dict, initiator=initiator, instance=self, sender=self,
                 track_change_event=('has_internet_connection', 'work_status', 'is_online')
             )
-
-        else:
-            Member.objects.filter(id=self.id).update(last_ping=self.last_ping)
+        # Otherwise `last_ping` is saved to database by periodic flush of heartbeats
 
     @staticmethod
     def calculate_work_status_for_manager(work_status, is_offline_forced):
@@ -427,11 +446,7 @@ class Member(MerchantFieldCallControl, MemberImprovePathMixin, ResizeImageMixin,
         _status = getattr(self, '_status', None)
         if _status is not None:
             return _status
-        else:
-            for item in DRIVER_STATUSES_PARAMS:
-                if self.order_set.filter(**item['order_attributes']).exists():
-                    return item['status']
-            return DEFAULT_DRIVER_STATUS
+        return self.driver_status
 
     @property
     def location(self):
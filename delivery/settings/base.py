@@ -264,6 +264,17 @@ TOKEN_AGE = 60 * 60 * 24 * 30  # 30 days
 APP_NAME = 'Delivery App'
 
 DRIVER_INTERNET_CONNECTION_TIMEOUT = 2 * 60
+# Location processing waits this many seconds, so only the newest of bursty driver locations is processed
+DRIVER_LOCATION_PROCESSING_DELAY = 3
+# Idle polls of customer tracking are answered by ETag, data not versioned by the order is at most this old
+CUSTOMER_TRACKING_ETAG_LIFETIME = 5 * 60
+# Server-sent events stream of customer tracking holds a sync worker, so it is closed before the gunicorn worker
+# timeout (30 seconds by default) and the browser reconnects. Pages over the streams limit poll by ETag instead.
+CUSTOMER_TRACKING_STREAM_TIMEOUT = 20
+CUSTOMER_TRACKING_STREAM_KEEPALIVE = 10
+CUSTOMER_TRACKING_MAX_STREAMS = 16
+# Long polls of the web events feed hold sync workers too, dashboards over the limit poll without waiting
+WEB_EVENTS_MAX_WAITING = 16
 
 CORS_ORIGIN_ALLOW_ALL = True
 
@@ -404,9 +415,32 @@ SMS_SERVICE_TIMEOUT = 10
 PUSH_SERVICE_TIMEOUT = 7
 EXTERNAL_JOB_EVENT_TIMEOUT = 12
 GOOGLE_API_TIMEOUT = 12
+# Limits of the pooled transport shared by Google Maps API clients of the process
+GOOGLE_API_MAX_CONCURRENT_REQUESTS = 20
+GOOGLE_API_QUERIES_PER_SECOND = 50
+GOOGLE_API_BASE_URL = None
+# Limits of concurrent geocoding of addresses of the bulk uploads
+GEOCODING_MAX_CONCURRENT_REQUESTS = 10
+GEOCODING_QUERIES_PER_SECOND = 25
 
 # After webhook url fails this amount of times in a row, notification will be sent.
 WEBHOOK_FAIL_LIMIT = 500
+# Delivery of webhooks to merchant endpoints
+WEBHOOK_MAX_CONCURRENT_REQUESTS = 10
+WEBHOOK_MAX_RETRIES = 5
+WEBHOOK_RETRY_BASE_DELAY = 30
+WEBHOOK_RETRY_MAX_DELAY = 30 * 60
+# Endpoint is paused for WEBHOOK_CIRCUIT_OPEN_TIMEOUT seconds after this amount of failures in a row
+WEBHOOK_CIRCUIT_FAILURES_THRESHOLD = 10
+WEBHOOK_CIRCUIT_OPEN_TIMEOUT = 5 * 60
+# Events of webhook deliveries are buffered and saved in bulk with this delay in seconds
+WEBHOOK_EVENTS_FLUSH_DELAY = 5
+# Share of successful requests by merchant API keys saved as events, failed requests are always saved
+MERCHANT_API_KEY_USAGE_SAMPLE_RATE = 1.0
+# Count requests of each API key per hour
+MERCHANT_API_KEY_USAGE_ROLLUP = True
+# Usage events are deleted after this amount of days, None keeps them forever
+MERCHANT_API_KEY_EVENTS_RETENTION_DAYS = 180
 
 PUSH_NOTIFICATIONS_SETTINGS = {
     "GCM_ERROR_TIMEOUT": PUSH_SERVICE_TIMEOUT,
@@ -46,6 +46,7 @@ if CELERY_BROKER_URL.startswith('rediss://') or CELERY_RESULT_BACKEND.startswith
 TASK_ROUTES_SETTINGS = {
     CELERY_TASK_PRIORITY_QUEUE: [
         'driver.celery_tasks.process_new_location',
+        'driver.celery_tasks.process_latest_location',
         'notification.celery_tasks.send_device_notification',
         'notification.celery_tasks.send_template_notification',
         'uptime_bot.celery_tasks.send_pong_to_uptimebot'
@@ -4,7 +4,7 @@ from django.utils import timezone
 
 from rest_framework import serializers
 
-from driver.celery_tasks import process_new_location
+from driver.celery_tasks import schedule_location_processing
 from driver.models import DriverLocation
 from radaro_utils.serializers.fields import UTCTimestampField
 from radaro_utils.serializers.validators import ValidateEarlierThanNowConfigurable, ValidateLaterDoesNotExist
@@ -18,7 +18,7 @@ class DriverLocationListSerializer(serializers.ListSerializer):
                      sorted(validated_data, key=itemgetter('timestamp'))]
         ValidateLaterDoesNotExist(DriverLocation.objects.filter(member_id=user), 'timestamp')(locations[0].timestamp)
         coordinates = DriverLocation.objects.bulk_create(locations)
-        process_new_location.delay(user, coordinates[-1].id)
+        schedule_location_processing(user, coordinates[-1].id)
         return coordinates
 
 
@@ -38,7 +38,7 @@ class DriverLocationSerializer(LocationSerializer, serializers.ModelSerializer):
         # Outside of .validate() to prevent checking when validating list
         ValidateLaterDoesNotExist(DriverLocation.objects.filter(member_id=user), 'timestamp')(validated_data['timestamp'])
         coordinate = DriverLocation.objects.create(member_id=user, **validated_data)
-        process_new_location.delay(user, coordinate.id)
+        schedule_location_processing(user, coordinate.id)
         return coordinate
 
 
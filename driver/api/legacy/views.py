@@ -22,6 +22,7 @@ from custom_auth.api.legacy.api import RetrieveSelfMixin
 from custom_auth.permissions import IsSelfOrManagerOnly, IsSelfOrManagerOrObserver, UserIsAuthenticated
 from driver.models import DriverLocation
 from driver.permissions import DriverIsOwnerOrReadOnly
+from driver.queries import refresh_drivers_statuses
 from driver.utils import DRIVER_STATUSES, WorkStatus
 from merchant.api.legacy.serializers import HubSerializer, HubSerializerV2
 from merchant.api.legacy.serializers.skill_sets import RelatedSkillSetSerializer, SkillSetSerializer
@@ -33,6 +34,7 @@ from reporting.signals import send_create_event_signal
 from tasks.api.legacy.serializers import OrderSerializer
 from tasks.mixins.order_status import OrderStatus
 from tasks.models import Order
+from tasks.utils.customer_tracking import customer_tracking
 
 from ...utils.locations import prepare_locations_from_serializer
 from .filters import DriverFilterSet
@@ -173,7 +175,10 @@ class DriverViewSet(ReadOnlyDBActionsViewSetMixin, mixins.UpdateModelMixin, Retr
                 status_code = status.HTTP_400_BAD_REQUEST
 
         if not ret:
+            driver_ids = set(Order.objects.filter(order_id__in=order_ids).values_list('driver_id', flat=True))
             Order.objects.filter(order_id__in=order_ids).update(driver=instance, status=Order.ASSIGNED)
+            refresh_drivers_statuses(driver_ids | {instance.id})
+            customer_tracking.publish_orders(Order.objects.filter(order_id__in=order_ids).values_list('id', flat=True))
             for order in Order.objects.filter(order_id__in=order_ids):
                 events = []
                 for key in _fieldnames:
@@ -4,7 +4,7 @@ from django.utils import timezone
 
 from rest_framework import serializers
 
-from driver.celery_tasks import process_new_location
+from driver.celery_tasks import schedule_location_processing
 from driver.models import DriverLocation
 from radaro_utils.serializers.fields import UTCTimestampField
 from radaro_utils.serializers.validators import ValidateEarlierThanNowConfigurable, ValidateLaterDoesNotExist
@@ -38,7 +38,7 @@ class MobileDriverLocationSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         driver_location = super().create(validated_data)
-        process_new_location.delay(validated_data['member'].id, driver_location.id)
+        schedule_location_processing(validated_data['member'].id, driver_location.id)
         return driver_location
 
 
@@ -65,6 +65,6 @@ class HistoryMobileDriverLocationSerializer(serializers.Serializer):
         driver_location = DriverLocation.objects.bulk_create(driver_location)
 
         user = self.context['request'].user.id
-        process_new_location.delay(user, driver_location[-1].id)
+        schedule_location_processing(user, driver_location[-1].id)
 
         return driver_location
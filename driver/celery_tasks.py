@@ -1,5 +1,6 @@
 from django.conf import settings
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.utils import timezone
 
 from celery.schedules import crontab
@@ -8,27 +9,42 @@ from celery.task import periodic_task
 from base.models import Member
 from delivery.celery import app
 from driver.models import DriverLocation
+from driver.utils.heartbeat import heartbeats
+from driver.utils.location_processing import location_processing
 from radaro_utils.helpers import use_signal_receiver
 from radaro_utils.signals import google_api_request_event
 from reporting.context_managers import track_fields_on_change
-from reporting.signals import create_event
+from reporting.signals import collect_events, create_event
+
+
+@periodic_task(run_every=crontab(minute='*/1'))
+def flush_driver_heartbeats():
+    heartbeats.flush()
 
 
 @periodic_task(run_every=crontab(minute='*/1'))
 def check_internet_connection():
     from base.models import Member
+    if heartbeats.is_empty():
+        heartbeats.seed(Member.drivers.filter(has_internet_connection=True).values_list('id', 'last_ping'))
     delta = timezone.now() - timezone.timedelta(seconds=settings.DRIVER_INTERNET_CONNECTION_TIMEOUT)
-    for member in Member.drivers.filter(has_internet_connection=True, last_ping__lt=delta):
-        old_dict = {'has_internet_connection': True}
-        new_dict = {'has_internet_connection': False}
+    stale_ids = heartbeats.get_stale(delta)
+    if not stale_ids:
+        return
+    # Drivers stay tracked if the changes are not saved, so they are checked again by the next run
+    with transaction.atomic():
+        for member in Member.drivers.filter(has_internet_connection=True, id__in=stale_ids):
+            old_dict = {'has_internet_connection': True}
+            new_dict = {'has_internet_connection': False}
 
-        member.has_internet_connection = False
-        member.save(update_fields=['has_internet_connection'])
+            member.has_internet_connection = False
+            member.save(update_fields=['has_internet_connection'])
 
-        create_event(
-            old_dict, new_dict, initiator=member, instance=member, sender=member,
-            track_change_event=('has_internet_connection',)
-        )
+            create_event(
+                old_dict, new_dict, initiator=member, instance=member, sender=member,
+                track_change_event=('has_internet_connection',)
+            )
+    heartbeats.untrack_stale(stale_ids, delta)
 
 
 @periodic_task(run_every=crontab(hour=0, minute=0, day_of_week="monday"), time_limit=10*60)
@@ -41,6 +57,8 @@ def delete_driver_locations():
 def process_new_location(driver_id, coordinate_id):
     from base.models import Member
     from tasks.models import OrderStatus
+    from tasks.utils.customer_tracking import customer_tracking
+    from tasks.utils.order_eta import ETAToOrders
 
     driver = Member.objects.get(id=driver_id)
     driver.last_location_id = coordinate_id
@@ -61,12 +79,40 @@ def process_new_location(driver_id, coordinate_id):
             update_fields.extend(['current_path', 'current_path_updated', 'expected_driver_route'])
     finally:
         driver.save(update_fields=update_fields)
+        # ETAs of the jobs are calculated from the previous location
+        ETAToOrders.invalidate(driver_id)
+        customer_tracking.publish_driver_location(driver_id)
         if google_requests_count['count'] > 0:
             DriverLocation.objects.filter(id=coordinate_id) \
                 .update(google_requests=models.F('google_requests') + google_requests_count['count'])
 
 
+LOCATION_PROCESSING_SCHEDULED_KEY = 'driver-location-processing-scheduled-{}'
+
+
+def schedule_location_processing(driver_id, coordinate_id):
+    # Only the newest location of the driver is kept for processing. Locations received between
+    # scheduling and processing are not processed separately, but they are still in the window of path builder.
+    location_processing.set_latest(driver_id, coordinate_id)
+
+    delay = settings.DRIVER_LOCATION_PROCESSING_DELAY
+    # Key expires in case the task is lost, so the next location schedules processing again
+    if cache.add(LOCATION_PROCESSING_SCHEDULED_KEY.format(driver_id), True, timeout=delay + 60):
+        process_latest_location.apply_async((driver_id,), countdown=delay)
+
+
+@app.task()
+def process_latest_location(driver_id):
+    # Locations received from now on should schedule one more processing
+    cache.delete(LOCATION_PROCESSING_SCHEDULED_KEY.format(driver_id))
+    coordinate_id = location_processing.take_for_processing(driver_id)
+    if coordinate_id is None:
+        return
+    process_new_location(driver_id, coordinate_id)
+
+
 @app.task()
+@collect_events()
 def stop_active_orders_of_driver(driver_id):
     from radaro_utils import helpers
     from tasks.models import Order
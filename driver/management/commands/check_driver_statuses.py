@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+
+from base.models import Member
+from driver.queries import find_drivers_statuses_drift, refresh_drivers_statuses
+from radaro_utils.helpers import chunks
+
+
+class Command(BaseCommand):
+    help = 'Recalculate statuses of drivers from their orders and report drivers with outdated stored status.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='save recalculated statuses')
+        parser.add_argument('--batch-size', type=int, default=1000, help='count of drivers checked at once')
+
+    def handle(self, *args, **options):
+        check = refresh_drivers_statuses if options['fix'] else find_drivers_statuses_drift
+        driver_ids = Member.all_objects.drivers().order_by('id').values_list('id', flat=True)
+        drifted = 0
+        for ids_chunk in chunks(list(driver_ids), options['batch_size']):
+            for driver_id, (stored_status, actual_status) in sorted(check(ids_chunk).items()):
+                drifted += 1
+                self.stdout.write('Driver {}: stored "{}", actual "{}"'.format(driver_id, stored_status, actual_status))
+        if options['fix']:
+            self.stdout.write('{} driver statuses fixed'.format(drifted))
+        else:
+            self.stdout.write('{} driver statuses are outdated'.format(drifted))
@@ -1,17 +1,26 @@
+import functools
 import math
 
 import googlemaps.convert
+import numpy as np
+from shapely.geometry import LineString, Point, box
+from shapely.strtree import STRtree
 
 from routing.utils import (
     bearing_is_near,
     calculate_initial_compass_bearing,
     circle_intersection,
+    consecutive_geo_distances,
     distance_between,
     latlng_dict,
+    location_to_point,
+    meters2decimal_degree,
     near_points,
     nearest_location_to_line_segment,
 )
 
+ROUTE_INDEX_CACHE_SIZE = 256
+
 
 class ExpectedPointInfo(object):
     def __init__(self, distance_to_route, location, segment_index):
@@ -20,6 +29,47 @@ class ExpectedPointInfo(object):
         self.segment_index = segment_index
 
 
+class RouteSegmentsIndex(object):
+    """
+    STR-tree of the segments of the route in the projection of `nearest_location_to_line_segment`.
+    It finds the segments which can be near the location, they are checked the same way as in the scan of all segments.
+    Index is built from the encoded route, so the search area has a margin for the rounding of the polyline.
+    """
+    SEARCH_MARGIN = 1.1
+    SEARCH_MARGIN_METERS = 5
+
+    def __init__(self, route):
+        points = [location_to_point(location) for location in route]
+        self.segments = [LineString(segment) for segment in zip(points[:-1], points[1:])]
+        self.tree = STRtree(self.segments)
+        # Distance along the route from its start to each point of the route
+        lats, lngs = (np.array([location[key] for location in route], dtype=float) for key in ('lat', 'lng'))
+        self.route_distances = np.concatenate(([0.], np.cumsum(consecutive_geo_distances(lats, lngs)))).tolist()
+
+    def _query(self, point, radius):
+        search_area = box(point.x - radius, point.y - radius, point.x + radius, point.y + radius)
+        return sorted(self.tree.query_items(search_area))
+
+    def segments_near(self, location, distance):
+        """ Indexes of the segments which can be within `distance` meters from the location, in order of the route """
+        radius = meters2decimal_degree(distance * self.SEARCH_MARGIN + self.SEARCH_MARGIN_METERS, location['lat'])
+        return self._query(Point(*location_to_point(location)), radius)
+
+    def nearest_segments(self, location):
+        """ Indexes of the segments which can be the nearest to the location, in order of the route """
+        point = Point(*location_to_point(location))
+        nearest_distance = self.segments[self.tree.nearest_item(point)].distance(point)
+        radius = nearest_distance * self.SEARCH_MARGIN \
+            + meters2decimal_degree(self.SEARCH_MARGIN_METERS, location['lat'])
+        return self._query(point, radius)
+
+
+@functools.lru_cache(maxsize=ROUTE_INDEX_CACHE_SIZE)
+def get_route_segments_index(polyline):
+    # Expected route is restored from the polyline on each location of the driver, the index is built once
+    return RouteSegmentsIndex(googlemaps.convert.decode_polyline(polyline))
+
+
 class ExpectedRoute(object):
     MIN_DISTANCE_EXPECTED_ROUTE_IS_VALID = 50
     ALLOWED_ACCURACY = 80
@@ -30,6 +80,7 @@ class ExpectedRoute(object):
     def __init__(self, builder, polyline=None):
         self.builder = builder
         self.route = None
+        self.polyline = polyline
         if polyline is not None:
             self.route = googlemaps.convert.decode_polyline(polyline)
         self.valid_point_info = None
@@ -50,37 +101,65 @@ class ExpectedRoute(object):
 
     def set_route(self, new_route):
         self.route = new_route
+        self.polyline = None
+
+    @property
+    def segments_index(self):
+        if self.polyline is None:
+            self.polyline = self.encode()
+        return get_route_segments_index(self.polyline)
 
     def get_path_between_valid_locations(self):
         path = self.route[self.valid_prev_point_info.segment_index+1:self.valid_point_info.segment_index+1]
         path.insert(0, self.valid_prev_point_info.location)
         path.append(self.valid_point_info.location)
-        distance = sum(map(lambda x: distance_between(*x), zip(path[:-1], path[1:])))
+        distance = self._distance_along_route(self.valid_prev_point_info, self.valid_point_info)
         if distance > self.MIN_DISTANCE_USE_SMOOTH_PATH:
             return [self.valid_prev_point_info.location, self.valid_point_info.location]
         return path
 
-    def _get_segments_from_expected_route(self):
-        segments = zip(self.route[:-1], self.route[1:])
-        for segment_index, (from_point, to_point) in enumerate(segments):
-            yield segment_index, (from_point, to_point)
+    def _distance_along_route(self, from_point_info, to_point_info):
+        start, end = from_point_info.segment_index + 1, to_point_info.segment_index + 1
+        if start >= end:
+            return distance_between(from_point_info.location, to_point_info.location)
+        route_distances = self.segments_index.route_distances
+        return distance_between(from_point_info.location, self.route[start]) \
+            + route_distances[end - 1] - route_distances[start] \
+            + distance_between(self.route[end - 1], to_point_info.location)
+
+    def _get_segments_from_expected_route(self, segment_indexes=None):
+        if segment_indexes is None:
+            segment_indexes = range(len(self.route) - 1)
+        for segment_index in segment_indexes:
+            yield segment_index, (self.route[segment_index], self.route[segment_index + 1])
 
-    def _nearest_point_for_each_segment(self, location):
+    def _nearest_point_for_each_segment(self, location, max_distance=None, nearest_only=False):
+        """
+        Yields nearest points of the segments within `max_distance` meters from the location if it is passed,
+        of the segments which can be the nearest to the location if `nearest_only` is set, otherwise of all segments.
+        """
         location_value = location.improved_location or location.location
         coordinates = tuple(map(float, location_value.split(',')))
         loc = latlng_dict(coordinates)
 
-        no_segments_returned = True
-        for segment_index, (segment_start_location, segment_end_location) in self._get_segments_from_expected_route():
-            nearest_loc = nearest_location_to_line_segment(segment_start_location, segment_end_location, loc)
-            yield ExpectedPointInfo(distance_between(loc, nearest_loc), nearest_loc, segment_index)
-            no_segments_returned = False
-        if no_segments_returned:
+        if len(self.route) < 2:
             nearest_loc = self.route[0]
             yield ExpectedPointInfo(distance_between(loc, nearest_loc), nearest_loc, 0)
+            return
+
+        segment_indexes = None
+        if max_distance is not None:
+            segment_indexes = self.segments_index.segments_near(loc, max_distance)
+        elif nearest_only:
+            segment_indexes = self.segments_index.nearest_segments(loc)
+        segments = self._get_segments_from_expected_route(segment_indexes)
+        for segment_index, (segment_start_location, segment_end_location) in segments:
+            nearest_loc = nearest_location_to_line_segment(segment_start_location, segment_end_location, loc)
+            yield ExpectedPointInfo(distance_between(loc, nearest_loc), nearest_loc, segment_index)
 
     def _check_bearing(self, nearest_point, segment_index, desired_bearing):
-        path = self.route[:segment_index+1]
+        # Only two last points of the route before the nearest point are used
+        path = self.route[max(segment_index - 1, 0):segment_index+1]
         path.append(nearest_point)
         path = path[-3:]
         start_point, end_point = path[-2:]
@@ -91,7 +170,8 @@ class ExpectedRoute(object):
         return bearing_is_near(desired_bearing, current_bearing, 60)
 
     def _find_intersection_point(self, location, radius):
-        for segment_index, (start_loc, end_loc) in self._get_segments_from_expected_route():
+        segment_indexes = self.segments_index.segments_near(location, radius) if len(self.route) > 1 else []
+        for segment_index, (start_loc, end_loc) in self._get_segments_from_expected_route(segment_indexes):
             intersections = circle_intersection(location, start_loc, end_loc, radius)
             if len(intersections) == 0:
                 continue
@@ -122,7 +202,12 @@ class ExpectedRoute(object):
         """
         best_values = None
         max_allowed_distance = self.get_max_allowed_distance(location)
-        for expected_point_info in self._nearest_point_for_each_segment(location):
+        expected_points_info = self._nearest_point_for_each_segment(
+            location,
+            max_distance=max_allowed_distance if check_max_allowed_distance else None,
+            nearest_only=pass_check_bearing,
+        )
+        for expected_point_info in expected_points_info:
             if check_max_allowed_distance and expected_point_info.distance_to_route > max_allowed_distance:
                 continue
             is_good_bearing = pass_check_bearing or self._check_bearing(expected_point_info.location,
@@ -1,28 +1,75 @@
-from django.db.models import Case, CharField, IntegerField, Value, When
+from collections import defaultdict
 
-from driver.utils import DEFAULT_DRIVER_STATUS, DRIVER_STATUSES_ORDERING_MAP_REVERSED, DRIVER_STATUSES_PARAMS
-from tasks.models import Order
+from django.db.models import Case, F, IntegerField, Value, When
 
-QUERY_ANNOTATION = Case(
-    *(
-        When(
-            id__in=Order.all_objects.filter(**item['order_attributes']).values('driver_id'),
-            then=Value(item['status'])
-        )
-        for item in DRIVER_STATUSES_PARAMS
-    ),
-    default=Value(DEFAULT_DRIVER_STATUS),
-    output_field=CharField(),
+from driver.utils import (
+    DEFAULT_DRIVER_STATUS,
+    DRIVER_STATUSES_MAP,
+    DRIVER_STATUSES_ORDERING_MAP_REVERSED,
+    DRIVER_STATUSES_PARAMS,
 )
+from tasks.models import Order
+
+# Driver status is kept in `Member.driver_status` and refreshed on changes of the orders,
+# so the annotations don't need subqueries to the orders table.
+QUERY_ANNOTATION = F('driver_status')
 
 SORT_ANNOTATION = Case(
     *(
-        When(
-            id__in=Order.all_objects.filter(**item['order_attributes']).values('driver_id'),
-            then=Value(DRIVER_STATUSES_ORDERING_MAP_REVERSED[item['status']])
-        )
-        for item in DRIVER_STATUSES_PARAMS
+        When(driver_status=status, then=Value(rate))
+        for status, rate in DRIVER_STATUSES_ORDERING_MAP_REVERSED.items()
     ),
     default=Value(DRIVER_STATUSES_ORDERING_MAP_REVERSED[DEFAULT_DRIVER_STATUS]),
     output_field=IntegerField(),
 )
+
+# The first matching item of DRIVER_STATUSES_PARAMS defines the status of driver
+_STATUS_PRIORITY = {item['status']: priority for priority, item in enumerate(DRIVER_STATUSES_PARAMS)}
+
+
+def calculate_drivers_statuses(driver_ids):
+    """
+    Calculates statuses of drivers from their orders in one query.
+    """
+    driver_ids = {driver_id for driver_id in driver_ids if driver_id is not None}
+    statuses = dict.fromkeys(driver_ids, DEFAULT_DRIVER_STATUS)
+    if not driver_ids:
+        return statuses
+    orders = Order.all_objects.filter(driver_id__in=driver_ids, deleted=False, status__in=DRIVER_STATUSES_MAP.keys())
+    for driver_id, order_status in orders.values_list('driver_id', 'status').distinct():
+        status = DRIVER_STATUSES_MAP[order_status]
+        current = statuses[driver_id]
+        if current == DEFAULT_DRIVER_STATUS or _STATUS_PRIORITY[status] < _STATUS_PRIORITY[current]:
+            statuses[driver_id] = status
+    return statuses
+
+
+def find_drivers_statuses_drift(driver_ids):
+    """
+    Returns {driver_id: (stored status, actual status)} for drivers with outdated `driver_status`.
+    """
+    from base.models import Member
+
+    actual_statuses = calculate_drivers_statuses(driver_ids)
+    stored_statuses = Member.all_objects.filter(id__in=actual_statuses.keys()).values_list('id', 'driver_status')
+    return {
+        driver_id: (stored_status, actual_statuses[driver_id])
+        for driver_id, stored_status in stored_statuses
+        if stored_status != actual_statuses[driver_id]
+    }
+
+
+def refresh_drivers_statuses(driver_ids):
+    """
+    Recalculates `Member.driver_status` of the drivers. Should be called after any change of status, driver or
+    deletion of orders, that is done without `Order.save()`.
+    """
+    from base.models import Member
+
+    drift = find_drivers_statuses_drift(driver_ids)
+    ids_by_status = defaultdict(list)
+    for driver_id, (_, status) in drift.items():
+        ids_by_status[status].append(driver_id)
+    for status, ids in ids_by_status.items():
+        Member.all_objects.filter(id__in=ids).update(driver_status=status)
+    return drift
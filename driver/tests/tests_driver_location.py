@@ -9,14 +9,17 @@ from rest_framework import status
 from rest_framework.test import APITestCase
 
 import factory
+import fakeredis
 from mock import patch
 
 from base.factories import DriverFactory, ManagerFactory
 from base.models import Member
 from base.utils import get_fuzzy_location
+from driver.celery_tasks import process_latest_location, schedule_location_processing
 from driver.factories import DriverLocationFactory
 from driver.models import DriverLocation
 from driver.utils import WorkStatus
+from driver.utils.location_processing import location_processing
 from merchant.factories import MerchantFactory
 from merchant.models import Merchant
 from radaro_utils import countries
@@ -214,3 +217,49 @@ class OfflineLocationsTestCase(APITestCase):
     @staticmethod
     def make_data(data):
         return dict(data, timestamp=to_timestamp(data.get('timestamp')))
+
+
+class CoalescedLocationProcessingTestCase(APITestCase):
+    def setUp(self):
+        patcher = patch.object(location_processing, '_redis', fakeredis.FakeStrictRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.driver = DriverFactory()
+        self.locations = DriverLocationFactory.create_batch(
+            size=5, location=factory.LazyFunction(get_fuzzy_location), member=self.driver,
+        )
+
+    @patch('driver.celery_tasks.process_new_location')
+    @patch('driver.celery_tasks.process_latest_location.apply_async')
+    def test_only_newest_location_is_processed(self, apply_async_mock, process_mock):
+        for location in self.locations[:3] + [self.locations[4], self.locations[3]]:
+            schedule_location_processing(self.driver.id, location.id)
+        self.assertEqual(apply_async_mock.call_count, 1)
+
+        process_latest_location(self.driver.id)
+        process_mock.assert_called_once_with(self.driver.id, self.locations[4].id)
+
+        process_latest_location(self.driver.id)
+        self.assertEqual(process_mock.call_count, 1)
+
+        new_location = DriverLocationFactory(location=get_fuzzy_location(), member=self.driver)
+        schedule_location_processing(self.driver.id, new_location.id)
+        self.assertEqual(apply_async_mock.call_count, 2)
+        process_latest_location(self.driver.id)
+        process_mock.assert_called_with(self.driver.id, new_location.id)
+
+    @patch('driver.celery_tasks.process_new_location')
+    @patch('driver.celery_tasks.process_latest_location.apply_async')
+    def test_older_location_doesnt_replace_newer(self, apply_async_mock, process_mock):
+        # Requests are handled concurrently, the older location can be stored after the newer one
+        schedule_location_processing(self.driver.id, self.locations[4].id)
+        schedule_location_processing(self.driver.id, self.locations[3].id)
+        self.assertEqual(location_processing.get_latest(self.driver.id), self.locations[4].id)
+
+        # Location is processed only by one of the concurrent tasks
+        self.assertEqual(location_processing.take_for_processing(self.driver.id), self.locations[4].id)
+        process_latest_location(self.driver.id)
+        self.assertFalse(process_mock.called)
+
+        schedule_location_processing(self.driver.id, self.locations[2].id)
+        self.assertIsNone(location_processing.take_for_processing(self.driver.id))
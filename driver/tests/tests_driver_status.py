@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from base.factories import DriverFactory
+from base.models import Member
+from driver.tests.base_test_cases import BaseDriverTestCase
+from driver.utils import DriverStatus
+from tasks.models import Order
+from tasks.tests.factories import OrderFactory
+
+
+class DriverStatusTestCase(BaseDriverTestCase):
+    def assertDriverStatus(self, driver, status):
+        self.assertEqual(Member.all_objects.get(id=driver.id).driver_status, status)
+
+    def test_status_follows_orders(self):
+        self.assertDriverStatus(self.driver, DriverStatus.UNASSIGNED)
+        order = OrderFactory(merchant=self.merchant, driver=self.driver, status=Order.ASSIGNED)
+        self.assertDriverStatus(self.driver, DriverStatus.ASSIGNED)
+        self.assertEqual(order.driver.status, DriverStatus.ASSIGNED)
+
+        in_progress_order = OrderFactory(merchant=self.merchant, driver=self.driver, status=Order.ASSIGNED)
+        in_progress_order.status = Order.IN_PROGRESS
+        in_progress_order.save()
+        self.assertDriverStatus(self.driver, DriverStatus.IN_PROGRESS)
+
+        in_progress_order.status = Order.DELIVERED
+        in_progress_order.save()
+        self.assertDriverStatus(self.driver, DriverStatus.ASSIGNED)
+
+        order.safe_delete()
+        self.assertDriverStatus(self.driver, DriverStatus.UNASSIGNED)
+
+    def test_status_of_reassigned_drivers(self):
+        other_driver = DriverFactory(merchant=self.merchant)
+        order = OrderFactory(merchant=self.merchant, driver=self.driver, status=Order.PICK_UP)
+        self.assertDriverStatus(self.driver, DriverStatus.PICK_UP)
+
+        order.driver = other_driver
+        order.save()
+        self.assertDriverStatus(self.driver, DriverStatus.UNASSIGNED)
+        self.assertDriverStatus(other_driver, DriverStatus.PICK_UP)
+
+        Order.aggregated_objects.bulk_status_change([order.id], Order.ASSIGNED, driver=self.driver)
+        self.assertDriverStatus(self.driver, DriverStatus.ASSIGNED)
+        self.assertDriverStatus(other_driver, DriverStatus.UNASSIGNED)
+
+    def test_consistency_check_command(self):
+        order = OrderFactory(merchant=self.merchant, driver=self.driver, status=Order.ASSIGNED)
+        # Queryset updates bypass the order saving
+        Order.objects.filter(id=order.id).update(status=Order.WAY_BACK)
+
+        out = StringIO()
+        call_command('check_driver_statuses', stdout=out)
+        self.assertIn('Driver {}: stored "assigned", actual "way_back"'.format(self.driver.id), out.getvalue())
+        self.assertDriverStatus(self.driver, DriverStatus.ASSIGNED)
+
+        call_command('check_driver_statuses', '--fix', stdout=StringIO())
+        self.assertDriverStatus(self.driver, DriverStatus.WAY_BACK)
+
+        out = StringIO()
+        call_command('check_driver_statuses', stdout=out)
+        self.assertIn('0 driver statuses are outdated', out.getvalue())
+
+    def test_stale_member_doesnt_overwrite_status(self):
+        driver = Member.all_objects.get(id=self.driver.id)
+        OrderFactory(merchant=self.merchant, driver=self.driver, status=Order.ASSIGNED)
+        driver.first_name = 'Stale'
+        driver.save()
+        self.assertDriverStatus(self.driver, DriverStatus.ASSIGNED)
+
+        # Deferred fields aren't saved, so they aren't overwritten too
+        driver = Member.all_objects.only('id', 'first_name').get(id=self.driver.id)
+        Member.all_objects.filter(id=self.driver.id).update(last_name='Changed')
+        driver.first_name = 'Deferred'
+        driver.save()
+        saved_driver = Member.all_objects.get(id=self.driver.id)
+        self.assertEqual((saved_driver.first_name, saved_driver.last_name), ('Deferred', 'Changed'))
+        self.assertDriverStatus(self.driver, DriverStatus.ASSIGNED)
+
+    def test_member_without_row_is_inserted(self):
+        driver = DriverFactory(merchant=self.merchant)
+        Member.all_objects.filter(id=driver.id).delete()
+        driver.first_name = 'Restored'
+        driver.save()
+        self.assertEqual(Member.all_objects.get(id=driver.id).first_name, 'Restored')
+
+    def test_way_back_deactivation_refreshes_status(self):
+        from merchant.admin.utils import deactivate_way_back
+
+        OrderFactory(merchant=self.merchant, driver=self.driver, status=Order.WAY_BACK)
+        self.assertDriverStatus(self.driver, DriverStatus.WAY_BACK)
+        deactivate_way_back(self.merchant, self.manager)
+        self.assertDriverStatus(self.driver, DriverStatus.UNASSIGNED)
@@ -0,0 +1,128 @@
+import math
+import random
+import time
+from collections import namedtuple
+
+from django.test import SimpleTestCase, tag
+
+import googlemaps.convert
+
+from driver.path_improving.expected_route import ExpectedRoute
+from routing.utils import distance_between
+
+Location = namedtuple('Location', ('location', 'improved_location', 'accuracy', 'bearing', 'coordinates'))
+
+
+class AllSegments(object):
+    def segments_near(self, location, distance):
+        return None
+
+    def nearest_segments(self, location):
+        return None
+
+
+class LinearScanExpectedRoute(ExpectedRoute):
+    # Scan of all segments the indexed lookups are checked against
+    segments_index = AllSegments()
+
+    def _distance_along_route(self, from_point_info, to_point_info):
+        path = self.route[from_point_info.segment_index + 1:to_point_info.segment_index + 1]
+        path = [from_point_info.location] + path + [to_point_info.location]
+        return sum(map(lambda x: distance_between(*x), zip(path[:-1], path[1:])))
+
+
+class ExpectedRouteTestCase(SimpleTestCase):
+    # Properties are checked on the random data, seeds make failures reproducible
+    examples_count = 300
+
+    def random_polyline(self, rnd, length):
+        lat, lng, bearing = rnd.uniform(-60, 60), rnd.uniform(-180, 180), rnd.uniform(0, 2 * math.pi)
+        route = []
+        for _ in range(length):
+            # Streets of the city, mostly straight with turns
+            bearing += rnd.choice((0, 0, 0, math.pi / 2, -math.pi / 2, rnd.uniform(-0.5, 0.5)))
+            step = rnd.uniform(0.00005, 0.001)
+            lat, lng = lat + step * math.cos(bearing), lng + step * math.sin(bearing)
+            route.append({'lat': lat, 'lng': lng})
+        return googlemaps.convert.encode_polyline(route)
+
+    def random_location(self, rnd, route):
+        point = rnd.choice(route)
+        # Drivers near the route and the ones far from it
+        offset = rnd.choice((0.0001, 0.001, 0.01))
+        lat, lng = point['lat'] + rnd.uniform(-offset, offset), point['lng'] + rnd.uniform(-offset, offset)
+        accuracy = rnd.choice((None, 0, rnd.uniform(1, 80), rnd.uniform(80, 500)))
+        bearing = rnd.choice((0.0, rnd.uniform(0, 360)))
+        return Location('{},{}'.format(lat, lng), None, accuracy, bearing, (lat, lng))
+
+    def assertSamePoint(self, point_info, expected_point_info):
+        if expected_point_info is None:
+            self.assertIsNone(point_info)
+            return
+        self.assertEqual(point_info.segment_index, expected_point_info.segment_index)
+        self.assertEqual(point_info.location, expected_point_info.location)
+        self.assertEqual(point_info.distance_to_route, expected_point_info.distance_to_route)
+
+    def test_snapped_points_match_linear_scan(self):
+        rnd = random.Random(25)
+        for example in range(self.examples_count):
+            polyline = self.random_polyline(rnd, rnd.randint(1, 200))
+            route, expected_route = ExpectedRoute(None, polyline), LinearScanExpectedRoute(None, polyline)
+            prev_location, location = (self.random_location(rnd, route.route) for _ in range(2))
+            with self.subTest(example=example, length=len(route.route)):
+                prev_point_info = route.snap_to_point(prev_location, check_accuracy=False)
+                expected_prev_point_info = expected_route.snap_to_point(prev_location, check_accuracy=False)
+                self.assertSamePoint(prev_point_info, expected_prev_point_info)
+
+                point_info = route.snap_to_point(location, previous_point_info=prev_point_info)
+                self.assertSamePoint(
+                    point_info, expected_route.snap_to_point(location, previous_point_info=expected_prev_point_info)
+                )
+
+                self.assertTrue(math.isclose(route._distance_along_route(prev_point_info, point_info),
+                                             expected_route._distance_along_route(prev_point_info, point_info),
+                                             rel_tol=1e-9, abs_tol=1e-6))
+
+    def test_intersection_points_match_linear_scan(self):
+        rnd = random.Random(52)
+        for example in range(self.examples_count):
+            polyline = self.random_polyline(rnd, rnd.randint(2, 200))
+            route, expected_route = ExpectedRoute(None, polyline), LinearScanExpectedRoute(None, polyline)
+            location = self.random_location(rnd, route.route)
+            loc, radius = {'lat': location.coordinates[0], 'lng': location.coordinates[1]}, rnd.uniform(80, 500)
+            with self.subTest(example=example, length=len(route.route)):
+                self.assertSamePoint(route._find_intersection_point(loc, radius),
+                                     expected_route._find_intersection_point(loc, radius))
+
+    def test_index_is_shared_by_routes_of_polyline(self):
+        polyline = self.random_polyline(random.Random(1), 50)
+        route = ExpectedRoute(None, polyline)
+        self.assertIs(route.segments_index, ExpectedRoute(None, polyline).segments_index)
+
+        # Route set by the directions is indexed by its polyline
+        new_route = ExpectedRoute(None, polyline)
+        new_route.set_route(googlemaps.convert.decode_polyline(self.random_polyline(random.Random(2), 50)))
+        self.assertIsNot(new_route.segments_index, route.segments_index)
+        self.assertEqual(len(new_route.segments_index.segments), len(new_route.route) - 1)
+
+    @tag('performance')
+    def test_snapping_to_long_route_performance(self):
+        rnd = random.Random(5000)
+        polyline = self.random_polyline(rnd, 5000)
+        route, expected_route = ExpectedRoute(None, polyline), LinearScanExpectedRoute(None, polyline)
+        locations = [self.random_location(rnd, route.route) for _ in range(100)]
+        # Index is built once for the polyline and used by the next locations of the driver
+        route.segments_index
+
+        started_at = time.perf_counter()
+        points_info = [ExpectedRoute(None, polyline).snap_to_point(location, check_accuracy=False)
+                       for location in locations]
+        indexed_duration = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        expected_points_info = [expected_route.snap_to_point(location, check_accuracy=False) for location in locations]
+        linear_scan_duration = time.perf_counter() - started_at
+
+        for point_info, expected_point_info in zip(points_info, expected_points_info):
+            self.assertSamePoint(point_info, expected_point_info)
+        self.assertLess(indexed_duration * 10, linear_scan_duration)
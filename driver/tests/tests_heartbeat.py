@@ -0,0 +1,97 @@
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+
+import fakeredis
+from mock import patch
+
+from base.factories import DriverFactory
+from base.models import Member
+from driver.celery_tasks import check_internet_connection
+from driver.utils.heartbeat import HeartbeatStore, heartbeats
+
+
+class HeartbeatStoreTestCase(APITestCase):
+    def setUp(self):
+        self.store = HeartbeatStore(redis=fakeredis.FakeStrictRedis())
+        self.drivers = DriverFactory.create_batch(size=3, has_internet_connection=True, last_ping=None)
+        patcher = patch.object(heartbeats, '_redis', self.store.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def last_pings(self):
+        return dict(Member.all_objects.filter(id__in=[d.id for d in self.drivers]).values_list('id', 'last_ping'))
+
+    def test_ping_is_saved_on_flush(self):
+        driver = Member.objects.get(id=self.drivers[0].id)
+        driver.set_last_ping()
+        self.assertIsNone(self.last_pings()[driver.id])
+
+        self.assertEqual(self.store.flush(), 1)
+        self.assertEqual(self.last_pings()[driver.id], driver.last_ping)
+        self.assertEqual(self.store.flush(), 0)
+
+    def test_pings_of_crashed_flush_are_saved(self):
+        now = timezone.now()
+        self.store.record(self.drivers[0].id, now - timezone.timedelta(minutes=1))
+        self.store.record(self.drivers[1].id, now - timezone.timedelta(minutes=1))
+        with patch.object(Member.all_objects, 'filter', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.store.flush()
+
+        self.store.record(self.drivers[0].id, now)
+        self.assertEqual(self.store.flush(), 2)
+        self.assertEqual(self.last_pings()[self.drivers[1].id], now - timezone.timedelta(minutes=1))
+        self.assertEqual(self.store.flush(), 1)
+        self.assertEqual(self.last_pings()[self.drivers[0].id], now)
+        self.assertEqual(self.store.flush(), 0)
+
+    def test_flush_does_not_move_ping_back(self):
+        now = timezone.now()
+        Member.all_objects.filter(id=self.drivers[0].id).update(last_ping=now)
+        self.store.record(self.drivers[0].id, now - timezone.timedelta(minutes=5))
+        self.store.flush()
+        self.assertEqual(self.last_pings()[self.drivers[0].id], now)
+
+    def test_offline_detection(self):
+        now = timezone.now()
+        self.store.record(self.drivers[0].id, now - timezone.timedelta(minutes=10))
+        self.store.record(self.drivers[1].id, now)
+
+        check_internet_connection()
+        connections = dict(Member.all_objects.filter(id__in=[d.id for d in self.drivers])
+                           .values_list('id', 'has_internet_connection'))
+        self.assertFalse(connections[self.drivers[0].id])
+        self.assertTrue(connections[self.drivers[1].id])
+        # Not pinged driver isn't tracked while other drivers are
+        self.assertTrue(connections[self.drivers[2].id])
+        self.assertEqual(self.store.get_stale(now), [])
+
+    def test_stale_drivers_are_tracked_until_saved(self):
+        now = timezone.now()
+        self.store.record(self.drivers[0].id, now - timezone.timedelta(minutes=10))
+        with patch('driver.celery_tasks.create_event', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                check_internet_connection()
+        self.assertTrue(Member.all_objects.get(id=self.drivers[0].id).has_internet_connection)
+        self.assertEqual(self.store.get_stale(now), [self.drivers[0].id])
+
+        check_internet_connection()
+        self.assertFalse(Member.all_objects.get(id=self.drivers[0].id).has_internet_connection)
+        self.assertEqual(self.store.get_stale(now), [])
+
+    def test_driver_pinged_after_check_stays_tracked(self):
+        now = timezone.now()
+        self.store.record(self.drivers[0].id, now - timezone.timedelta(minutes=10))
+        stale_ids = self.store.get_stale(now)
+        self.store.record(self.drivers[0].id, now)
+        self.store.untrack_stale(stale_ids, now)
+        self.assertEqual(self.store.get_stale(now + timezone.timedelta(seconds=1)), [self.drivers[0].id])
+
+    def test_seed_after_data_loss(self):
+        Member.all_objects.filter(id=self.drivers[0].id).update(last_ping=timezone.now() - timezone.timedelta(hours=1))
+        Member.all_objects.filter(id__in=[d.id for d in self.drivers[1:]]).update(last_ping=timezone.now())
+
+        check_internet_connection()
+        self.assertFalse(Member.all_objects.get(id=self.drivers[0].id).has_internet_connection)
+        self.assertTrue(Member.all_objects.get(id=self.drivers[1].id).has_internet_connection)
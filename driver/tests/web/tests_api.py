@@ -1,3 +1,6 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from rest_framework import status
 
 from base.factories import DriverFactory, DriverLocationFactory
@@ -6,6 +9,8 @@ from driver.utils import WorkStatus
 from merchant.factories import HubFactory, SkillSetFactory
 from merchant.models import DriverHub
 from reporting.models import Event
+from tasks.models import Order
+from tasks.tests.factories import OrderFactory
 
 
 class WebDriverTestCase(BaseDriverTestCase):
@@ -42,6 +47,29 @@ class WebDriverTestCase(BaseDriverTestCase):
         resp = self.client.get(self.drivers_url)
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
 
+    def test_drivers_list_queries_count(self):
+        self.client.force_authenticate(self.manager)
+
+        def get_drivers(params=None):
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(self.drivers_url, params)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            return resp, len(queries)
+
+        drivers = DriverFactory.create_batch(size=4, merchant=self.merchant)
+        _, queries_count = get_drivers()
+        for driver, order_status in zip(drivers, (Order.ASSIGNED, Order.PICK_UP, Order.IN_PROGRESS, Order.WAY_BACK)):
+            OrderFactory(merchant=self.merchant, driver=driver, status=order_status)
+        # Statuses don't add queries per driver
+        resp, queries_count_with_statuses = get_drivers()
+        self.assertEqual(queries_count_with_statuses, queries_count)
+        statuses = [driver['status'] for driver in resp.data['results']]
+        self.assertEqual(statuses[-4:], ['assigned', 'pickup', 'in_progress', 'way_back'])
+
+        resp, filtered_queries_count = get_drivers({'status': 'pickup'})
+        self.assertLessEqual(filtered_queries_count, queries_count)
+        self.assertEqual([driver['status'] for driver in resp.data['results']], ['pickup'])
+
     def test_get_driver(self):
         self.client.force_authenticate(self.manager)
         resp = self.client.get(self.driver_url.format(self.driver.id))
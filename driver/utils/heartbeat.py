@@ -0,0 +1,97 @@
+from datetime import datetime
+
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from django_redis import get_redis_connection
+
+from radaro_utils.helpers import chunks
+
+
+class HeartbeatStore:
+    """
+    Keeps the last ping of drivers in redis sorted sets scored by ping timestamp.
+
+    `PINGS_KEY` holds the last ping of every online driver and is used for offline detection.
+    `DIRTY_KEY` holds pings not saved to `Member.last_ping` yet. It is renamed to `FLUSHING_KEY` for the flush,
+    and the flushing set is removed only after the database is updated, so pings of a crashed flush are
+    saved by the next one.
+    """
+    PINGS_KEY = 'driver-heartbeat-pings'
+    DIRTY_KEY = 'driver-heartbeat-dirty'
+    FLUSHING_KEY = 'driver-heartbeat-flushing'
+    FLUSH_BATCH_SIZE = 500
+
+    def __init__(self, redis=None):
+        self._redis = redis
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_connection('default')
+        return self._redis
+
+    def record(self, driver_id, ping_time):
+        score = ping_time.timestamp()
+        pipeline = self.redis.pipeline()
+        pipeline.zadd(self.PINGS_KEY, {driver_id: score})
+        pipeline.zadd(self.DIRTY_KEY, {driver_id: score})
+        pipeline.execute()
+
+    def flush(self):
+        from base.models import Member
+
+        # Existing flushing set is left by a crashed flush, it is saved first
+        if not self.redis.exists(self.FLUSHING_KEY):
+            if not self.redis.exists(self.DIRTY_KEY):
+                return 0
+            self.redis.rename(self.DIRTY_KEY, self.FLUSHING_KEY)
+        pings = self.redis.zrange(self.FLUSHING_KEY, 0, -1, withscores=True)
+        for pings_chunk in chunks(pings, self.FLUSH_BATCH_SIZE):
+            last_ping = Case(
+                *(When(id=int(driver_id), then=Value(self._to_datetime(score))) for driver_id, score in pings_chunk),
+                output_field=DateTimeField()
+            )
+            # Last ping is never moved back, e.g. by pings of a crashed flush
+            Member.all_objects.filter(id__in=[int(driver_id) for driver_id, _ in pings_chunk]) \
+                .update(last_ping=Greatest(F('last_ping'), last_ping))
+        self.redis.delete(self.FLUSHING_KEY)
+        return len(pings)
+
+    def get_stale(self, stale_before):
+        """
+        Returns ids of drivers whose last ping is older than `stale_before`.
+        Drivers stay tracked until `untrack_stale` is called, e.g. after they are marked offline in the database.
+        """
+        stale_ids = self.redis.zrangebyscore(self.PINGS_KEY, '-inf', '({}'.format(stale_before.timestamp()))
+        return [int(driver_id) for driver_id in stale_ids]
+
+    def untrack_stale(self, driver_ids, stale_before):
+        # Drivers pinged since `get_stale` are left tracked, the next ping tracks the driver again anyway
+        pipeline = self.redis.pipeline()
+        for driver_id in driver_ids:
+            pipeline.zscore(self.PINGS_KEY, driver_id)
+        scores = pipeline.execute()
+        stale_ids = [
+            driver_id for driver_id, score in zip(driver_ids, scores)
+            if score is not None and score < stale_before.timestamp()
+        ]
+        if stale_ids:
+            self.redis.zrem(self.PINGS_KEY, *stale_ids)
+
+    def is_empty(self):
+        return not self.redis.exists(self.PINGS_KEY)
+
+    def seed(self, pings):
+        # Restores tracking of online drivers, e.g. after redis data loss
+        pings = {driver_id: ping_time.timestamp() for driver_id, ping_time in pings if ping_time is not None}
+        if pings:
+            self.redis.zadd(self.PINGS_KEY, pings)
+
+    @staticmethod
+    def _to_datetime(score):
+        return datetime.fromtimestamp(score, tz=timezone.utc)
+
+
+heartbeats = HeartbeatStore()
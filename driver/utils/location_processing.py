@@ -0,0 +1,55 @@
+from django_redis import get_redis_connection
+
+
+class LocationProcessingStore:
+    """
+    Keeps the newest received and the newest processed location of drivers in redis for coalesced processing.
+
+    Location ids are kept in sorted sets scored by id and trimmed to the highest one, so concurrent requests
+    and tasks can't move the newest location back. Location is processed only by the task that added it
+    to `PROCESSED_KEY` as the highest one.
+    """
+    LATEST_KEY = 'driver-latest-location-{}'
+    PROCESSED_KEY = 'driver-processed-location-{}'
+    KEYS_TIMEOUT = 60 * 60
+
+    def __init__(self, redis=None):
+        self._redis = redis
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_connection('default')
+        return self._redis
+
+    def _add_highest(self, pipeline, key, coordinate_id):
+        pipeline.zadd(key, {coordinate_id: coordinate_id})
+        pipeline.zremrangebyrank(key, 0, -2)
+        pipeline.zrevrange(key, 0, 0)
+        pipeline.expire(key, self.KEYS_TIMEOUT)
+
+    def set_latest(self, driver_id, coordinate_id):
+        pipeline = self.redis.pipeline()
+        self._add_highest(pipeline, self.LATEST_KEY.format(driver_id), coordinate_id)
+        pipeline.execute()
+
+    def get_latest(self, driver_id):
+        latest = self.redis.zrevrange(self.LATEST_KEY.format(driver_id), 0, 0)
+        return int(latest[0]) if latest else None
+
+    def take_for_processing(self, driver_id):
+        """
+        Returns the newest location of the driver if it isn't processed or taken by other task yet.
+        """
+        coordinate_id = self.get_latest(driver_id)
+        if coordinate_id is None:
+            return None
+        pipeline = self.redis.pipeline()
+        self._add_highest(pipeline, self.PROCESSED_KEY.format(driver_id), coordinate_id)
+        added, _, highest, _ = pipeline.execute()
+        if not added or int(highest[0]) != coordinate_id:
+            return None
+        return coordinate_id
+
+
+location_processing = LocationProcessingStore()
@@ -6,9 +6,8 @@ from datetime import timedelta
 from django.utils import timezone
 
 from constance import config
-from geopy import distance as geo_distance
 
-from routing.utils import filter_driver_path
+from routing.utils import filter_driver_path, get_geo_distance, locations_to_arrays
 
 
 class LocationLogger(object):
@@ -62,24 +61,24 @@ def prepare_locations_from_serializer(serializer, last_location, is_offline, loc
         return
 
     new_location = location_data[-1] if is_many else location_data
-    distance = geo_distance.geodesic(
-        *[list(map(float, _loc.split(','))) for _loc in (last_location.location, new_location['location'])]
-    )
+    (last_lat, new_lat), (last_lng, new_lng) = locations_to_arrays([last_location.location, new_location['location']])
+    # Spherical distance differs from the geodesic one by less than 0.5%
+    distance = get_geo_distance(last_lng, last_lat, new_lng, new_lat)
 
     if is_many:
         track, track_distance = filter_driver_path(
             copy.copy(location_data),
             getter=op_.itemgetter
         )
-        if distance.meters > DISTANCE_THRESHOLD or track_distance > DISTANCE_THRESHOLD:
+        if distance > DISTANCE_THRESHOLD or track_distance > DISTANCE_THRESHOLD:
             serializer.save(offline=True)
             logger.saved(
-                logger.LOCATIONS_DISTANCE if distance.meters > DISTANCE_THRESHOLD else logger.TRACK_DISTANCE,
+                logger.LOCATIONS_DISTANCE if distance > DISTANCE_THRESHOLD else logger.TRACK_DISTANCE,
                 True
             )
         else:
             logger.ignored('{} and {}'.format(logger.LOCATIONS_DISTANCE, logger.TRACK_DISTANCE), True)
-    elif distance.meters > DISTANCE_THRESHOLD:
+    elif distance > DISTANCE_THRESHOLD:
         serializer.save()
         logger.saved(logger.LOCATIONS_DISTANCE, False)
     else:
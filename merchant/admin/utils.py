@@ -2,6 +2,7 @@ from django.core.files.base import ContentFile
 from django.db.models.signals import post_save
 
 from documents.models import Tag
+from driver.queries import refresh_drivers_statuses
 from merchant.models import Merchant
 from merchant.models.mixins import MerchantTypes
 from notification.mixins import MessageTemplateStatus
@@ -10,6 +11,7 @@ from reporting.models import Event
 from reporting.signals import event_created
 from tasks.models import Order
 from tasks.models.terminate_code import TerminateCode
+from tasks.utils.customer_tracking import customer_tracking
 
 
 def on_change_merchant_type(merchant):
@@ -28,7 +30,11 @@ def on_change_merchant_type(merchant):
 def deactivate_way_back(merchant, user):
     orders = Order.objects.filter(merchant=merchant, deleted=False, status=Order.WAY_BACK)
     order_dump = {"old_values": {"status": Order.WAY_BACK}, "new_values": {"status": Order.DELIVERED}}
+    orders_drivers = list(orders.values_list('id', 'driver_id'))
+    order_ids, driver_ids = [order_id for order_id, _ in orders_drivers], {driver_id for _, driver_id in orders_drivers}
     orders.update(status=Order.DELIVERED)
+    refresh_drivers_statuses(driver_ids)
+    customer_tracking.publish_orders(order_ids)
 
     for order in orders:
         model_changed_event = Event.objects.create(object=order, merchant=merchant, event=Event.MODEL_CHANGED,
@@ -22,7 +22,6 @@ from pinax.stripe.actions import customers
 from pinax.stripe.models import Card
 from rest_condition import Or
 from rest_framework_bulk import mixins as bulk_mixins
-from watson import search as watson
 from watson.models import SearchEntry
 
 from base.models import Member
@@ -35,6 +34,7 @@ from merchant.permissions import IsNotBlocked, LabelsEnabled, SkillSetsEnabled
 from merchant.push_messages.composers import SkillSetAddedPushMessage, SkillSetRemovedPushMessage
 from merchant.utils import CardPaginationClass
 from radaro_utils.permissions import IsAdminOrManager
+from radaro_utils.search import search_entries
 from reporting.context_managers import track_fields_on_change
 from reporting.mixins import TrackableCreateModelMixin, TrackableDestroyModelMixin, TrackableUpdateModelMixin
 from tasks.api.legacy.serializers.core import BaseCustomerAddressSerializer
@@ -102,9 +102,7 @@ class SearchAPI(ReadOnlyDBActionsViewSetMixin, ListAPIView):
             members_search_entries__role__in=[Member.DRIVER, Member.MANAGER_OR_DRIVER],
             members_search_entries__merchant_id=merchant.id,
         )
-        search_engine = watson.default_search_engine
-        search_results = SearchEntry.objects.all().order_by('-pk')
-        search_results = search_results.filter(content__icontains=q).filter(engine_slug=search_engine._engine_slug)
+        search_results = search_entries(SearchEntry.objects.all(), q)
         search_results = search_results.filter(orders_q | members_q)
         search_results = search_results.prefetch_related('object', 'content_type')
 
@@ -6,6 +6,7 @@ from django_filters.rest_framework import FilterSet
 from watson.models import SearchEntry
 
 from base.models import Member
+from radaro_utils.search import search_entries
 from tasks.models import BulkDelayedUpload
 
 
@@ -32,7 +33,7 @@ class SearchFilter(CharFilter):
             members_search_entries__role__in=[Member.DRIVER, Member.MANAGER_OR_DRIVER],
             members_search_entries__merchant_id=merchant.id,
         )
-        return qs.filter(content__icontains=value).filter(orders_q | members_q)
+        return search_entries(qs, value).filter(orders_q | members_q)
 
 
 class SearchFilterSet(FilterSet):
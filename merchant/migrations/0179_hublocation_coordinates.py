@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+from radaro_utils.db import backfill_coordinates
+
+
+def fill_coordinates(apps, schema_editor):
+    HubLocation = apps.get_model('merchant', 'HubLocation')
+    backfill_coordinates(schema_editor.connection, HubLocation._meta.db_table)
+
+
+class Migration(migrations.Migration):
+    # Index is built concurrently to not lock the hub locations table
+    atomic = False
+
+    dependencies = [
+        ('merchant', '0178_merge_20220802_1723'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hublocation',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='hublocation',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_coordinates, reverse_code=migrations.RunPython.noop),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS merchant_hublocation_earth_gist '
+            'ON merchant_hublocation USING gist (ll_to_earth(latitude, longitude));',
+            'DROP INDEX CONCURRENTLY IF EXISTS merchant_hublocation_earth_gist;',
+        ),
+    ]
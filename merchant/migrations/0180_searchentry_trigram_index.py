@@ -0,0 +1,22 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Index is built concurrently to not lock the search entries table
+    atomic = False
+
+    dependencies = [
+        ('merchant', '0179_hublocation_coordinates'),
+        ('watson', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # Django compiles `icontains` to `UPPER(content) LIKE UPPER(%s)`, the index is built on the same expression
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS watson_searchentry_content_trgm "
+            "ON watson_searchentry USING gin (UPPER(content) gin_trgm_ops) WHERE engine_slug = 'default';",
+            'DROP INDEX CONCURRENTLY IF EXISTS watson_searchentry_content_trgm;',
+        ),
+    ]
@@ -4,21 +4,22 @@ import random
 
 from django.db import models
 
-from radaro_utils.db import DistanceFunc
-from routing.models.locations import Location
+from radaro_utils.db import EarthDistanceFunc, KNNDistanceFunc
+from routing.models.locations import Location, PointLocationMixin
 
 from .merchant import Merchant
 
 
-class HubLocation(Location):
+class HubLocation(PointLocationMixin, Location):
     class Meta:
         ordering = ('created_at', )
 
 
 class HubQuerySet(models.QuerySet):
     def order_by_distance(self, latitude, longitude):
-        distance_calculation = DistanceFunc(latitude, longitude, self.model, Hub.location)
-        return self.annotate(distance=distance_calculation).order_by('distance')
+        # Hubs are ordered by the index of the locations, the ones without numeric coordinates are the last
+        distance_calculation = EarthDistanceFunc(latitude, longitude, 'location')
+        return self.annotate(distance=distance_calculation).order_by(KNNDistanceFunc(latitude, longitude, 'location'))
 
 
 class Hub(models.Model):
@@ -1,13 +1,15 @@
 from __future__ import unicode_literals
 
+from django.db import connection
+from django.test import TestCase
 from django.utils import timezone
 
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from base.factories import ManagerFactory
-from merchant.factories import HubFactory, MerchantFactory
-from merchant.models import Hub
+from merchant.factories import HubFactory, HubLocationFactory, MerchantFactory
+from merchant.models import Hub, HubLocation
 
 
 class HubsChangingTestCase(APITestCase):
@@ -91,3 +93,43 @@ class HubsChangingTestCase(APITestCase):
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
         resp = self.client.get('/api/v2/new-events/', params={'date_since': date})
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+
+class HubsOrderingByDistanceTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = MerchantFactory()
+        cls.far_hub = HubFactory(merchant=cls.merchant, location=HubLocationFactory(location='53.950000,27.700000'))
+        cls.near_hub = HubFactory(merchant=cls.merchant, location=HubLocationFactory(location='53.900000,27.560000'))
+
+    def test_coordinates_are_kept(self):
+        location = HubLocation.objects.get(id=self.near_hub.location_id)
+        self.assertEqual((location.latitude, location.longitude), (53.9, 27.56))
+        location.location = '53.1,27.1'
+        location.save(update_fields=('location',))
+        location.refresh_from_db()
+        self.assertEqual((location.latitude, location.longitude), (53.1, 27.1))
+
+    def test_order_by_distance(self):
+        hubs = list(Hub.objects.filter(merchant=self.merchant).order_by_distance('53.9', '27.55'))
+        self.assertEqual(hubs, [self.near_hub, self.far_hub])
+        self.assertAlmostEqual(float(hubs[0].distance), 0.407, places=2)
+
+    def test_order_by_distance_without_coordinates(self):
+        HubLocation.objects.filter(id=self.near_hub.location_id).update(latitude=None, longitude=None)
+        hubs = list(Hub.objects.filter(merchant=self.merchant).order_by_distance('53.9', '27.55'))
+        # Locations not backfilled yet are the last
+        self.assertEqual(hubs, [self.far_hub, self.near_hub])
+        self.assertIsNone(hubs[1].distance)
+
+    def test_order_by_distance_uses_index(self):
+        hubs = Hub.objects.filter(merchant=self.merchant).order_by_distance('53.9', '27.55')
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+        try:
+            plan = hubs[:1].explain()
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+        self.assertIn('merchant_hublocation_earth_gist', plan)
+        self.assertNotIn('SubPlan', plan)
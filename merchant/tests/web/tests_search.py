@@ -1,9 +1,14 @@
+from django.db import connection
+
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from watson.models import SearchEntry
+
 from base.factories import DriverFactory, ManagerFactory
 from merchant.factories import MerchantFactory
-from tasks.tests.factories import OrderFactory
+from radaro_utils.search import search_entries
+from tasks.tests.factories import CustomerFactory, OrderFactory
 
 
 class SearchTestCase(APITestCase):
@@ -39,3 +44,50 @@ class SearchTestCase(APITestCase):
 
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
         self.assertEqual(resp.data['count'], 0)
+
+    def test_word_prefix_match_is_ranked_first(self):
+        OrderFactory(merchant=self.merchant, title='Call mrjohnson')
+        order = OrderFactory(merchant=self.merchant, customer=CustomerFactory(merchant=self.merchant, name='Johnson'))
+        OrderFactory(merchant=self.merchant, title='Mrsjohnson flowers')
+
+        self.client.force_authenticate(self.manager)
+        resp = self.client.get(self.search_url, data={'q': 'johnson', })
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['count'], 3)
+        self.assertEqual(resp.data['results'][0]['id'], order.id)
+
+    def test_search_by_non_ascii_text(self):
+        order = OrderFactory(merchant=self.merchant, customer=CustomerFactory(merchant=self.merchant, name='Jérôme'))
+        OrderFactory(merchant=self.merchant, title='Call mrjérôme (müller)')
+
+        self.client.force_authenticate(self.manager)
+        resp = self.client.get(self.search_url, data={'q': 'jérôme', })
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['count'], 2)
+        self.assertEqual(resp.data['results'][0]['id'], order.id)
+
+        resp = self.client.get(self.search_url, data={'q': '(müller)', })
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['count'], 1)
+
+    def test_search_by_order_id_prefix(self):
+        order = OrderFactory(merchant=self.merchant)
+        OrderFactory(merchant=self.merchant)
+
+        self.client.force_authenticate(self.manager)
+        resp = self.client.get(self.search_url, data={'q': str(order.order_id)[:6], })
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIn(order.id, [item['id'] for item in resp.data['results']])
+
+    def test_search_uses_trigram_index(self):
+        search_results = search_entries(SearchEntry.objects.all(), 'ordertest')
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+        try:
+            plan = search_results.explain()
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+        self.assertIn('watson_searchentry_content_trgm', plan)
@@ -55,6 +55,78 @@ class DistanceFunc(models.Func):
         super(DistanceFunc, self).__init__(**extra)
 
 
+class PointFunc(models.Func):
+    function = 'point'
+
+
+class EarthDistanceFunc(models.Func):
+    """
+    Distance in statute miles between numeric coordinates of related location and given point.
+    Uses `<@>` operator of `earthdistance` extension, same as `DistanceFunc`, but without parsing location strings.
+    """
+    arg_joiner = ' <@> '
+    template = 'round((%(expressions)s)::numeric, 3)'
+    output_field = models.FloatField()
+
+    def __init__(self, latitude, longitude, location_field_name, **extra):
+        super(EarthDistanceFunc, self).__init__(
+            PointFunc(models.F(location_field_name + '__longitude'), models.F(location_field_name + '__latitude')),
+            PointFunc(models.Value(float(longitude), output_field=models.FloatField()),
+                      models.Value(float(latitude), output_field=models.FloatField())),
+            **extra
+        )
+
+
+class LLToEarthFunc(models.Func):
+    function = 'll_to_earth'
+
+
+class KNNDistanceFunc(models.Func):
+    """
+    Distance between numeric coordinates of related location and given point for ordering by the nearest.
+    `<->` of `ll_to_earth` points is served by the GiST index on `ll_to_earth(latitude, longitude)`
+    and orders locations the same as the great circle distance.
+    """
+    arg_joiner = ' <-> '
+    template = '(%(expressions)s)'
+    output_field = models.FloatField()
+
+    def __init__(self, latitude, longitude, location_field_name, **extra):
+        super(KNNDistanceFunc, self).__init__(
+            LLToEarthFunc(models.F(location_field_name + '__latitude'), models.F(location_field_name + '__longitude')),
+            LLToEarthFunc(models.Value(float(latitude), output_field=models.FloatField()),
+                          models.Value(float(longitude), output_field=models.FloatField())),
+            **extra
+        )
+
+
+COORDINATES_PATTERN = r'^\s*-?\d+(\.\d+)?\s*,\s*-?\d+(\.\d+)?\s*$'
+
+
+def backfill_coordinates(connection, table, batch_size=10000):
+    """
+    Fills numeric `latitude`/`longitude` of the location table from its location strings by ranges of ids,
+    so the table isn't locked by one long update. Returns count of the updated rows.
+    """
+    table = connection.ops.quote_name(table)
+    query = '''
+        UPDATE {table} SET
+            latitude = trim(split_part(location, ',', 1))::double precision,
+            longitude = trim(split_part(location, ',', 2))::double precision
+        WHERE id >= %s AND id < %s AND latitude IS NULL AND location ~ %s
+    '''.format(table=table)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT min(id), max(id) FROM {table} WHERE latitude IS NULL'.format(table=table))
+        min_id, max_id = cursor.fetchone()
+        if min_id is None:
+            return 0
+        updated = 0
+        for start in range(min_id, max_id + 1, batch_size):
+            cursor.execute(query, [start, start + batch_size, COORDINATES_PATTERN])
+            updated += cursor.rowcount
+    return updated
+
+
 class RoundFunc(models.Func):
     function = 'ROUND'
     arity = 2
@@ -1,12 +1,28 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from django.conf import settings
 from django.utils.encoding import smart_text
 
-from routing.google import GoogleClient
+from routing.google import GoogleClient, merchant_registry
+from routing.google.transport import RateLimiter
+
+
+def normalize_address(value):
+    # The same address typed with different case, spaces or commas gives the same key
+    value = smart_text(value, encoding='utf-8', strings_only=False, errors='strict').casefold()
+    value = re.sub(r'\s*,[\s,]*', ', ', value)
+    return ' '.join(value.split()).strip(' ,')
 
 
 class AddressGeocoder(object):
+    def __init__(self, rate_limiter=None):
+        self.rate_limiter = rate_limiter
+
     def geocode(self, value, regions, language=None):
         for region in regions:
+            if self.rate_limiter is not None:
+                self.rate_limiter.wait()
             loc_obj = GoogleClient().geocode(
                 value, region, track_merchant=True, language=language or settings.LANGUAGE_CODE
             )
@@ -16,3 +32,28 @@ class AddressGeocoder(object):
                     address=smart_text(loc_obj.address, encoding='utf-8', strings_only=False, errors='strict'),
                     raw_address=value,
                 )
+
+    def geocode_many(self, values, regions, language=None):
+        """
+        Geocodes the addresses in threads, not more than GEOCODING_MAX_CONCURRENT_REQUESTS at once
+        and not faster than GEOCODING_QUERIES_PER_SECOND.
+        Yields (value, geocoded data) pairs in order of completion.
+        """
+        values = list(values)
+        if not values:
+            return
+        geocoder = AddressGeocoder(
+            rate_limiter=self.rate_limiter or RateLimiter(settings.GEOCODING_QUERIES_PER_SECOND)
+        )
+        # Requests of the threads are tracked for the merchant of the caller
+        merchant = merchant_registry.get_merchant()
+
+        def geocode(value):
+            with GoogleClient.track_merchant(merchant):
+                return value, geocoder.geocode(value, regions, language)
+
+        max_workers = min(settings.GEOCODING_MAX_CONCURRENT_REQUESTS, len(values))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='geocoding') as executor:
+            futures = [executor.submit(geocode, value) for value in values]
+            for future in as_completed(futures):
+                yield future.result()
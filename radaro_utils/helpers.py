@@ -1,4 +1,5 @@
 import calendar
+import itertools
 import json
 from datetime import datetime
 
@@ -22,6 +23,18 @@ def chunks(l, n, length=None, since=0):
         yield l[i:i + n]
 
 
+def ichunks(iterable, n):
+    """
+    Yield successive n-sized lists from any iterable.
+    Unlike `chunks` it does not need the length and does not slice, so it can consume iterators.
+    """
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, n))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, n))
+
+
 def validate_photos_count(photos):
     max_count = config.CONFIRM_PHOTOS_UPLOAD_LIMIT
     if len(photos) > max_count:
@@ -106,15 +106,26 @@ class QuerySetChunkMappingWriter(BaseCSVModelMappingPipe):
         raise NotImplementedError()
 
     def prepare(self, qs):
-        qs_len = qs.count()
+        # Annotations are not needed to count the rows
+        qs_len = qs.values('pk').count()
         self.chunks = int(qs_len / self.chunksize) + 1
         self.backend.open(self.model_obj.file, self._meta)
         return qs, qs_len
 
+    def iter_chunks(self, qs):
+        """
+        Splits queryset into querysets of `chunksize` objects keeping its ordering.
+        Ids are read through the server-side cursor, so neither the whole result is loaded to memory
+        nor the query is repeated with growing OFFSET for each chunk.
+        """
+        ids = qs.values_list('pk', flat=True).iterator(chunk_size=self.chunksize)
+        for chunk_ids in helpers.ichunks(ids, self.chunksize):
+            yield qs.filter(pk__in=chunk_ids)
+
     def __iter__(self):
         qs, qs_len = self.prepare(self.get_queryset())
         with self.mapper.using_context(self.mapper_context) as mapper:
-            data = (mapper(chunk) for chunk in helpers.chunks(qs, length=qs_len, n=self.chunksize))
+            data = (mapper(chunk) for chunk in self.iter_chunks(qs))
             for res in self.backend.write_data(data):
                 yield res
         self.finish()
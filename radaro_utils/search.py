@@ -1,6 +1,35 @@
+import re
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Case, IntegerField, Value, When
+
 from watson import search as watson
 from watson.models import SearchEntry
 
+# Special chars of Postgres regular expressions. `re.escape` of Python 3.6 escapes all non-ASCII chars too,
+# which are invalid escapes in Postgres
+REGEX_SPECIAL_CHARS = re.compile(r'([.^$*+?()[\]{}|\\])')
+
+
+def search_entries(queryset, search_text):
+    """
+    Filters search entries of the default engine by the text and orders them by relevance.
+
+    Substring match is served by the trigram GIN index on `UPPER(content)`, so it doesn't scan all entries.
+    Entries with a word starting with the text (order IDs, phone numbers, customer names) go first,
+    then entries are ranked by trigram similarity.
+    """
+    # Text starting with a non-word char (e.g. "+61...") can't be matched by a word boundary
+    word_prefix = (r'\m' if re.match(r'\w', search_text) else r'(^|\s)') + REGEX_SPECIAL_CHARS.sub(r'\\\1', search_text)
+    queryset = queryset.filter(engine_slug=watson.default_search_engine._engine_slug, content__icontains=search_text)
+    queryset = queryset.annotate(
+        search_prefix_match=Case(
+            When(content__iregex=word_prefix, then=Value(1)), default=Value(0), output_field=IntegerField(),
+        ),
+        search_similarity=TrigramSimilarity('content', search_text),
+    )
+    return queryset.order_by('-search_prefix_match', '-search_similarity', '-pk')
+
 
 def watson_index_bulk_update(objs):
     search_engine = watson.default_search_engine
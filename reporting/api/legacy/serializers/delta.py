@@ -5,3 +5,5 @@ class DeltaSerializer(serializers.ModelSerializer):
     class Meta:
         fields = '__all__'
         track_change_event = []
+        # Relations used by the serializer, they are prefetched when many instances are dumped at once
+        prefetch_related = ()
@@ -1,4 +1,5 @@
-from datetime import timedelta
+import time
+from datetime import datetime, timedelta
 
 from django.utils import timezone
 
@@ -9,50 +10,74 @@ from rest_framework.response import Response
 from constance import config
 from dateutil.parser import parse
 
-from base.models import Member
 from base.permissions import IsAdminOrManagerOrObserver
 from custom_auth.permissions import UserIsAuthenticated
-from driver.utils import WorkStatus
-from reporting.models import Event
-
-from .serializers import WebEventSerializer
+from reporting.utils.events_feed import MerchantEventsFeed
 
 
 class WebEventViewSet(viewsets.ViewSet):
     OLD_DATE = parse('01-01-1970 00:00:00+0')
     MAX_PERIOD = timedelta(minutes=15)
 
+    # Long poll holds a sync worker, so it returns the empty feed before the gunicorn worker timeout
+    MAX_WAIT = 20
+
     permission_classes = [UserIsAuthenticated, IsAdminOrManagerOrObserver]
+    feed = MerchantEventsFeed(MAX_PERIOD)
 
-    def filter_queryset(self, queryset):
-        return queryset.filter(created_at__lte=self.events_before)
+    def get(self, request, *args, **kwargs):
+        data = self.get_feed_data(self.feed.get_snapshot(self.merchant, {'request': request}))
+        if 'events' in data or 'paths' in data or not self.wait:
+            return Response(data=data)
 
-    def get_queryset(self):
-        return Event.objects.last_events(self.merchant, self.date_since)
+        # Dashboards over the limit of long polls get the empty feed at once and poll again
+        waiting_key = self.feed.acquire_waiting(self.wait)
+        if waiting_key is None:
+            return Response(data=data)
+        try:
+            waiting_until = time.monotonic() + self.wait
+            while time.monotonic() < waiting_until:
+                # Snapshot is the same until it expires
+                time.sleep(self.feed.CACHE_TIMEOUT)
+                data = self.get_feed_data(self.feed.get_snapshot(self.merchant, {'request': request}))
+                if 'events' in data or 'paths' in data:
+                    break
+        finally:
+            self.feed.release_waiting(waiting_key)
+        return Response(data=data)
 
-    def get(self, *args, **kwargs):
+    def get_feed_data(self, snapshot):
+        events_before = snapshot['events_before']
+        date_since = max(self.date_since, events_before - WebEventViewSet.MAX_PERIOD)
         data = {
-            'events_before': self.events_before.isoformat(),
-            'events_since': self.date_since.isoformat()
+            'events_before': events_before.isoformat(),
+            'events_since': date_since.isoformat(),
+            # Client has all events of the snapshot after this response
+            'cursor': self.format_cursor(events_before),
         }
 
-        drivers = Member.all_drivers.all().not_deleted().filter(
-            work_status=WorkStatus.WORKING,
-            merchant=self.merchant,
-            current_path_updated__gt=self.date_since,
-            current_path_updated__lte=self.events_before
-        ).order_by('id').distinct('id')
-        if drivers.exists():
-            data['paths'] = [d.current_path for d in drivers if d.current_path]
-
-        events = self.filter_queryset(self.get_queryset())
-        events = list(events)
+        paths = [path for updated, path in snapshot['paths'] if updated > date_since]
+        if paths:
+            data['paths'] = paths
+
+        if self.cursor is None:
+            events = [event for _, _, created_at, event in snapshot['events'] if created_at > date_since]
+        else:
+            # Events are given by the snapshot they were seen first, not by ids allocated before commit
+            events = [event for _, seen_at, _, event in snapshot['events'] if seen_at > self.cursor]
         if events:
-            events = Event.objects.prepare_for_list(events)
-            events = Event.objects.filter_out_without_object(events)
-            data['events'] = WebEventSerializer(events, many=True, context={'request': self.request}).data
+            data['events'] = events
 
-        return Response(data=data)
+        return data
+
+    @staticmethod
+    def format_cursor(events_before):
+        return str(int(events_before.timestamp() * 1000))
+
+    @staticmethod
+    def parse_cursor(cursor):
+        cursor = int(cursor)
+        return cursor, datetime.fromtimestamp(cursor / 1000, tz=timezone.utc)
 
     def initial(self, request, *args, **kwargs):
         super().initial(request, *args, **kwargs)
@@ -60,15 +85,28 @@ class WebEventViewSet(viewsets.ViewSet):
             if not config.EVENT_UPDATING_ALLOWED:
                 raise PermissionDenied(detail='Event updating is impossible.')
 
-            self.events_before = timezone.now()
             self.merchant = request.user.current_merchant
             self.date_since = timezone.now() - WebEventViewSet.MAX_PERIOD
+            self.cursor = None
+            cursor = request.query_params.get('cursor')
+            if cursor:
+                try:
+                    self.cursor, custom_date_since = self.parse_cursor(cursor)
+                except (ValueError, OverflowError, OSError):
+                    raise APIException(detail='Illegal cursor.')
+            else:
+                try:
+                    custom_date_since = parse(request.query_params.get('date_since').replace('Z', '+'))
+                except (AttributeError, ValueError):
+                    custom_date_since = self.date_since
+            if self.date_since < custom_date_since:
+                self.date_since = custom_date_since
+
             try:
-                custom_date_since = parse(request.query_params.get('date_since').replace('Z', '+'))
-                if self.date_since < custom_date_since:
-                    self.date_since = custom_date_since
-            except (AttributeError, ValueError):
-                pass
+                wait = float(request.query_params.get('wait', 0))
+            except ValueError:
+                raise APIException(detail='Illegal wait.')
+            self.wait = min(wait, WebEventViewSet.MAX_WAIT) if wait > 0 else 0
 
         except AttributeError:
             raise PermissionDenied(detail='Only members of merchant are allowed to see events.')
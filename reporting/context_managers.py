@@ -1,14 +1,25 @@
+from django.db.models import QuerySet
+
 from rest_framework.generics import get_object_or_404
 
 from reporting.model_mapping import serializer_map
-from reporting.signals import create_event
+from reporting.signals import build_change_events, create_event, create_events_in_bulk
 
 
 class track_fields_on_change(object):
+    """
+    Creates change events for the instances (an instance, a list or a queryset) changed inside the block.
+
+    All instances are dumped with one query before and one query after the block (plus prefetches listed
+    in `prefetch_related` of the delta serializer's Meta), events of all instances are saved with one `bulk_create`.
+    """
+
     def __init__(self, instances, should_track=True, initiator=None, sender=None, **kwargs):
         self.sender = sender
         self.initiator = initiator
         self.should_track = should_track
+        if isinstance(instances, QuerySet):
+            instances = list(instances)
         self.instances = instances if isinstance(instances, (list, tuple)) else [instances]
         if self.instances:
             self.model = type(self.instances[0])
@@ -17,6 +28,22 @@ class track_fields_on_change(object):
             self.model = None
         self.event_kwargs = kwargs
 
+    def _fetch(self, manager, ids):
+        prefetch = getattr(self.delta_serializer.Meta, 'prefetch_related', ())
+        return {obj.id: obj for obj in manager.filter(id__in=ids).prefetch_related(*prefetch)}
+
+    def _refresh_instance(self, instance, db_instance):
+        # Same as `refresh_from_db`, but values are taken from the already fetched instance
+        for field in self.model._meta.concrete_fields:
+            setattr(instance, field.attname, getattr(db_instance, field.attname))
+            if field.is_relation and field.is_cached(instance):
+                field.delete_cached_value(instance)
+        for field in self.model._meta.related_objects:
+            if field.is_cached(instance):
+                field.delete_cached_value(instance)
+        instance._prefetched_objects_cache = {}
+        instance._state.db = db_instance._state.db
+
     def __enter__(self):
         if self.model is None:
             return self
@@ -25,8 +52,8 @@ class track_fields_on_change(object):
             ids = [inst.id for inst in self.instances]
             if None in ids:
                 raise self.model.DoesNotExist()
-            old_objs = self.model.objects.filter(id__in=ids)
-            self.old_dict = {obj.id: self.delta_serializer(obj).data for obj in old_objs}
+            old_objs = self._fetch(self.model.objects, ids)
+            self.old_dict = {obj_id: self.delta_serializer(obj).data for obj_id, obj in old_objs.items()}
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -34,20 +61,23 @@ class track_fields_on_change(object):
             return
 
         if exc_type is None and self.should_track:
-            for instance in self.instances:
-                if instance.id not in self.old_dict:
-                    continue
-                instance.refresh_from_db()
-                new_dict = self.delta_serializer(instance).data
-                create_event(
+            tracked_instances = [instance for instance in self.instances if instance.id in self.old_dict]
+            new_objs = self._fetch(self.model._base_manager, [instance.id for instance in tracked_instances])
+            events = []
+            for instance in tracked_instances:
+                if instance.id not in new_objs:
+                    raise self.model.DoesNotExist()
+                self._refresh_instance(instance, new_objs[instance.id])
+                events.extend(build_change_events(
                     self.old_dict[instance.id],
-                    new_dict,
+                    self.delta_serializer(new_objs[instance.id]).data,
                     initiator=self.initiator,
                     instance=instance,
-                    sender=self.sender,
                     track_change_event=self.delta_serializer.Meta.track_change_event,
                     **self.event_kwargs,
-                )
+                ))
+            if events:
+                create_events_in_bulk(events, sender=self.sender)
 
 
 class track_fields_for_offline_changes(object):
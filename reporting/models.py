@@ -296,7 +296,7 @@ class Event(models.Model):
 
     # Set initiator as None if use in Celery task and initiator is unknown
     @staticmethod
-    def generate_event(sender, initiator=False, **kwargs):
+    def build_event(initiator=False, **kwargs):
         obj = kwargs.pop('object')
         if not initiator and initiator is not None:
             initiator = CrequestMiddleware.get_request().user
@@ -316,7 +316,15 @@ class Event(models.Model):
         if merchant_id is None:
             return None
 
-        event = Event.objects.create(initiator=initiator, merchant_id=merchant_id, **kwargs)
+        return Event(initiator=initiator, merchant_id=merchant_id, **kwargs)
+
+    @staticmethod
+    def generate_event(sender, initiator=False, **kwargs):
+        event = Event.build_event(initiator=initiator, **kwargs)
+        if event is None:
+            return None
+
+        event.save(force_insert=True)
         from reporting.signals import event_created
         event_created.send(sender=sender, event=event)
         return event
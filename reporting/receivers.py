@@ -13,7 +13,12 @@ from notification.models import MerchantMessageTemplate
 from notification.push_messages.utils import send_on_event_data_notifications
 from reporting.model_mapping import serializer_map
 from reporting.models import Event, ExportReportInstance
-from reporting.signals import create_event, trigger_object_correlated_operations, trigger_object_post_processing
+from reporting.signals import (
+    collect_events,
+    create_event,
+    trigger_object_correlated_operations,
+    trigger_object_post_processing,
+)
 from tasks.celery_tasks import generate_driver_path, notify_customer_delayed
 from tasks.mixins.order_status import OrderStatus
 from tasks.models import ConcatenatedOrder, Order
@@ -105,7 +110,7 @@ def inactive_driver(sender, instance, created, *args, **kwargs):
     ]):
         orders = Order.objects.filter(driver=driver, status__in=OrderStatus.status_groups.UNFINISHED)\
             .exclude(status=OrderStatus.NOT_ASSIGNED)
-        with transaction.atomic():
+        with transaction.atomic(), collect_events():
             for order in orders:
                 old_dict = DeltaSerializer(order).data
                 if order.status in [OrderStatus.IN_PROGRESS, OrderStatus.PICK_UP]:
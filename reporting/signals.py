@@ -1,9 +1,18 @@
+import threading
+from contextlib import contextmanager
+from functools import partial
+
 from django.conf import settings
 from django.db import transaction
+from django.db.models.signals import post_save
 from django.dispatch import Signal
+from django.utils import timezone
+
+import celery
 
 from base.utils import dictionaries_difference
 from delivery.celery import app
+from radaro_utils.helpers import chunks
 
 from .models import Event
 
@@ -18,16 +27,15 @@ trigger_object_correlated_operations = Signal(providing_args=['event'])
 event_created = Signal(providing_args=['event'])
 
 
-def create_event(dump_before, dump_after, initiator, instance, sender, track_change_event=None,
-                 additional_data_for_event=None, force_create=False, **kwargs):
+def build_change_events(dump_before, dump_after, initiator, instance, track_change_event=None,
+                        additional_data_for_event=None, force_create=False, **kwargs):
     key_diff, old_dict, new_dict = dictionaries_difference(dump_before, dump_after)
     if not force_create and not key_diff:
-        return
+        return []
     events = []
 
     obj_dump = {"old_values": old_dict, "new_values": new_dict}
-    events.append(Event.generate_event(
-        sender,
+    events.append(Event.build_event(
         initiator=initiator,
         object=instance,
         event=Event.MODEL_CHANGED,
@@ -42,8 +50,7 @@ def create_event(dump_before, dump_after, initiator, instance, sender, track_cha
 
     for key in change_event_diff:
         obj_dump = additional_info_for_fields.get(key, None)
-        events.append(Event.generate_event(
-            sender,
+        events.append(Event.build_event(
             field=str(key),
             new_value=str(new_dict[key])[:255],
             initiator=initiator,
@@ -53,18 +60,142 @@ def create_event(dump_before, dump_after, initiator, instance, sender, track_cha
             **kwargs,
         ))
 
+    return [event for event in events if event]
+
+
+def create_event(dump_before, dump_after, initiator, instance, sender, track_change_event=None,
+                 additional_data_for_event=None, force_create=False, **kwargs):
+    events = build_change_events(
+        dump_before, dump_after, initiator, instance, track_change_event=track_change_event,
+        additional_data_for_event=additional_data_for_event, force_create=force_create, **kwargs
+    )
+    if not events:
+        return
+    collector = get_event_collector()
+    if collector is not None:
+        collector.add(events, sender)
+        return
+    for event in events:
+        event.save(force_insert=True)
+        event_created.send(sender=sender, event=event)
+
     send_create_event_signal(events)
 
 
+def create_events_in_bulk(events, sender):
+    """
+    Saves the events built by `build_change_events` with one query.
+    Receivers get the same signals as for the events saved one by one.
+    """
+    collector = get_event_collector()
+    if collector is not None:
+        collector.add(events, sender)
+        return events
+    created = _save_events_in_bulk(events)
+    for event in created:
+        _send_event_saved_signals(event, sender)
+    send_create_event_signal(created)
+    return created
+
+
+def _save_events_in_bulk(events):
+    now = timezone.now()
+    for event in events:
+        # Same as in `Event.save`, online events are recognized by equal times
+        event.created_at = now
+        event.happened_at = event.happened_at or now
+    return Event.objects.bulk_create(events)
+
+
+def _send_event_saved_signals(event, sender):
+    post_save.send(Event, instance=event, created=True, update_fields=None, raw=False, using=event._state.db)
+    event_created.send(sender=sender, event=event)
+
+
+class EventCollector(object):
+    """
+    Buffers change events created by `create_event` and `create_events_in_bulk` inside `collect_events` block.
+
+    The events are saved in batches with `bulk_create`, receivers of `post_save` and `event_created` are called
+    for each event in the order the events were created. Post processing of every batch is done by one celery task,
+    the tasks are chained, so events of an object are post processed in the order they were created.
+    """
+    BATCH_SIZE = 500
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, events, sender):
+        # Changes saved outside of atomic blocks are committed already and are not rolled back on failure
+        committed = not transaction.get_connection().in_atomic_block
+        self.entries.extend((event, sender, committed) for event in events)
+
+    def drop_uncommitted(self):
+        self.entries = [entry for entry in self.entries if entry[2]]
+
+    def flush(self):
+        entries, self.entries = self.entries, []
+        event_batches = []
+        for batch in chunks(entries, self.BATCH_SIZE):
+            created = _save_events_in_bulk([event for event, _, _ in batch])
+            for event, (_, sender, _) in zip(created, batch):
+                _send_event_saved_signals(event, sender)
+            event_batches.append(created)
+        send_create_event_signal_in_batches(event_batches)
+
+
+_collector_state = threading.local()
+
+
+def get_event_collector():
+    return getattr(_collector_state, 'collector', None)
+
+
+@contextmanager
+def collect_events():
+    """
+    Collects change events of the block (e.g. of a request or a celery task) and saves them on transaction commit.
+    The nested blocks add events to the outer one. Events of the failed block are dropped, except the ones
+    of changes saved outside of atomic blocks, which are not rolled back.
+    """
+    collector = get_event_collector()
+    if collector is not None:
+        yield collector
+        return
+
+    collector = _collector_state.collector = EventCollector()
+    failed = True
+    try:
+        yield collector
+        failed = False
+    finally:
+        _collector_state.collector = None
+        if failed:
+            collector.drop_uncommitted()
+        collector.flush() if settings.TESTING_MODE else transaction.on_commit(collector.flush)
+
+
 def send_create_event_signal(events, **kwargs):
     event_ids = [event.id for event in events if event]
-    callback = lambda: _send_create_event_signal.delay(event_ids=event_ids, **kwargs)
+    callback = partial(_send_create_event_signal.delay, event_ids=event_ids, **kwargs)
+    callback() if settings.TESTING_MODE else transaction.on_commit(callback)
+
+
+def send_create_event_signal_in_batches(event_batches):
+    signatures = [
+        _send_create_event_signal.si(event_ids=[event.id for event in events if event])
+        for events in event_batches if events
+    ]
+    if not signatures:
+        return
+    callback = celery.chain(*signatures).delay
     callback() if settings.TESTING_MODE else transaction.on_commit(callback)
 
 
 @app.task()
 def _send_create_event_signal(event_ids, **kwargs):
-    events = Event.objects.filter(id__in=event_ids)
+    # Receivers get the events in the order they were created
+    events = Event.objects.filter(id__in=event_ids).order_by('id')
     for event in events:
         trigger_object_post_processing.send(Event, event=event, **kwargs)
     for event in events:
@@ -0,0 +1,140 @@
+import math
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+import mock
+
+from base.factories import DriverFactory, ManagerFactory
+from driver.celery_tasks import stop_active_orders_of_driver
+from merchant.factories import MerchantFactory
+from reporting.context_managers import track_fields_on_change
+from reporting.models import Event
+from reporting.signals import EventCollector, collect_events, event_created, trigger_object_post_processing
+from tasks.mixins.order_status import OrderStatus
+from tasks.models import Order
+from tasks.tests.factories import OrderFactory
+
+
+class EventCollectorTestCase(TestCase):
+    fixtures = ['fixtures/tests/constance.json', ]
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.merchant = MerchantFactory()
+        cls.manager = ManagerFactory(merchant=cls.merchant)
+        cls.driver = DriverFactory(merchant=cls.merchant)
+        cls.order = OrderFactory(merchant=cls.merchant, manager=cls.manager, driver=None)
+        # Jobs share the customer and the address, so they are created quickly
+        Order.objects.create_in_bulk([
+            Order(merchant=cls.merchant, manager=cls.manager, customer=cls.order.customer,
+                  deliver_address=cls.order.deliver_address, driver=cls.driver, status=OrderStatus.ASSIGNED)
+            for _ in range(1000)
+        ])
+
+    def setUp(self):
+        self.order = Order.objects.get(id=self.order.id)
+
+    def connect_receiver(self, signal):
+        received = []
+
+        def receiver(sender, event, **kwargs):
+            received.append(event.id)
+
+        signal.connect(receiver)
+        self.addCleanup(signal.disconnect, receiver)
+        return received
+
+    def test_events_of_object_are_handled_in_creation_order(self):
+        created = self.connect_receiver(event_created)
+        processed = self.connect_receiver(trigger_object_post_processing)
+
+        # Each event is in own batch, the batches are post processed by chained tasks
+        with mock.patch.object(EventCollector, 'BATCH_SIZE', 1):
+            with collect_events():
+                for title in ('First', 'Second', 'Third'):
+                    with track_fields_on_change(self.order, initiator=self.manager):
+                        self.order.title = title
+                        self.order.save(update_fields=('title',))
+                self.assertFalse(Event.objects.filter(object_id=self.order.id).exists())
+
+        events = Event.objects.filter(object_id=self.order.id, event=Event.MODEL_CHANGED).order_by('id')
+        self.assertEqual([event.obj_dump['new_values']['title'] for event in events], ['First', 'Second', 'Third'])
+        event_ids = [event.id for event in events]
+        self.assertEqual(created, event_ids)
+        self.assertEqual(processed, event_ids)
+
+    def test_nested_blocks_are_saved_with_outer_one(self):
+        with collect_events() as outer_collector:
+            with collect_events() as collector:
+                with track_fields_on_change(self.order, initiator=self.manager):
+                    self.order.title = 'Nested'
+                    self.order.save(update_fields=('title',))
+            self.assertIs(collector, outer_collector)
+            self.assertFalse(Event.objects.filter(object_id=self.order.id).exists())
+        self.assertTrue(Event.objects.filter(object_id=self.order.id).exists())
+
+    def test_events_of_failed_block_are_dropped(self):
+        created = self.connect_receiver(event_created)
+        with self.assertRaises(RuntimeError):
+            with collect_events():
+                with track_fields_on_change(self.order, initiator=self.manager):
+                    self.order.title = 'Failed'
+                    self.order.save(update_fields=('title',))
+                raise RuntimeError()
+        self.assertFalse(Event.objects.filter(object_id=self.order.id).exists())
+        self.assertEqual(created, [])
+
+        with collect_events():
+            with track_fields_on_change(self.order, initiator=self.manager):
+                self.order.title = 'Next'
+                self.order.save(update_fields=('title',))
+        event = Event.objects.get(object_id=self.order.id, event=Event.MODEL_CHANGED)
+        self.assertEqual(event.obj_dump['new_values']['title'], 'Next')
+
+    def test_bulk_status_change_benchmark(self):
+        # Without the collector the task created one insert and one celery task per 50 jobs
+        last_event_id = Event.objects.order_by('id').values_list('id', flat=True).last() or 0
+        with mock.patch('reporting.signals.celery.chain') as chain, CaptureQueriesContext(connection) as queries:
+            stop_active_orders_of_driver(self.driver.id)
+
+        self.assertFalse(Order.objects.filter(driver=self.driver).exists())
+        events_count = Event.objects.filter(id__gt=last_event_id).count()
+        # Model change and status change events of 1000 jobs
+        self.assertGreaterEqual(events_count, 2000)
+        batches_count = math.ceil(events_count / EventCollector.BATCH_SIZE)
+
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "reporting_event"')]
+        self.assertEqual(len(inserts), batches_count)
+        self.assertEqual(chain.call_count, 1)
+        tasks = chain.call_args[0]
+        self.assertEqual(len(tasks), batches_count)
+        self.assertEqual(sum(len(task.kwargs['event_ids']) for task in tasks), events_count)
+
+
+class CommittedEventsTestCase(TransactionTestCase):
+    fixtures = ['fixtures/tests/constance.json', ]
+
+    def test_events_of_committed_changes_are_kept_on_failure(self):
+        merchant = MerchantFactory()
+        manager = ManagerFactory(merchant=merchant)
+        order = OrderFactory(merchant=merchant, manager=manager, driver=None)
+
+        with self.assertRaises(RuntimeError):
+            with collect_events():
+                # Saved in autocommit mode, so the change stays after the failure
+                with track_fields_on_change(order, initiator=manager):
+                    order.title = 'Committed'
+                    order.save(update_fields=('title',))
+                with transaction.atomic():
+                    with track_fields_on_change(order, initiator=manager):
+                        order.title = 'Rolled back'
+                        order.save(update_fields=('title',))
+                    raise RuntimeError()
+
+        order.refresh_from_db()
+        self.assertEqual(order.title, 'Committed')
+        events = Event.objects.filter(object_id=order.id, event=Event.MODEL_CHANGED)
+        self.assertEqual([event.obj_dump['new_values']['title'] for event in events], ['Committed'])
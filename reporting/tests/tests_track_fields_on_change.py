@@ -0,0 +1,88 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+import mock
+
+from base.factories import ManagerFactory
+from merchant.factories import MerchantFactory
+from reporting.context_managers import track_fields_on_change
+from reporting.models import Event
+from reporting.signals import event_created
+from tasks.models import Order
+from tasks.tests.factories import OrderFactory
+
+
+class TrackFieldsOnChangeTestCase(TestCase):
+    fixtures = ['fixtures/tests/constance.json', ]
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.merchant = MerchantFactory()
+        cls.manager = ManagerFactory(merchant=cls.merchant)
+        order = OrderFactory(merchant=cls.merchant, manager=cls.manager, driver=None)
+        # Jobs share the customer and the address, so they are created quickly
+        Order.objects.create_in_bulk([
+            Order(merchant=cls.merchant, manager=cls.manager, customer=order.customer,
+                  deliver_address=order.deliver_address)
+            for _ in range(999)
+        ])
+        cls.order_ids = list(Order.objects.filter(merchant=cls.merchant).order_by('id').values_list('id', flat=True))
+
+    def change_titles(self, count, title):
+        order_ids = self.order_ids[:count]
+        with CaptureQueriesContext(connection) as queries:
+            with track_fields_on_change(Order.objects.filter(id__in=order_ids), initiator=self.manager):
+                Order.objects.filter(id__in=order_ids).update(title=title)
+        return queries
+
+    def test_queries_count_does_not_depend_on_orders_count(self):
+        ContentType.objects.get_for_model(Order, for_concrete_model=False)
+        queries_count = {}
+        with mock.patch('reporting.signals._send_event_saved_signals'), \
+                mock.patch('reporting.signals.send_create_event_signal'):
+            for count in (1, 100, 1000):
+                events = Event.objects.filter(event=Event.MODEL_CHANGED)
+                events_count = events.count()
+                queries_count[count] = len(self.change_titles(count, 'Title {}'.format(count)))
+                self.assertEqual(events.count(), events_count + count)
+        self.assertEqual(queries_count[1], queries_count[100])
+        self.assertEqual(queries_count[1], queries_count[1000])
+
+    def test_events_are_created_in_bulk_with_signals(self):
+        sender = object()
+        orders = list(Order.objects.filter(id__in=self.order_ids[:3]))
+        created_receiver, saved_receiver = mock.Mock(), mock.Mock()
+        event_created.connect(created_receiver)
+        post_save.connect(saved_receiver, sender=Event)
+        self.addCleanup(event_created.disconnect, created_receiver)
+        self.addCleanup(post_save.disconnect, saved_receiver, sender=Event)
+
+        with mock.patch('reporting.signals.send_create_event_signal') as send_create_event_signal:
+            with CaptureQueriesContext(connection) as queries:
+                with track_fields_on_change(orders, initiator=self.manager, sender=sender):
+                    Order.objects.filter(id__in=self.order_ids[:3]).update(title='Changed')
+
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "reporting_event"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual([order.title for order in orders], ['Changed'] * 3)
+
+        events = send_create_event_signal.call_args[0][0]
+        self.assertEqual(send_create_event_signal.call_count, 1)
+        self.assertEqual([event.object for event in events], orders)
+        self.assertTrue(all(event.id and event.created_at == event.happened_at for event in events))
+        self.assertEqual([call[1]['event'] for call in created_receiver.call_args_list], events)
+        self.assertTrue(all(call[1]['sender'] is sender for call in created_receiver.call_args_list))
+        self.assertEqual([call[1]['instance'] for call in saved_receiver.call_args_list], events)
+        self.assertTrue(all(call[1]['created'] for call in saved_receiver.call_args_list))
+
+    def test_instances_without_changes_have_no_events(self):
+        order = Order.objects.get(id=self.order_ids[0])
+        with mock.patch('reporting.signals.send_create_event_signal') as send_create_event_signal:
+            with track_fields_on_change([order], initiator=self.manager):
+                pass
+        self.assertFalse(send_create_event_signal.called)
+        self.assertFalse(Event.objects.filter(object_id=order.id, event=Event.MODEL_CHANGED).exists())
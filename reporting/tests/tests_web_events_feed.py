@@ -0,0 +1,153 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+import mock
+
+from base.factories import DriverFactory, ManagerFactory
+from merchant.factories import MerchantFactory
+from reporting.api.web.views import WebEventViewSet
+from reporting.models import Event
+from reporting.utils.events_feed import MerchantEventsFeed
+from tasks.tests.factories import OrderFactory
+
+
+class WebEventsFeedTestCase(APITestCase):
+    fixtures = ['fixtures/tests/constance.json', ]
+
+    events_url = '/api/web/dev/new-events/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.merchant = MerchantFactory()
+        cls.manager = ManagerFactory(merchant=cls.merchant)
+        cls.driver = DriverFactory(merchant=cls.merchant)
+
+    def setUp(self):
+        self.client.force_authenticate(self.manager)
+        self.expire_snapshot()
+
+    def expire_snapshot(self):
+        cache.delete(MerchantEventsFeed.SNAPSHOT_KEY.format(self.merchant.id))
+
+    def age_snapshot(self):
+        # Snapshot is kept, so the next one is built from it
+        key = MerchantEventsFeed.SNAPSHOT_KEY.format(self.merchant.id)
+        snapshot = cache.get(key)
+        snapshot['events_before'] -= timezone.timedelta(seconds=MerchantEventsFeed.CACHE_TIMEOUT)
+        cache.set(key, snapshot)
+
+    def create_event(self):
+        order = OrderFactory(merchant=self.merchant, manager=self.manager, driver=None)
+        return Event.objects.create(object=order, merchant=self.merchant, event=Event.CREATED, initiator=self.manager)
+
+    def get_events(self, **params):
+        resp = self.client.get(self.events_url, data=params)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return resp.data
+
+    def test_cursor_returns_only_new_events(self):
+        first_events = [self.create_event() for _ in range(2)]
+        data = self.get_events(date_since=(timezone.now() - timezone.timedelta(minutes=1)).isoformat())
+        self.assertEqual([event['object_id'] for event in data['events']],
+                         [event.object_id for event in first_events])
+
+        new_event = self.create_event()
+        # Dashboards polling before the snapshot expires don't query the database
+        with self.assertNumQueries(0):
+            self.assertNotIn('events', self.get_events(cursor=data['cursor']))
+
+        self.expire_snapshot()
+        data = self.get_events(cursor=data['cursor'])
+        self.assertEqual([event['object_id'] for event in data['events']], [new_event.object_id])
+
+        self.expire_snapshot()
+        data = self.get_events(cursor=data['cursor'])
+        self.assertNotIn('events', data)
+
+    def test_snapshot_serializes_only_new_events(self):
+        data = self.get_events(date_since=(timezone.now() - timezone.timedelta(minutes=1)).isoformat())
+        new_event = self.create_event()
+        self.age_snapshot()
+
+        with mock.patch.object(Event.objects, 'prepare_for_list', wraps=Event.objects.prepare_for_list) as prepare:
+            data = self.get_events(cursor=data['cursor'])
+        self.assertEqual([event.id for event in prepare.call_args[0][0]], [new_event.id])
+        self.assertEqual([event['object_id'] for event in data['events']], [new_event.object_id])
+
+    def test_event_committed_late_is_not_skipped(self):
+        cursor = self.get_events()['cursor']
+        # Event is created before the snapshot, but committed after it
+        late_event = self.create_event()
+        Event.objects.filter(id=late_event.id).update(created_at=timezone.now() - timezone.timedelta(seconds=10))
+        self.age_snapshot()
+
+        data = self.get_events(cursor=cursor)
+        self.assertEqual([event['object_id'] for event in data['events']], [late_event.object_id])
+
+    def test_illegal_cursor(self):
+        resp = self.client.get(self.events_url, data={'cursor': 'illegal'})
+        self.assertEqual(resp.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def test_long_poll_waits_for_new_events(self):
+        cursor = self.get_events()['cursor']
+        self.expire_snapshot()
+
+        new_events = []
+
+        def create_event_while_waiting(seconds):
+            new_events.append(self.create_event())
+            self.expire_snapshot()
+
+        with mock.patch('reporting.api.web.views.time.sleep', side_effect=create_event_while_waiting) as sleep:
+            data = self.get_events(cursor=cursor, wait=10)
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual([event['object_id'] for event in data['events']], [new_events[0].object_id])
+
+    def test_long_poll_returns_empty_feed_after_timeout(self):
+        cursor = self.get_events()['cursor']
+        started_at = time.monotonic()
+        data = self.get_events(cursor=cursor, wait=1)
+        self.assertGreaterEqual(time.monotonic() - started_at, 1)
+        self.assertNotIn('events', data)
+
+    @override_settings(WEB_EVENTS_MAX_WAITING=0)
+    def test_long_polls_are_limited(self):
+        cursor = self.get_events()['cursor']
+        with mock.patch('reporting.api.web.views.time.sleep') as sleep:
+            data = self.get_events(cursor=cursor, wait=10)
+        sleep.assert_not_called()
+        self.assertNotIn('events', data)
+
+    def test_concurrent_dashboards_share_one_snapshot(self):
+        dashboards_count = 200
+        query_latency = 0.2
+        builds = []
+        start = threading.Barrier(dashboards_count)
+
+        def build_snapshot(merchant, context, previous=None):
+            builds.append(merchant.id)
+            time.sleep(query_latency)
+            return {'events_before': timezone.now(), 'events': [], 'paths': []}
+
+        def poll(_):
+            start.wait()
+            return WebEventViewSet.feed.get_snapshot(self.merchant, {})
+
+        with mock.patch.object(WebEventViewSet.feed, 'build_snapshot', side_effect=build_snapshot):
+            started_at = time.monotonic()
+            with ThreadPoolExecutor(max_workers=dashboards_count) as executor:
+                snapshots = list(executor.map(poll, range(dashboards_count)))
+            duration = time.monotonic() - started_at
+
+        self.assertEqual(builds, [self.merchant.id])
+        self.assertEqual(len({snapshot['events_before'] for snapshot in snapshots}), 1)
+        self.assertLess(duration, query_latency * 10)
@@ -0,0 +1,120 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from base.models import Member
+from driver.utils import WorkStatus
+from reporting.models import Event
+
+
+class MerchantEventsFeed:
+    """
+    Keeps a snapshot of the latest events and driver paths of the merchant in the cache.
+
+    Dashboards of the merchant polling at the same time are served from the one snapshot, only the first of them
+    queries the database when the snapshot is older than `CACHE_TIMEOUT`. The snapshot is built from the previous
+    one, so only the events appeared since it are serialized.
+
+    Ids of events are allocated before commit, so events are not ordered by ids or creation dates in the order
+    they become visible. Each event of the snapshot keeps the time of the snapshot it was first seen in,
+    dashboards get the events seen after the snapshot of their cursor. Events created during `COMMIT_LAG`
+    before the previous snapshot are queried again, so events committed late are not missed.
+    Snapshot built without the previous one (expired or evicted) takes creation dates of its events instead.
+    """
+    SNAPSHOT_KEY = 'web-events-feed-{}'
+    LOCK_KEY = 'web-events-feed-lock-{}'
+    WAITING_KEY = 'web-events-feed-waiting-{}'
+    CACHE_TIMEOUT = 2
+    COMMIT_LAG = 60
+    LOCK_TIMEOUT = 10
+    # Other dashboards wait for the snapshot queried by the first one, not longer than this
+    LOCK_WAIT = 1
+    LOCK_WAIT_STEP = 0.05
+
+    def __init__(self, period):
+        self.period = period
+
+    def is_fresh(self, snapshot):
+        return snapshot is not None \
+            and snapshot['events_before'] > timezone.now() - timezone.timedelta(seconds=self.CACHE_TIMEOUT)
+
+    def get_snapshot(self, merchant, context):
+        snapshot = cache.get(self.SNAPSHOT_KEY.format(merchant.id))
+        if self.is_fresh(snapshot):
+            return snapshot
+
+        lock_key = self.LOCK_KEY.format(merchant.id)
+        if not cache.add(lock_key, True, timeout=self.LOCK_TIMEOUT):
+            waiting_until = time.monotonic() + self.LOCK_WAIT
+            while time.monotonic() < waiting_until:
+                time.sleep(self.LOCK_WAIT_STEP)
+                new_snapshot = cache.get(self.SNAPSHOT_KEY.format(merchant.id))
+                if self.is_fresh(new_snapshot):
+                    return new_snapshot
+            # The first dashboard is too slow, the snapshot is queried without the lock
+            return self.build_snapshot(merchant, context, snapshot)
+
+        try:
+            snapshot = self.build_snapshot(merchant, context, snapshot)
+            # Snapshot is kept for the whole period, the next one is built from it
+            cache.set(self.SNAPSHOT_KEY.format(merchant.id), snapshot, timeout=self.period.total_seconds())
+        finally:
+            cache.delete(lock_key)
+        return snapshot
+
+    def build_snapshot(self, merchant, context, previous=None):
+        from reporting.api.web.serializers import WebEventSerializer
+
+        events_before = timezone.now()
+        date_since = events_before - self.period
+
+        drivers = Member.all_drivers.all().not_deleted().filter(
+            work_status=WorkStatus.WORKING,
+            merchant=merchant,
+            current_path_updated__gt=date_since,
+            current_path_updated__lte=events_before
+        ).order_by('id').distinct('id')
+        paths = [(driver.current_path_updated, driver.current_path) for driver in drivers if driver.current_path]
+
+        known_events, events_since = [], date_since
+        if previous is not None:
+            known_events = [event for event in previous['events'] if event[2] > date_since]
+            events_since = max(date_since, previous['events_before'] - timezone.timedelta(seconds=self.COMMIT_LAG))
+        known_ids = {event[0] for event in known_events}
+
+        events = Event.objects.last_events(merchant, events_since).filter(created_at__lte=events_before)
+        new_ids = set(events.values_list('id', flat=True)) - known_ids
+        events = Event.objects.prepare_for_list(events.filter(id__in=new_ids)) if new_ids else []
+        events = list(Event.objects.filter_out_without_object(events))
+        events_data = WebEventSerializer(events, many=True, context=context).data
+        new_events = [
+            (event.id, int((event.created_at if previous is None else events_before).timestamp() * 1000),
+             event.created_at, data)
+            for event, data in zip(events, events_data)
+        ]
+
+        return {
+            'events_before': events_before,
+            'events': sorted(known_events + new_events, key=lambda event: (event[2], event[0])),
+            'paths': paths,
+        }
+
+    def acquire_waiting(self, wait):
+        """
+        Takes one of `WEB_EVENTS_MAX_WAITING` slots for the long poll, returns its key or `None` if all are taken.
+        Long polls hold sync workers, so their count is limited. Slots of the crashed requests expire.
+        """
+        keys = [self.WAITING_KEY.format(slot) for slot in range(settings.WEB_EVENTS_MAX_WAITING)]
+        taken = cache.get_many(keys)
+        free = [key for key in keys if key not in taken]
+        random.shuffle(free)
+        for key in free:
+            if cache.add(key, True, timeout=wait + self.LOCK_TIMEOUT):
+                return key
+        return None
+
+    def release_waiting(self, key):
+        cache.delete(key)
@@ -24,7 +24,7 @@ class RORoutesView(TemplateView):
 
     def get_context_data(self, **kwargs):
         route_optimisation = get_object_or_404(RouteOptimisation, id=self.route_optimisation_id)
-        engines = route_optimisation.optimisation_log.log.get('engines')
+        engines = route_optimisation.optimisation_log.log_state.get('engines')
         engines_data = []
         if engines:
             runs: Iterable[EngineRun] = EngineRun.objects.filter(id__in=engines.keys()).order_by('id')
@@ -59,7 +59,7 @@ class ROClusteringView(TemplateView):
 
     def get_context_data(self, **kwargs):
         route_optimisation = get_object_or_404(RouteOptimisation, id=self.route_optimisation_id)
-        engines = route_optimisation.optimisation_log.log.get('engines')
+        engines = route_optimisation.optimisation_log.log_state.get('engines')
         engines_data = []
         if engines:
             runs: Iterable[EngineRun] = EngineRun.objects.filter(id__in=engines.keys()).order_by('id')
@@ -1,3 +1,5 @@
+import struct
+import zlib
 from typing import Optional
 
 from django.core.cache import caches
@@ -7,13 +9,56 @@ import googlemaps.convert
 from route_optimisation.engine.dima import DistanceMatrixCache
 
 
+class DimaCacheEncoder:
+    """
+    Compact format of cached legs.
+    Distance and duration are packed together with version byte and flags into 10 bytes under the leg key.
+    Polyline is compressed and kept under a separate key, so matrix-only reads don't transfer polylines.
+    Legacy pickled dicts are still readable, entries of unknown version are treated as missing.
+    """
+    VERSION = 1
+    ZERO_RESULTS_FLAG = 1
+    leg_struct = struct.Struct('!BBII')
+
+    def __init__(self, cache: 'RadaroDimaCache'):
+        self.dima = cache
+
+    def encode_leg(self, cache_object) -> bytes:
+        if self.dima.is_cache_distance_matrix_zero_result(cache_object):
+            return self.leg_struct.pack(self.VERSION, self.ZERO_RESULTS_FLAG, 0, 0)
+        return self.leg_struct.pack(
+            self.VERSION, 0,
+            cache_object[self.dima.distance_cache_key], cache_object[self.dima.duration_cache_key],
+        )
+
+    def decode_leg(self, value) -> Optional[dict]:
+        if isinstance(value, dict):
+            return value
+        if not isinstance(value, bytes) or len(value) != self.leg_struct.size or value[0] != self.VERSION:
+            return None
+        _, flags, distance, duration = self.leg_struct.unpack(value)
+        if flags & self.ZERO_RESULTS_FLAG:
+            return {self.dima.status_cache_key: 'ZERO_RESULTS'}
+        return {self.dima.distance_cache_key: distance, self.dima.duration_cache_key: duration}
+
+    def encode_polyline(self, polyline: str) -> bytes:
+        return bytes([self.VERSION]) + zlib.compress(polyline.encode('ascii'))
+
+    def decode_polyline(self, value) -> Optional[str]:
+        if not isinstance(value, bytes) or not value or value[0] != self.VERSION:
+            return None
+        return zlib.decompress(value[1:]).decode('ascii')
+
+
 class RadaroDimaCache(DistanceMatrixCache):
     CACHE_TIMEOUT = 24 * 60 * 60  # 1 day
+    POLYLINE_KEY_PREFIX = 'rdr-dimp-'
 
     def __init__(self, polylines=False):
         super().__init__(polylines=polylines)
         self.cache = caches['optimisation']
         self.caching_params = {'timeout': self.CACHE_TIMEOUT}
+        self.encoder = DimaCacheEncoder(self)
 
     def cache_key(self, start, end):
         # Ensure lat/lng is float, not string
@@ -22,14 +67,43 @@ class RadaroDimaCache(DistanceMatrixCache):
         # Cache key will contain encoded start/end locations as polyline
         return 'rdr-dima-%s' % googlemaps.convert.encode_polyline((start, end))
 
+    def polyline_key(self, key):
+        return self.POLYLINE_KEY_PREFIX + key
+
+    def _fetch_cache_objects(self, keys):
+        keys_for_request = list(keys)
+        if self.polylines:
+            keys_for_request += [self.polyline_key(key) for key in keys]
+        cache_result = self.cache.get_many(keys_for_request)
+        result = {}
+        for key in keys:
+            cache_object = self.encoder.decode_leg(cache_result.get(key))
+            if cache_object is None:
+                continue
+            if self.polylines and self.polyline_key(key) in cache_result:
+                polyline = self.encoder.decode_polyline(cache_result[self.polyline_key(key)])
+                if polyline is not None:
+                    cache_object = dict(cache_object, **{self.polyline_cache_key: polyline})
+            result[key] = cache_object
+        return result
+
+    def _store_cache_objects(self, cache_objects):
+        for_cache = {}
+        for key, cache_object in cache_objects.items():
+            # Each leg uses ~10 bytes of value in redis cache, polyline size depends on the leg length
+            for_cache[key] = self.encoder.encode_leg(cache_object)
+            polyline = self.cached_polyline_value(cache_object)
+            if polyline is not None:
+                for_cache[self.polyline_key(key)] = self.encoder.encode_polyline(polyline)
+        self.cache.set_many(for_cache, **self.caching_params)
+
     def _update_cache_after_directions(self, response, points):
         directions = super()._update_cache_after_directions(response, points)
         for_cache = {}
         for direction in directions:
             key = self.cache_key(direction.pop(self.start_point_cache_key), direction.pop(self.end_point_cache_key))
-            # Each key-value pair uses ~160-200 bytes memory of redis cache
             for_cache[key] = direction
-        self.cache.set_many(for_cache, **self.caching_params)
+        self.set_cache_objects(for_cache)
 
     def cached_distance_value(self, cache_object):
         return cache_object[self.distance_cache_key]
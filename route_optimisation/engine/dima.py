@@ -8,17 +8,51 @@ logger = logging.getLogger('radaro-dev')
 
 
 class DistanceMatrixCache:
+    # Keys are fetched from cache in chunks, so one request and its response stay bounded for large matrices
+    FETCH_CHUNK_SIZE = 5000
+
     def __init__(self, polylines=False):
         self.gmaps_client = GoogleClient()
         self.cache = None
         self.caching_params = {}
         self.polylines = polylines
+        # Cache objects already fetched during this run, `None` is kept for keys missing in cache.
+        # Cache is written only through this object, so a key is never fetched twice.
+        self._memo = {}
 
     def cache_key(self, start, end):
         start = '%s,%s' % (start['lat'], start['lng'])
         end = '%s,%s' % (end['lat'], end['lng'])
         return '%s->%s' % (start, end)
 
+    def get_cache_objects(self, keys):
+        keys_to_fetch = list({key for key in keys if key not in self._memo})
+        for chunk_start in range(0, len(keys_to_fetch), self.FETCH_CHUNK_SIZE):
+            chunk = keys_to_fetch[chunk_start:chunk_start + self.FETCH_CHUNK_SIZE]
+            cache_result = self._fetch_cache_objects(chunk)
+            for key in chunk:
+                self._memo[key] = cache_result.get(key)
+        return {key: self._memo[key] for key in keys if self._memo[key] is not None}
+
+    def get_cache_object(self, key):
+        return self.get_cache_objects([key]).get(key)
+
+    def set_cache_objects(self, cache_objects):
+        self._store_cache_objects(cache_objects)
+        self.remember_cache_objects(cache_objects)
+
+    def _fetch_cache_objects(self, keys):
+        return self.cache.get_many(keys)
+
+    def _store_cache_objects(self, cache_objects):
+        self.cache.set_many(cache_objects, **self.caching_params)
+
+    def remember_cache_objects(self, cache_objects):
+        self._memo.update(cache_objects)
+
+    def prefetch(self, pairs_of_locations):
+        self.get_cache_objects([self.cache_key(from_, to_) for from_, to_ in pairs_of_locations])
+
     def single_dima_element(self, origin, destination, *args, **kwargs):
         if self._should_make_distance_matrix_request(origin, destination):
             gmaps_requester = self.gmaps_client.single_dima_element_with_polyline \
@@ -43,7 +77,7 @@ class DistanceMatrixCache:
 
     def get_elements(self, pairs_of_locations, *args, **kwargs):
         keys = [self.cache_key(from_, to_) for from_, to_ in pairs_of_locations]
-        cache_result = self.cache.get_many(keys)
+        cache_result = self.get_cache_objects(keys)
         return [
             self.make_leg_object(cache_result[key])
             if (key in cache_result and self.can_make_leg_object(cache_result[key]))
@@ -52,7 +86,7 @@ class DistanceMatrixCache:
         ]
 
     def get_element(self, from_, to_, *args, **kwargs):
-        cache_result = self.cache.get(self.cache_key(from_, to_))
+        cache_result = self.get_cache_object(self.cache_key(from_, to_))
         if cache_result and self.can_make_leg_object(cache_result):
             return self.make_leg_object(cache_result)
 
@@ -70,7 +104,7 @@ class DistanceMatrixCache:
     def can_make_leg_object(self, cache_object):
         if self.is_cache_distance_matrix_zero_result(cache_object):
             return False
-        if self.polylines and not self.cached_polyline_value(cache_object):
+        if self.polylines and self.cached_polyline_value(cache_object) is None:
             return False
         return True
 
@@ -115,7 +149,7 @@ class DistanceMatrixCache:
         for item in range(len(points) - 1):
             start, end = points[item:item + 2]
             keys.append(self.cache_key(start, end))
-        cache_result = self.cache.get_many(keys)
+        cache_result = self.get_cache_objects(keys)
         if self.polylines:
             for value in cache_result.values():
                 if self.polyline_cache_key not in value:
@@ -139,7 +173,7 @@ class DistanceMatrixCache:
 
     def _make_response_from_cache(self, points):
         keys = [self.cache_key(start, end) for start, end in zip(points[:-1], points[1:])]
-        cached_objects = self.cache.get_many(keys)
+        cached_objects = self.get_cache_objects(keys)
         for cache_object in cached_objects.values():
             if not self.can_make_leg_object(cache_object):
                 return []
@@ -147,7 +181,7 @@ class DistanceMatrixCache:
         return [{'legs': legs}]
 
     def _should_make_distance_matrix_request(self, origin, destination):
-        from_cache = self.cache.get(self.cache_key(origin, destination))
+        from_cache = self.get_cache_object(self.cache_key(origin, destination))
         if from_cache is None:
             return True
         if self.polylines and self.polyline_cache_key not in from_cache:
@@ -166,11 +200,10 @@ class DistanceMatrixCache:
         elif response['status'] == 'ZERO_RESULTS':
             for_cache = {self.status_cache_key: 'ZERO_RESULTS'}
         if for_cache is not None:
-            key = self.cache_key(origin, destination)
-            self.cache.set(key, for_cache, **self.caching_params)
+            self.set_cache_objects({self.cache_key(origin, destination): for_cache})
 
     def _make_response_from_cache_distance_matrix(self, origin, destination):
-        cache_object = self.cache.get(self.cache_key(origin, destination))
+        cache_object = self.get_cache_object(self.cache_key(origin, destination))
         if self.is_cache_distance_matrix_zero_result(cache_object):
             return {'status': 'ZERO_RESULTS'}
         else:
@@ -24,8 +24,14 @@ from route_optimisation.logging.logs.progress import ProgressConst
 
 from ..assignment import BalancedAssignment, MinimizeTimeAssignment
 from ..assignment.base import ORToolsAssignmentBase
-from ..defaults import calc_assignment_time_limit, default_search_time_limit, default_solo_search_time_limit
+from ..defaults import (
+    calc_assignment_time_limit,
+    default_search_time_limit,
+    default_solo_search_time_limit,
+    get_parallel_assignment_workers,
+)
 from .assignment_selector import AssignmentSelector, OneDriverAssignmentSelector
+from .parallel import CollectingEventHandler, can_run_in_processes, restore_assignment, solve_in_processes
 
 
 class OrToolsAssignmentsManager:
@@ -112,6 +118,37 @@ class AssignmentStep(OptimisationAlgorithmStep):
         return self.assignment.planned_inner_steps_count() + 1
 
 
+class ParallelAssignmentSteps(OptimisationAlgorithmStep):
+    """
+    Solves independent assignment steps in worker processes and merges them into the manager in the original order.
+    """
+
+    def __init__(self, steps: List[AssignmentStep], workers: int):
+        self.steps = steps
+        self.workers = workers
+
+    def do(self, manager: OrToolsAssignmentsManager):
+        if not can_run_in_processes():
+            event_handler.dev(EventType.OPTIMISATION_PROCESS, 'Can not solve assignments in parallel')
+            for step in self.steps:
+                step.do(manager)
+            return self.CONTINUE
+
+        assignment_progress_watcher = manager.assignment_progress_watcher(self.steps_count())
+        assignments = [step.assignment for step in self.steps]
+        solutions = solve_in_processes(assignments, self.workers, assignment_progress_watcher.step_passed)
+        for assignment, solution in zip(assignments, solutions):
+            CollectingEventHandler.replay(solution.events)
+            if restore_assignment(assignment, solution):
+                manager.add_successful_assignment(assignment)
+            manager.add_assignment(assignment)
+        assignment_progress_watcher.passed()
+        return self.CONTINUE
+
+    def steps_count(self):
+        return sum(step.steps_count() for step in self.steps)
+
+
 class SimpleAssignmentFoundCheck(OptimisationAlgorithmStep):
     def do(self, manager: OrToolsAssignmentsManager):
         if len(manager.assignments_choices) == 0:
@@ -145,13 +182,15 @@ class OrToolsAlgorithm(AlgorithmBase):
         'GLOBAL_CHEAPEST_ARC',
     )
 
-    def __init__(self, search_time_limit=None, search_time_limit_with_pickup=None, *args, **kwargs):
+    def __init__(self, search_time_limit=None, search_time_limit_with_pickup=None, parallel_workers=None,
+                 *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.search_parameters_list = None
         self.soft_window_search_parameters = None
         self.iterating_search_parameters = None
         self.search_time_limit = search_time_limit
         self.search_time_limit_with_pickup = search_time_limit_with_pickup or search_time_limit
+        self.parallel_workers = parallel_workers if parallel_workers is not None else get_parallel_assignment_workers()
         self.assignments_manager = self.assignment_manager_class()
 
     def assign(self, params: EngineParameters):
@@ -189,10 +228,12 @@ class OrToolsAlgorithm(AlgorithmBase):
     def optimise(self):
         event_handler.dev(EventType.OPTIMISATION_PROCESS, 'Start optimisation')
         steps = self.define_steps()
+        if self.parallel_workers > 1:
+            steps = self.group_parallel_steps(steps)
         self.assignments_manager.set_planned_assignments_count(
             sum(map(
                 lambda _step: _step.steps_count(),
-                filter(lambda _step: isinstance(_step, AssignmentStep), steps)
+                filter(lambda _step: isinstance(_step, (AssignmentStep, ParallelAssignmentSteps)), steps)
             ))
         )
         for step in steps:
@@ -206,6 +247,24 @@ class OrToolsAlgorithm(AlgorithmBase):
     def define_steps(self) -> Iterable[OptimisationAlgorithmStep]:
         raise NotImplementedError()
 
+    def group_parallel_steps(self, steps: Iterable[OptimisationAlgorithmStep]) -> List[OptimisationAlgorithmStep]:
+        # Consecutive assignment steps only read the context, so they can be solved at the same time.
+        # Other steps (e.g. checks of found assignments) stay between groups.
+        result: List[OptimisationAlgorithmStep] = []
+        group: List[AssignmentStep] = []
+        for step in list(steps) + [None]:
+            if isinstance(step, AssignmentStep):
+                group.append(step)
+                continue
+            if len(group) > 1:
+                result.append(ParallelAssignmentSteps(group, self.parallel_workers))
+            else:
+                result.extend(group)
+            group = []
+            if step is not None:
+                result.append(step)
+        return result
+
     def clean(self):
         self.assignments_manager.clean()
         for search_parameters in (self.search_parameters_list or []):
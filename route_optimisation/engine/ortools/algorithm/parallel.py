@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, List, Optional
+
+from route_optimisation.engine.events import EventHandler, event_handler
+from route_optimisation.logging import EventType
+
+from ..assignment.base import ORToolsSimpleAssignment
+
+
+class CollectingEventHandler(EventHandler):
+    """
+    Keeps events of an assignment solved in worker process, so they can be replayed by the real event handler.
+    Progress is not collected, it is reported through the progress queue.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def dev(self, *args, **kwargs):
+        self.events.append(('dev', args, kwargs))
+
+    def dev_msg(self, *args, **kwargs):
+        self.events.append(('dev_msg', args, kwargs))
+
+    def msg(self, *args, **kwargs):
+        self.events.append(('msg', args, kwargs))
+
+    def info(self, *args, **kwargs):
+        self.events.append(('info', args, kwargs))
+
+    def error(self, *args, **kwargs):
+        self.events.append(('error', args, kwargs))
+
+    @staticmethod
+    def replay(events):
+        for method, args, kwargs in events:
+            getattr(event_handler, method)(*args, **kwargs)
+
+
+class QueueProgressWatcher:
+    def __init__(self, progress_queue):
+        self.progress_queue = progress_queue
+
+    def step_passed(self):
+        self.progress_queue.put(1)
+
+    def passed(self):
+        pass
+
+
+class AssignmentSolution:
+    def __init__(self, successful: bool, routes: Optional[List[List[int]]], events: list,
+                 model_state: Optional[dict] = None, objective_value: Optional[int] = None):
+        self.successful = successful
+        self.routes = routes
+        self.events = events
+        self.model_state = model_state
+        self.objective_value = objective_value
+
+
+# Assignments and progress queue are inherited by forked worker processes.
+# Only step index is sent to the worker and only routes, state of the model and collected events are sent back.
+_forked_assignments: List[ORToolsSimpleAssignment] = []
+_forked_progress_queue = None
+_parent_pid = None
+_parent_watcher = None
+
+
+def _exit_with_parent(parent_pid):
+    # Workers are not left when the parent is killed, e.g. by the time limit of celery task
+    while os.getppid() == parent_pid:
+        time.sleep(1)
+    os._exit(1)
+
+
+def _solve_forked_assignment(assignment_index) -> AssignmentSolution:
+    global _parent_watcher
+    if _parent_watcher is None:
+        _parent_watcher = threading.Thread(target=_exit_with_parent, args=(_parent_pid,), daemon=True)
+        _parent_watcher.start()
+
+    assignment = _forked_assignments[assignment_index]
+    collector = CollectingEventHandler()
+    event_handler.set_handler(collector)
+    successful = assignment.make_assignment(QueueProgressWatcher(_forked_progress_queue))
+    if not successful:
+        return AssignmentSolution(successful, None, collector.events)
+    return AssignmentSolution(successful, assignment.to_routes(), collector.events,
+                              assignment.get_model_state(), assignment.assignment.ObjectiveValue())
+
+
+def can_run_in_processes():
+    # Worker processes of ProcessPoolExecutor are started with the default start method
+    if multiprocessing.get_start_method() != 'fork':
+        return False
+    # Daemonic processes (e.g. prefork celery workers) are not allowed to have children.
+    return not multiprocessing.current_process().daemon
+
+
+def solve_in_processes(assignments: List[ORToolsSimpleAssignment], workers: int,
+                       on_step_passed: Callable[[], None]) -> List[AssignmentSolution]:
+    global _forked_assignments, _forked_progress_queue, _parent_pid
+
+    _forked_assignments, _forked_progress_queue, _parent_pid = assignments, multiprocessing.Queue(), os.getpid()
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(assignments))) as executor:
+            futures = [executor.submit(_solve_forked_assignment, index) for index in range(len(assignments))]
+            not_done = set(futures)
+            while not_done:
+                _, not_done = wait(not_done, timeout=0.5, return_when=FIRST_COMPLETED)
+                _drain_progress_queue(_forked_progress_queue, on_step_passed)
+            _drain_progress_queue(_forked_progress_queue, on_step_passed)
+            return [future.result() for future in futures]
+    finally:
+        _forked_assignments, _forked_progress_queue, _parent_pid = [], None, None
+
+
+def _drain_progress_queue(progress_queue, on_step_passed):
+    while True:
+        try:
+            progress_queue.get_nowait()
+        except queue.Empty:
+            return
+        on_step_passed()
+
+
+def restore_assignment(assignment: ORToolsSimpleAssignment, solution: AssignmentSolution) -> bool:
+    if not solution.successful:
+        return False
+    if not assignment.restore_assignment(solution.model_state, solution.routes):
+        return False
+    if assignment.assignment.ObjectiveValue() != solution.objective_value:
+        event_handler.dev(EventType.OPTIMISATION_PROCESS,
+                          f'Restored assignment cost {assignment.assignment.ObjectiveValue()} differs from '
+                          f'solved in worker {solution.objective_value}')
+    return True
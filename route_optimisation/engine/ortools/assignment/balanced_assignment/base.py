@@ -9,3 +9,6 @@ class BalancedAssignmentIteratingBase(IteratingAssignment, ABC):
         super().__init__(search_parameters, *args, **kwargs)
         self.route_balancing_allowed_diff = route_balancing_allowed_diff
         self.temp_vehicle_end_times = [None] * len(current_context.vehicles)
+
+    def get_model_state(self):
+        return {**super().get_model_state(), 'temp_vehicle_end_times': self.temp_vehicle_end_times}
@@ -177,25 +177,20 @@ class ORToolsAssignmentBase(AssignmentBase):
                 routing.AddDisjunction([manager.NodeToIndex(order_node)], constants.PENALTY_FOR_SKIP)
 
     def set_cost_function_for_all_vehicles(self, routing, manager):
-        cost_evaluator_callbacks = [partial(current_context.time_callback, i)
-                                    for i in range(current_context.num_vehicles)]
-        cost_evaluator_callbacks = [partial(self.index_to_node_decorator, manager, cb)
-                                    for cb in cost_evaluator_callbacks]
-        for i, cb in zip(range(current_context.num_vehicles), cost_evaluator_callbacks):
-            distance_callback_index = routing.RegisterTransitCallback(cb)
+        cost_evaluator_indices = self.register_vehicles_transit_matrices(
+            routing, manager, current_context.TRANSIT_TIME
+        )
+        for i, distance_callback_index in enumerate(cost_evaluator_indices):
             routing.SetArcCostEvaluatorOfVehicle(distance_callback_index, i)
 
     def add_time_dimension(self, routing, manager):
-        time_callbacks = [partial(current_context.time_callback, i) for i in range(current_context.num_vehicles)]
-        time_callbacks = [partial(self.index_to_node_decorator, manager, cb) for cb in time_callbacks]
-        time_callback_indices = [routing.RegisterTransitCallback(cb) for cb in time_callbacks]
+        time_callback_indices = self.register_vehicles_transit_matrices(routing, manager, current_context.TRANSIT_TIME)
         routing.AddDimensionWithVehicleTransits(time_callback_indices, constants.TWO_DAYS, constants.TWO_DAYS, False,
                                                 self.TIME_DIMENSION)
         if current_context.have_driver_breaks:
-            time_callbacks_sf = [partial(current_context.time_callback_service_first, i)
-                                 for i in range(current_context.num_vehicles)]
-            time_callbacks_sf = [partial(self.index_to_node_decorator, manager, cb) for cb in time_callbacks_sf]
-            time_callbacks_sf_indices = [routing.RegisterTransitCallback(cb) for cb in time_callbacks_sf]
+            time_callbacks_sf_indices = self.register_vehicles_transit_matrices(
+                routing, manager, current_context.TRANSIT_TIME_SERVICE_FIRST
+            )
             routing.AddDimensionWithVehicleTransits(
                 time_callbacks_sf_indices, constants.TWO_DAYS, constants.TWO_DAYS,
                 False, self.TIME_DIMENSION_SERVICE_FIRST
@@ -235,8 +230,15 @@ class ORToolsAssignmentBase(AssignmentBase):
             solver.Add(slack_var == slack_var_sf)
 
     def add_capacity_dimension(self, routing, manager):
-        capacity_callback = partial(self.index_to_node_decorator, manager, current_context.capacity_callback)
-        capacity_callback_index = routing.RegisterTransitCallback(capacity_callback)
+        # Unary transit is the demand of the node the vehicle leaves, so cumul of the node is the load
+        # before the node is served
+        demands = current_context.get_capacity_demands()
+        if hasattr(routing, 'RegisterUnaryTransitVector'):
+            capacity_callback_index = routing.RegisterUnaryTransitVector(demands)
+        else:
+            capacity_callback_index = routing.RegisterUnaryTransitCallback(
+                partial(self.unary_transit_value, manager, demands)
+            )
         routing.AddDimensionWithVehicleCapacity(
             capacity_callback_index, 0, current_context.vehicle_capacities, False, self.CAPACITY_DIMENSION
         )
@@ -248,6 +250,29 @@ class ORToolsAssignmentBase(AssignmentBase):
             routing.AddPickupAndDelivery(pickup_index, delivery_index)
             routing.solver().Add(routing.VehicleVar(pickup_index) == routing.VehicleVar(delivery_index))
 
+    def register_vehicles_transit_matrices(self, routing, manager, kind):
+        # Vehicles sharing one transit matrix share one registered callback too.
+        registered, callback_indices = {}, []
+        for i in range(current_context.num_vehicles):
+            transit_matrix = current_context.get_transit_matrix(kind, i)
+            if id(transit_matrix) not in registered:
+                registered[id(transit_matrix)] = self.register_transit_matrix(routing, manager, transit_matrix)
+            callback_indices.append(registered[id(transit_matrix)])
+        return callback_indices
+
+    def register_transit_matrix(self, routing, manager, transit_matrix):
+        if hasattr(routing, 'RegisterTransitMatrix'):
+            return routing.RegisterTransitMatrix(transit_matrix)
+        return routing.RegisterTransitCallback(partial(self.transit_matrix_value, manager, transit_matrix))
+
+    @staticmethod
+    def transit_matrix_value(manager, transit_matrix, from_index, to_index):
+        return transit_matrix[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+
+    @staticmethod
+    def unary_transit_value(manager, values, from_index):
+        return values[manager.IndexToNode(from_index)]
+
     def index_to_node_decorator(self, manager, callback, from_index, to_index):
         from_node = manager.IndexToNode(from_index)
         to_node = manager.IndexToNode(to_index)
@@ -306,10 +331,33 @@ class ORToolsSimpleAssignment(ORToolsAssignmentBase):
     def __init__(self, search_parameters, *args, **kwargs):
         super().__init__(search_parameters, *args, **kwargs)
         self.driver_start_upper_bound_coefficient = 1
+        self.locked_routes = None
+
+    def setup(self):
+        self.locked_routes = None
+        super().setup()
 
     def make_assignment(self, assignment_progress_watcher):
         return super(ORToolsSimpleAssignment, self).make_assignment()
 
+    def get_model_state(self):
+        # State of the assignment the routing model is set up from, besides the context
+        return {'locked_routes': self.locked_routes}
+
+    def restore_assignment(self, model_state, routes):
+        """
+        Sets up the routing model as it was when the routes were solved (e.g. in other process)
+        and reads the assignment from the routes, so the cumuls and costs are the same.
+        """
+        for key, value in model_state.items():
+            setattr(self, key, value)
+        locked_routes = self.locked_routes
+        self.setup()
+        if locked_routes is not None:
+            self.lock_drivers_orders(self.routing_model, locked_routes)
+        self.assignment = self.routing_model.ReadAssignmentFromRoutes(routes, False)
+        return self.assignment is not None
+
     def customize_routing_model(self):
         super().customize_routing_model()
         time_dimension = self.routing_model.GetDimensionOrDie(self.TIME_DIMENSION)
@@ -357,6 +405,7 @@ class ORToolsSimpleAssignment(ORToolsAssignmentBase):
                                                      self.driver_start_upper_bound_coefficient)
 
     def lock_drivers_orders(self, routing, routes):
+        self.locked_routes = [list(route) for route in routes]
         for vehicle_idx, route in enumerate(routes):
             for order_index in route:
                 routing.VehicleVar(order_index).SetValues([-1, vehicle_idx])
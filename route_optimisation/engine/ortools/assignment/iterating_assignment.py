@@ -91,6 +91,9 @@ class IteratingAssignment(ORToolsSimpleAssignment):
     def get_iterations_count(self):
         raise NotImplementedError()
 
+    def get_model_state(self):
+        return {**super().get_model_state(), 'current_iteration': self.current_iteration}
+
     def planned_inner_steps_count(self):
         return self.get_iterations_count() + 1
 
@@ -232,13 +232,15 @@ class OrToolsAssignmentResult(ORToolsAssignmentParser):
     def _get_node_info(self, index, last=False):
         time_var = self.time_dimension.CumulVar(index)
         time_start = self.base.assignment.Min(time_var)
+        node = self.base.routing_manager.IndexToNode(index)
         capacity_var = self.capacity_dimension.CumulVar(index)
-        capacity = self.base.assignment.Min(capacity_var)
+        # Cumul is the load before the node, utilized capacity is the load after the node is served
+        capacity = self.base.assignment.Min(capacity_var) + current_context.get_capacity_demands()[node]
         driver_break_interval = 0
         if current_context.have_driver_breaks and not last:
             time_slack_var = self.time_dimension.SlackVar(index)
             driver_break_interval = self.base.assignment.Min(time_slack_var)
-        return NodeInfo(self.base.routing_manager.IndexToNode(index), time_start, capacity, driver_break_interval)
+        return NodeInfo(node, time_start, capacity, driver_break_interval)
 
     def _get_tour_points(self, vehicle_nbr, nodes_sequence: List[NodeInfo]) -> List[Point]:
         tour_points = []
@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
 from typing import List, Optional, Tuple
 
+import numpy as np
+
 from route_optimisation.engine.base_classes.parameters import EngineParameters
 from route_optimisation.engine.events import event_handler
 from route_optimisation.engine.ortools import constants
@@ -15,11 +17,15 @@ from route_optimisation.engine.ortools.context.init import (
     VehicleInit,
     VehiclesRelatedVariables,
 )
+from route_optimisation.engine.ortools.distance_matrix import DenseDistanceMatrix
 from route_optimisation.engine.ortools.helper_classes import Delivery, FakeDepot, JobSite, Pickup, SiteBase, Vehicle
 from route_optimisation.logging import EventType
 
 
 class BaseAssignmentContext:
+    TRANSIT_TIME = 'time'
+    TRANSIT_TIME_SERVICE_FIRST = 'time_service_first'
+
     initials = None
 
     def __init__(self, parameters):
@@ -82,6 +88,8 @@ class BaseAssignmentContext:
             return 0
         if to_node >= len(self.sites):
             order = self.orders[to_node - len(self.sites)]
+            if order.capacity is None:
+                raise ValueError('Capacity of {} is unknown'.format(order.unique_id))
             if isinstance(order, Pickup):
                 return order.capacity
             return -1*order.capacity
@@ -97,7 +105,43 @@ class BaseAssignmentContext:
             int(order_deliver_before_time_delta.total_seconds())
 
     def get_matrix_value(self, from_node, to_node, field):
-        return self.matrix[(self.points[from_node].location, self.points[to_node].location)][field]
+        return self.matrix.get_value(self.points_matrix_indices[from_node], self.points_matrix_indices[to_node], field)
+
+    def get_transit_matrix(self, kind, vehicle_index=None) -> List[List[int]]:
+        """
+        Precomputed values of callbacks for all pairs of nodes, so solver doesn't call python code for each arc.
+        Vehicles with the same start and end sites share one matrix.
+        """
+        key = (kind, self.start_locations[vehicle_index], self.end_locations[vehicle_index])
+        if key not in self.transit_matrices:
+            self.transit_matrices[key] = self._build_time_transit_matrix(kind, vehicle_index)
+        return self.transit_matrices[key]
+
+    def get_capacity_demands(self) -> List[int]:
+        """
+        Capacity depends only on the visited node, so it is registered as a unary transit of the node.
+        """
+        if self.capacity_demands is None:
+            self.capacity_demands = [self.Capacity(None, node) for node in range(self.num_locations)]
+        return self.capacity_demands
+
+    def _build_time_transit_matrix(self, kind, vehicle_index):
+        matrix_indices = [index if index is not None else 0 for index in self.points_matrix_indices]
+        transit = self.matrix.durations[np.ix_(matrix_indices, matrix_indices)].astype(np.int64)
+        if self.fake_depot_node_id is not None:
+            fake_depot = self.fake_depot_node_id
+            # Same as `check_sites`
+            transit[fake_depot, :] = 0 if fake_depot == self.start_locations[vehicle_index] \
+                else constants.PENALTY_FOR_WRONG_DEPOT
+            transit[:, fake_depot] = 0 if fake_depot == self.end_locations[vehicle_index] \
+                else constants.PENALTY_FOR_WRONG_DEPOT
+        service = np.array([self.ServiceTime(vehicle_index, node, node) for node in range(self.num_locations)],
+                           dtype=np.int64)
+        if kind == self.TRANSIT_TIME:
+            transit += service[np.newaxis, :]
+        else:
+            transit += service[:, np.newaxis]
+        return transit.tolist()
 
     def check_sites(self, vehicle_index, from_node, to_node):
         val = None
@@ -165,7 +209,10 @@ class BaseAssignmentContext:
         self.end_locations: List = []
         self.service_time: int = 0
         self.pickup_service_time: int = 0
-        self.matrix: dict = {}
+        self.matrix: Optional[DenseDistanceMatrix] = None
+        self.points_matrix_indices: List[Optional[int]] = []
+        self.transit_matrices: dict = {}
+        self.capacity_demands: Optional[List[int]] = None
 
     def _log_params(self, parameters: EngineParameters):
         event_handler.dev(
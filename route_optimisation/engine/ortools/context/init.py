@@ -236,6 +236,7 @@ class DistanceMatrixInit(ContextInitializer):
         self._handle_locations(ctx)
         self._build(ctx)
         self._clean_points(ctx)
+        self._set_points_matrix_indices(ctx)
         event_handler.progress(stage=ProgressConst.DISTANCE_MATRIX)
 
     def _handle_locations(self, ctx):
@@ -248,7 +249,7 @@ class DistanceMatrixInit(ContextInitializer):
     def _build(self, ctx):
         self.builder = DistanceMatrixBuilder(self.locations)
         self.builder.build_via_directions_api()
-        ctx.matrix = self.builder.matrix
+        ctx.matrix = self.builder.dense_matrix
 
     def _clean_points(self, ctx):
         components = self.builder.components
@@ -277,6 +278,14 @@ class DistanceMatrixInit(ContextInitializer):
                 not_accessible_orders.append(p)
         ctx.handle_not_accessible_orders(not_accessible_orders)
 
+    @staticmethod
+    def _set_points_matrix_indices(ctx):
+        ctx.transit_matrices = {}
+        ctx.capacity_demands = None
+        ctx.points_matrix_indices = [
+            None if isinstance(point, FakeDepot) else ctx.matrix.index_of(point.location) for point in ctx.points
+        ]
+
 
 class LocationPointMap(defaultdict):
     def __init__(self):
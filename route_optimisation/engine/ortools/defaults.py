@@ -53,6 +53,10 @@ def get_max_assignment_time_limit():
     return getattr(settings, 'ORTOOLS_MAX_ASSIGNMENT_TIME_LIMIT', MAX_ASSIGNMENT_TIME_LIMIT)
 
 
+def get_parallel_assignment_workers():
+    return getattr(settings, 'ORTOOLS_PARALLEL_ASSIGNMENT_WORKERS', 0)
+
+
 def calc_assignment_time_limit(algorithms_count=1):
     orders_points_count = len(current_context.orders)  # pickup and delivery points count
     if orders_points_count <= ORDERS_LIMIT_FOR_CONSTANT_ASSIGNMENT_TIME_LIMIT:
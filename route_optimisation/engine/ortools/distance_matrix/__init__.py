@@ -1,3 +1,3 @@
 from .builder import DistanceMatrixBuilder
-from .matrix import DistanceMatrix, hash_locations_to_str
+from .matrix import DenseDistanceMatrix, DistanceMatrix, hash_locations_to_str
 from .utils import LocationsList
@@ -10,7 +10,7 @@ from route_optimisation.engine.events import event_handler
 
 from .component import DistanceMatrixComponent
 from .graph import Graph
-from .matrix import DistanceMatrix
+from .matrix import DenseDistanceMatrix, DistanceMatrix
 from .utils import EnsureEventLoopExists, LocationsList, take_matrix_value
 
 
@@ -145,6 +145,10 @@ class DistanceMatrixBuilder(object):
         vertices = list(set(chain_of_indexes))
         graph = Graph.completed_undirected_graph(vertices)
         component_map = {vertex: vertex for vertex in vertices}
+        dima_cache.prefetch([
+            (self.locations[from_vertex], self.locations[to_vertex])
+            for from_vertex, to_vertex in map(sorted, graph.edges_gen())
+        ])
         while graph.has_edges:
             for from_vertex, to_vertex in graph.edges_gen():
                 from_vertex, to_vertex = sorted([from_vertex, to_vertex])
@@ -176,6 +180,10 @@ class DistanceMatrixBuilder(object):
     def matrix(self):
         return self._merge_matrices()
 
+    @property
+    def dense_matrix(self) -> DenseDistanceMatrix:
+        return DenseDistanceMatrix.from_distance_matrix(self.locations, self._merge_matrices())
+
     def _merge_matrices(self):
         result = {}
         for component in self.components:
@@ -1,7 +1,6 @@
 import asyncio
 import itertools
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
 from operator import itemgetter
 
 import googlemaps.exceptions
@@ -10,6 +9,7 @@ from route_optimisation.engine.dima import dima_cache, set_dima_cache
 from route_optimisation.engine.ortools.distance_matrix.matrix import DistanceMatrix
 from route_optimisation.engine.ortools.distance_matrix.utils import LocationsList, take_matrix_value
 from routing.google import GoogleClient, merchant_registry
+from routing.google.transport import get_transport
 
 
 class DistanceMatrixComponent(object):
@@ -63,19 +63,22 @@ class DistanceMatrixComponent(object):
     async def fill_distance_matrix(self):
         merchant = merchant_registry.get_merchant()
         dima_cache_obj = dima_cache.get_handler()
-        with ThreadPoolExecutor(max_workers=20) as executor:
-            loop = asyncio.get_event_loop()
-            tasks = [
-                loop.run_in_executor(
-                    executor, self._fill_distance_matrix_with_merchant, chain_of_indexes, merchant, dima_cache_obj,
-                )
-                for chain_of_indexes in self._get_route_chains()
-            ]
-            for res in await asyncio.gather(*tasks):
-                if res[0] is False:
-                    self.failed_indexes.append(res[1])
+        executor = get_transport().executor
+        loop = asyncio.get_event_loop()
+        tasks = [
+            loop.run_in_executor(
+                executor, self._fill_distance_matrix_with_merchant, chain_of_indexes, merchant, dima_cache_obj,
+            )
+            for chain_of_indexes in self._get_route_chains()
+        ]
+        for res in await asyncio.gather(*tasks):
+            if res[0] is False:
+                self.failed_indexes.append(res[1])
 
     def from_cache(self):
+        dima_cache.prefetch([
+            (self.locations[from_], self.locations[to_]) for from_, to_ in self.base_graph.edges_gen()
+        ])
         for chain_of_indexes in self._get_route_chains(max_chain_length=100):
             chain_of_points = self.locations.filter_from_indices(chain_of_indexes)
             pairs_of_points = []
@@ -116,7 +119,7 @@ class DistanceMatrixComponent(object):
         return elem is not None and elem['status'] == 'OK'
 
     def get_used_locations(self):
-        return [location for i, location in enumerate(self.locations) if i in self.base_graph.all_vertices]
+        return [location for i, location in enumerate(self.locations) if self.base_graph.has_vertex(i)]
 
     def find_most_failed_indexes(self, take_n_first=27):
         fails_counter = defaultdict(int)
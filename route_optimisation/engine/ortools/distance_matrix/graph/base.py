@@ -1,19 +1,37 @@
-import copy
-from collections import defaultdict
-
-
 class Graph(object):
+    # Adjacency is kept in dicts used as ordered sets: O(1) add/remove of edges with stable walking order.
+
     def __init__(self, directed=False, vertices_indexes=None):
         self.directed = directed
-        self.graph = defaultdict(list)
+        self.graph = {}
+        self._edges_count = 0
+        self._all_vertices = None
         for idx in (vertices_indexes or []):
-            self.graph[idx] = []
+            self._adjacency(idx)
+
+    def _adjacency(self, vertex):
+        if vertex not in self.graph:
+            self.graph[vertex] = {}
+            self._all_vertices = None
+        return self.graph[vertex]
+
+    def _add_arc(self, u, v):
+        adjacency = self._adjacency(u)
+        self._adjacency(v)
+        if v not in adjacency:
+            adjacency[v] = None
+            self._edges_count += 1
+
+    def _remove_arc(self, u, v):
+        adjacency = self.graph.get(u)
+        if adjacency is not None and v in adjacency:
+            del adjacency[v]
+            self._edges_count -= 1
 
     def add_edge(self, u, v):
-        if v not in self.graph[u]:
-            self.graph[u].append(v)
-        if not self.directed and u not in self.graph[v]:
-            self.graph[v].append(u)
+        self._add_arc(u, v)
+        if not self.directed:
+            self._add_arc(v, u)
 
     def add_full_edge(self, u, v):
         self.add_edge(u, v)
@@ -21,15 +39,19 @@ class Graph(object):
             self.add_edge(v, u)
 
     def remove_edge(self, u, v):
-        if v in self.graph[u]:
-            self.graph[u].remove(v)
-        if not self.directed and u in self.graph[v]:
-            self.graph[v].remove(u)
+        self._remove_arc(u, v)
+        if not self.directed:
+            self._remove_arc(v, u)
+
+    def has_edge(self, u, v):
+        return v in self.graph.get(u, ())
 
     def edges_gen(self):
-        for src in self.graph:
-            for dest in self.graph[src]:
-                yield src, dest
+        # Edges removed by the caller while iterating are skipped.
+        for src in list(self.graph):
+            for dest in list(self.graph.get(src, ())):
+                if self.has_edge(src, dest):
+                    yield src, dest
 
     def add_vertex(self, vertex_index):
         for v in self.all_vertices:
@@ -40,33 +62,43 @@ class Graph(object):
             self.add_vertex(vertex)
 
     def remove_vertex(self, vertex_index):
-        if vertex_index in self.graph:
-            del self.graph[vertex_index]
-        for k in self.graph:
-            if vertex_index in self.graph[k]:
-                self.graph[k].remove(vertex_index)
+        if vertex_index not in self.graph:
+            return
+        adjacency = self.graph.pop(vertex_index)
+        self._edges_count -= len(adjacency)
+        self._all_vertices = None
+        # Undirected graph is symmetric, so only neighbours can have edges to the vertex
+        sources = adjacency if not self.directed else list(self.graph)
+        for k in sources:
+            self._remove_arc(k, vertex_index)
 
     def remove_vertices(self, vertices):
         for vertex in vertices:
             self.remove_vertex(vertex)
 
+    def has_vertex(self, vertex):
+        return vertex in self.graph
+
     @property
     def all_vertices(self):
-        all_vertices = set(self.graph.keys())
-        for v in self.graph.values():
-            all_vertices.update(v)
-        return list(all_vertices)
+        # Cached until the set of vertices is changed, should not be modified by the caller
+        if self._all_vertices is None:
+            self._all_vertices = sorted(self.graph)
+        return self._all_vertices
 
     @property
     def has_edges(self):
-        for key in self.graph:
-            if self.graph[key]:
-                return True
-        return False
+        return self._edges_count > 0
 
     @property
     def edges_count(self):
-        return sum(map(len, self.graph.values()))
+        return self._edges_count
+
+    def copy(self):
+        graph = Graph(directed=self.directed)
+        graph.graph = {vertex: dict(adjacency) for vertex, adjacency in self.graph.items()}
+        graph._edges_count = self._edges_count
+        return graph
 
     @staticmethod
     def completed_directed_graph(vertices_indexes):
@@ -95,18 +127,16 @@ class Graph(object):
         return graph
 
     def walk_vertices(self):
-        self_copy = copy.deepcopy(self)
         from .graph_walk import GraphWalker
-        yield from GraphWalker(self_copy).walk()
+        yield from GraphWalker(self.copy()).walk()
 
     def join_vertices_in_one_vertex(self, vertex1, vertex2):
-        new_graph = Graph(directed=False)
-        for key in self.graph:
-            if key in (vertex1, vertex2):
-                continue
-            for dest in self.graph[key]:
-                if dest not in (vertex1, vertex2):
-                    new_graph.add_edge(key, dest)
-            if vertex1 in self.graph[key] and vertex2 in self.graph[key]:
-                new_graph.add_edge(key, vertex1)
-        return new_graph
+        # Joined vertex keeps only edges to vertices connected with both of the vertices.
+        # Graph is changed in place and returned.
+        common = set(self.graph.get(vertex1, ())).intersection(self.graph.get(vertex2, ()))
+        common.difference_update((vertex1, vertex2))
+        self.remove_vertex(vertex2)
+        for dest in list(self.graph.get(vertex1, ())):
+            if dest not in common:
+                self.remove_edge(vertex1, dest)
+        return self
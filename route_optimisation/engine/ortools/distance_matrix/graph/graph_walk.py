@@ -1,4 +1,3 @@
-import copy
 from collections import deque
 
 from .base import Graph
@@ -8,6 +7,7 @@ class EulerPath:
     def __init__(self, graph: Graph, start_vertex=None):
         self.graph = graph
         self.start_vertex = self._find_start_vertex() if start_vertex is None else start_vertex
+        self.used_edges = set()
 
     def _find_start_vertex(self):
         graph_dict = self.graph.graph
@@ -23,6 +23,9 @@ class EulerPath:
             for u in self.graph.graph[w]:
                 s.append(u)
                 self.graph.remove_edge(w, u)
+                self.used_edges.add((w, u))
+                if not self.graph.directed:
+                    self.used_edges.add((u, w))
                 break
             if w == s[-1]:
                 path.append(s.pop())
@@ -47,23 +50,27 @@ class GraphWalker:
             last_edges_count = self._check_decreasing_edges_count(last_edges_count)
 
     def walk_path(self):
-        graph_copy = copy.deepcopy(self.graph)
-        euler_path = EulerPath(self.graph).build()
+        euler_path_builder = EulerPath(self.graph)
+        euler_path = euler_path_builder.build()
         if len(euler_path) == 0:
             return
         for point in euler_path:
             if self._skip_point(point):
                 continue
-            yield from self._fix_possible_bad_euler_path(point, graph_copy)
+            yield from self._fix_possible_bad_euler_path(point, euler_path_builder.used_edges)
             yield from self._return_point(point)
 
     def _skip_point(self, point):
         return point == self.history[-1]
 
-    def _fix_possible_bad_euler_path(self, point, graph_copy):
+    def _had_edge(self, u, v, used_edges):
+        # Edge existed before the current path was built
+        return self.graph.has_edge(u, v) or (u, v) in used_edges
+
+    def _fix_possible_bad_euler_path(self, point, used_edges):
         if self.history[-2] is not None and self.history[-1] is not None:
-            no_edge_from_previous_point = point not in graph_copy.graph.get(self.history[-1])
-            exists_edge_from_before_last = point in graph_copy.graph.get(self.history[-2])
+            no_edge_from_previous_point = not self._had_edge(self.history[-1], point, used_edges)
+            exists_edge_from_before_last = self._had_edge(self.history[-2], point, used_edges)
             if no_edge_from_previous_point and exists_edge_from_before_last:
                 yield from self._return_point(self.history[-2])
 
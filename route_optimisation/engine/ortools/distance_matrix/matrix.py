@@ -1,3 +1,8 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+
 def hash_locations(from_, to_):
     """ Hash locations string from one point to second point.
     :type from_: dict
@@ -42,3 +47,84 @@ class DistanceMatrix(dict):
 
     def get(self, k, d=None):
         return super(DistanceMatrix, self).get(self._transform_key(k), d)
+
+
+def location_key(location):
+    """ String key of location.
+    :type location: dict
+    """
+    return '{},{}'.format(*location.values())
+
+
+class DenseDistanceMatrix(Mapping):
+    """Distance matrix addressed by indexes of locations.
+
+    Durations and distances are kept in two int32 arrays, polylines are kept in a separate dictionary.
+    Can be also used as read-only `DistanceMatrix`:
+
+        >>> point_a = {'lat': '27.535353', 'lng': '53.272727'}
+        >>> point_b = {'lat': '27.511111', 'lng': '53.299999'}
+        >>> matrix = DenseDistanceMatrix([point_a, point_b])
+        >>> matrix.set_value(0, 1, {'duration': 1, 'distance': 2})
+        >>> print(matrix.get_value(0, 1, 'duration'), matrix[(point_a, point_b)])
+        1 {'duration': 1, 'distance': 2}
+    """
+    NO_VALUE = -1
+
+    def __init__(self, locations):
+        self.locations = list(locations)
+        self.location_indices = {location_key(location): i for i, location in enumerate(self.locations)}
+        size = len(self.locations)
+        self.durations = np.full((size, size), self.NO_VALUE, dtype=np.int32)
+        self.distances = np.full((size, size), self.NO_VALUE, dtype=np.int32)
+        self.polylines = {}
+        self._fields = {'duration': self.durations, 'distance': self.distances}
+
+    @classmethod
+    def from_distance_matrix(cls, locations, matrix):
+        dense_matrix = cls(locations)
+        for i, from_ in enumerate(dense_matrix.locations):
+            for j, to_ in enumerate(dense_matrix.locations):
+                value = matrix.get((from_, to_))
+                if value:
+                    dense_matrix.set_value(i, j, value)
+        return dense_matrix
+
+    def index_of(self, location):
+        return self.location_indices.get(location_key(location))
+
+    def set_value(self, from_index, to_index, value):
+        self.durations[from_index, to_index] = value['duration']
+        self.distances[from_index, to_index] = value['distance']
+        if value.get('polyline'):
+            self.polylines[(from_index, to_index)] = value['polyline']
+
+    def get_value(self, from_index, to_index, field):
+        value = self._fields[field].item(from_index, to_index)
+        if value == self.NO_VALUE:
+            raise KeyError((from_index, to_index))
+        return value
+
+    def _get_indices(self, key):
+        from_, to_ = key
+        from_index, to_index = self.index_of(from_), self.index_of(to_)
+        if from_index is None or to_index is None or self.durations[from_index, to_index] == self.NO_VALUE:
+            raise KeyError(key)
+        return from_index, to_index
+
+    def __getitem__(self, key):
+        from_index, to_index = self._get_indices(key)
+        result = {
+            'duration': self.durations.item(from_index, to_index),
+            'distance': self.distances.item(from_index, to_index),
+        }
+        if (from_index, to_index) in self.polylines:
+            result['polyline'] = self.polylines[(from_index, to_index)]
+        return result
+
+    def __iter__(self):
+        for from_index, to_index in zip(*np.nonzero(self.durations != self.NO_VALUE)):
+            yield self.locations[from_index], self.locations[to_index]
+
+    def __len__(self):
+        return int(np.count_nonzero(self.durations != self.NO_VALUE))
@@ -41,10 +41,13 @@ class OptimisationFilter(logging.Filter):
 class DataBaseLogWriter(Writer):
     @staticmethod
     def write(log_item, ro_log, labels):
+        if log_item.append_only:
+            ro_log.append_log_items([log_item.get_log_obj(labels)])
+            return
         with transaction.atomic():
-            ro_log.refresh_from_db()
-            log_item.write_in_log(ro_log.log, labels)
-            ro_log.save(update_fields=('log',))
+            ro_log.refresh_from_db(fields=('log_state',))
+            log_item.write_in_log(ro_log.log_state, labels)
+            ro_log.save(update_fields=('log_state',))
 
 
 class OptimisationLogHandler(BaseLogHandler):
@@ -69,12 +72,9 @@ class DummyOptimisationLogHandler(BaseLogHandler):
 
 def move_dummy_optimisation_log(dummy_optimisation, route_optimisation, dev=True):
     route_optimisation.optimisation_log.refresh_from_db()
-    for log in dummy_optimisation.optimisation_log.log['full']:
+    logs = dummy_optimisation.optimisation_log.log['full']
+    for log in logs:
         if dev and EventLabel.DEV not in log['labels']:
             log['labels'].append(EventLabel.DEV)
-        if 'full' in route_optimisation.optimisation_log.log:
-            route_optimisation.optimisation_log.log['full'] += [log]
-        else:
-            route_optimisation.optimisation_log.log['full'] = [log]
+    route_optimisation.optimisation_log.append_log_items(logs)
     dummy_optimisation.optimisation_log.log['full'] = []
-    route_optimisation.optimisation_log.save(update_fields=('log',))
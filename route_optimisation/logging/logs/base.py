@@ -11,6 +11,8 @@ from ..registry import log_item_registry
 
 class LogItem:
     event = None
+    # Item is stored as a separate log message. Otherwise it changes the state of the log in `write_in_log`.
+    append_only = True
 
     def __init__(self, msg, event_kwargs, log_subject):
         self.event_kwargs = event_kwargs
@@ -21,6 +21,7 @@ class ProgressConst:
 @log_item_registry.register()
 class ProgressLog(LogItem):
     event = EventType.PROGRESS
+    append_only = False
 
     def write_in_log(self, optimisation_log, labels):
         from route_optimisation.models import EngineRun, RouteOptimisation
@@ -0,0 +1,35 @@
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('route_optimisation', '0015_routeoptimisation_is_removing_currently'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name='rolog',
+                    old_name='log',
+                    new_name='log_state',
+                ),
+                migrations.AlterField(
+                    model_name='rolog',
+                    name='log_state',
+                    field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, db_column='log', default=dict),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ROLogItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('ro_log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='route_optimisation.ROLog')),
+            ],
+        ),
+    ]
@@ -1,7 +1,7 @@
 from .driver_route import DriverRoute
 from .engine_run import EngineRun
 from .location import DriverRouteLocation
-from .log import ROLog
+from .log import ROLog, ROLogItem
 from .optimisation_task import OptimisationTask
 from .route_optimisation import DummyOptimisation, RefreshDummyOptimisation, RouteOptimisation
 from .route_point import RoutePoint
@@ -9,5 +9,5 @@ from .route_point import RoutePoint
 __all__ = [
     'DriverRoute', 'DriverRouteLocation', 'EngineRun', 'OptimisationTask',
     'DummyOptimisation', 'RefreshDummyOptimisation',
-    'RouteOptimisation', 'RoutePoint', 'ROLog',
+    'RouteOptimisation', 'RoutePoint', 'ROLog', 'ROLogItem',
 ]
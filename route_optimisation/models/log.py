@@ -3,4 +3,45 @@ from django.db import models
 
 
 class ROLog(models.Model):
-    log = JSONField(default=dict, blank=True)
+    # Mutable part of the log (progress, steps, engines). Log messages are stored as separate `ROLogItem` rows,
+    # old logs still keep their messages under the 'full' key of this field.
+    log_state = JSONField(default=dict, blank=True, db_column='log')
+
+    def __init__(self, *args, **kwargs):
+        self._full_log = None
+        super().__init__(*args, **kwargs)
+
+    @property
+    def log(self):
+        # Not saved log (e.g. for DummyOptimisation) is kept in memory only.
+        if self.pk is None:
+            return self.log_state
+        log = dict(self.log_state)
+        log['full'] = self.full_log
+        return log
+
+    @log.setter
+    def log(self, value):
+        self.log_state = value
+        self._full_log = None
+
+    @property
+    def full_log(self):
+        if self._full_log is None:
+            items = self.items.all().order_by('id').values_list('data', flat=True)
+            self._full_log = list(self.log_state.get('full', [])) + list(items)
+        return self._full_log
+
+    def append_log_items(self, log_objects):
+        ROLogItem.objects.bulk_create([ROLogItem(ro_log=self, data=log_obj) for log_obj in log_objects])
+        if self._full_log is not None:
+            self._full_log.extend(log_objects)
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._full_log = None
+
+
+class ROLogItem(models.Model):
+    ro_log = models.ForeignKey(ROLog, on_delete=models.CASCADE, related_name='items')
+    data = JSONField(default=dict)
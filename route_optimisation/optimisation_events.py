@@ -76,7 +76,7 @@ class RadaroEventsHandler(EventHandler):
         if isinstance(self.log_object, EngineRun):
             kwargs['engine_run_state'] = {
                 'engine_id': self.log_object.id,
-                'progress': self.log_object.get_ro_log.log['progress'],
+                'progress': self.log_object.get_ro_log.log_state['progress'],
             }
             logger.info(None, extra=dict(obj=self.log_object.active_optimisation_obj, event=EventType.PROGRESS,
                                          event_kwargs=kwargs, labels=[],))
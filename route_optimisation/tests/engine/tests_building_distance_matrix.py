@@ -1,5 +1,9 @@
+import random
+import time
 from collections import defaultdict
 
+from django.test import SimpleTestCase, tag
+
 from rest_framework.test import APITestCase
 
 from merchant.factories import MerchantFactory
@@ -8,7 +12,11 @@ from radaro_utils.signals import google_api_request_event
 from route_optimisation.engine.dima import set_dima_cache
 from route_optimisation.engine.ortools.distance_matrix import DistanceMatrixBuilder
 from route_optimisation.engine.utils import to_dict_point
-from route_optimisation.tests.test_utils.distance_matrix import LocalCacheDiMa
+from route_optimisation.tests.test_utils.distance_matrix import (
+    FakeCacheAdapter,
+    LocalCacheDiMa,
+    TestFakeDiMaCache,
+)
 from routing.context_managers import GoogleApiRequestsTracker
 from routing.google import ApiName
 from routing.google.registry import merchant_registry
@@ -87,3 +95,136 @@ class DistanceMatrixBuildingTestCase(APITestCase):
         with merchant_registry.suspend_warning():
             builder = self.build_test_distance_matrix(locations[:], 25, 38)
         self.assertEqual(3, len(builder.components))
+
+
+class CountingCacheAdapter(FakeCacheAdapter):
+    def __init__(self):
+        self.round_trips = 0
+        self.max_keys = 0
+
+    def get_many(self, keys):
+        self.round_trips += 1
+        self.max_keys = max(self.max_keys, len(keys))
+        return super().get_many(keys)
+
+    def get(self, key):
+        self.round_trips += 1
+        return super().get(key)
+
+
+class DistanceMatrixCacheRoundTripsTestCase(SimpleTestCase):
+    locations = [
+        '53.895341, 27.555138', '53.946616, 27.582595', '53.936808, 27.471752', '53.884533, 27.588595',
+        '53.890533, 27.602595', '53.894533, 27.592595', '53.903333, 27.532595', '53.912333, 27.572595',
+        '53.895333, 27.531595', '53.873333, 27.582595', '53.923333, 27.512595', '53.921333, 27.562595',
+        '53.893333, 27.552595',
+    ]
+
+    def setUp(self):
+        self.dima_cache = TestFakeDiMaCache()
+        self.dima_cache.cache = CountingCacheAdapter()
+        self.points = [to_dict_point(loc, x_y=False) for loc in self.locations]
+
+    def test_build_matrix(self):
+        with set_dima_cache(self.dima_cache):
+            builder = DistanceMatrixBuilder(self.points)
+            builder.build_via_directions_api()
+        self.assertEqual(len(self.points) ** 2, len(builder.matrix))
+        self.assertEqual(self.dima_cache.cache.round_trips, 1)
+
+    def test_split_points_on_components(self):
+        with set_dima_cache(self.dima_cache):
+            builder = DistanceMatrixBuilder(self.points)
+            builder.split_points_on_components()
+        self.assertEqual(1, len(builder.components))
+        # Undirected pairs while looking for connected locations, then the rest of the component's pairs.
+        self.assertEqual(self.dima_cache.cache.round_trips, 2)
+
+    def test_keys_are_fetched_in_chunks(self):
+        self.dima_cache.FETCH_CHUNK_SIZE = 50
+        with set_dima_cache(self.dima_cache):
+            builder = DistanceMatrixBuilder(self.points)
+            builder.build_via_directions_api()
+        self.assertEqual(len(self.points) ** 2, len(builder.matrix))
+        self.assertGreater(self.dima_cache.cache.round_trips, 1)
+        self.assertEqual(self.dima_cache.cache.max_keys, 50)
+
+    def test_key_is_fetched_once(self):
+        with set_dima_cache(self.dima_cache):
+            for _ in range(3):
+                elem = self.dima_cache.single_dima_element(self.points[0], self.points[1])
+                self.assertEqual(elem['status'], 'OK')
+                self.dima_cache.get_element(self.points[0], self.points[1])
+            self.dima_cache.get_elements([(self.points[0], self.points[1]), (self.points[1], self.points[0])])
+            self.dima_cache.get_elements([(self.points[1], self.points[0])])
+        self.assertEqual(self.dima_cache.cache.round_trips, 2)
+
+
+class RadaroDimaCacheEncodingTestCase(SimpleTestCase):
+    origin, destination = {'lat': 53.895341, 'lng': 27.555138}, {'lat': 53.946616, 'lng': 27.582595}
+
+    def setUp(self):
+        self.dima_cache = LocalCacheDiMa()
+        self.polylines_dima_cache = LocalCacheDiMa(polylines=True)
+        self.key = self.dima_cache.cache_key(self.origin, self.destination)
+
+    def tearDown(self):
+        self.dima_cache.cache.clear()
+
+    def test_leg_with_polyline(self):
+        self.polylines_dima_cache.set_cache_objects({self.key: {'m': 1500, 's': 300, 'p': 'a~l~Fjk~uOwHJy@P'}})
+        self.assertIsInstance(self.dima_cache.cache.get(self.key), bytes)
+        self.assertEqual(len(self.dima_cache.cache.get(self.key)), 10)
+
+        leg = LocalCacheDiMa().get_element(self.origin, self.destination)
+        self.assertEqual(leg, {'distance': {'value': 1500}, 'duration': {'value': 300}, 'steps': [{}]})
+        leg = LocalCacheDiMa(polylines=True).get_element(self.origin, self.destination)
+        self.assertEqual(leg['distance']['value'], 1500)
+        self.assertEqual(leg['steps'], [{'polyline': {'points': 'a~l~Fjk~uOwHJy@P'}}])
+
+    def test_leg_without_polyline(self):
+        self.dima_cache.set_cache_objects({self.key: {'m': 1500, 's': 300}})
+        self.assertIsNotNone(LocalCacheDiMa().get_element(self.origin, self.destination))
+        self.assertIsNone(LocalCacheDiMa(polylines=True).get_element(self.origin, self.destination))
+
+    def test_leg_with_empty_polyline(self):
+        # Legs between close points have empty polylines, they are cached the same as the other ones
+        self.polylines_dima_cache.set_cache_objects({self.key: {'m': 0, 's': 0, 'p': ''}})
+        leg = LocalCacheDiMa(polylines=True).get_element(self.origin, self.destination)
+        self.assertEqual(leg['steps'], [{'polyline': {'points': ''}}])
+
+    def test_zero_results(self):
+        self.dima_cache.set_cache_objects({self.key: {'a': 'ZERO_RESULTS'}})
+        dima_cache = LocalCacheDiMa()
+        self.assertIsNone(dima_cache.get_element(self.origin, self.destination))
+        self.assertEqual(dima_cache.single_dima_element(self.origin, self.destination), {'status': 'ZERO_RESULTS'})
+
+    def test_legacy_and_unknown_versions(self):
+        self.dima_cache.cache.set(self.key, {'m': 1500, 's': 300, 'p': 'a~l~Fjk~uOwHJy@P'})
+        leg = LocalCacheDiMa(polylines=True).get_element(self.origin, self.destination)
+        self.assertEqual(leg['steps'], [{'polyline': {'points': 'a~l~Fjk~uOwHJy@P'}}])
+
+        self.dima_cache.cache.set(self.key, bytes([0]) + bytes(9))
+        self.assertIsNone(LocalCacheDiMa().get_element(self.origin, self.destination))
+
+
+class DistanceMatrixBuildingPerformanceTestCase(SimpleTestCase):
+    def make_points(self, points_count):
+        rnd = random.Random(points_count)
+        return [
+            {'lat': '{:.6f}'.format(rnd.uniform(53.85, 53.95)), 'lng': '{:.6f}'.format(rnd.uniform(27.45, 27.65))}
+            for _ in range(points_count)
+        ]
+
+    @tag('performance')
+    def test_build_matrix_time(self):
+        for points_count in (100, 300, 600):
+            points = self.make_points(points_count)
+            with set_dima_cache(TestFakeDiMaCache()):
+                started = time.time()
+                builder = DistanceMatrixBuilder(points)
+                builder.build_via_directions_api()
+                build_time = time.time() - started
+            print('Distance matrix of {} locations is built in {:.3f} sec'.format(points_count, build_time))
+            self.assertEqual(1, len(builder.components))
+            self.assertEqual(points_count ** 2, len(builder.matrix))
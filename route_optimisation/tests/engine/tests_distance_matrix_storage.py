@@ -0,0 +1,69 @@
+import random
+import time
+
+from django.test import SimpleTestCase, tag
+
+from route_optimisation.engine.ortools.distance_matrix import DenseDistanceMatrix, DistanceMatrix
+
+
+class DenseDistanceMatrixTestCase(SimpleTestCase):
+    points_count = 500
+
+    def make_matrix(self, points_count):
+        rnd = random.Random(points_count)
+        locations = [
+            {'lat': '{:.6f}'.format(rnd.uniform(-38, -37)), 'lng': '{:.6f}'.format(rnd.uniform(144, 145))}
+            for _ in range(points_count)
+        ]
+        matrix = DistanceMatrix()
+        for from_ in locations:
+            for to_ in locations:
+                matrix[(from_, to_)] = {'duration': rnd.randint(0, 7200), 'distance': rnd.randint(0, 100000)}
+        return locations, matrix
+
+    def test_same_values_as_distance_matrix(self):
+        locations, matrix = self.make_matrix(20)
+        matrix[(locations[0], locations[1])]['polyline'] = 'abc'
+        dense_matrix = DenseDistanceMatrix.from_distance_matrix(locations, matrix)
+
+        self.assertEqual(len(dense_matrix), len(locations) ** 2)
+        self.assertEqual(dense_matrix[(locations[0], locations[1])], matrix[(locations[0], locations[1])])
+        for i, from_ in enumerate(locations):
+            for j, to_ in enumerate(locations):
+                self.assertEqual(dense_matrix.get_value(i, j, 'duration'), matrix[(from_, to_)]['duration'])
+                self.assertEqual(dense_matrix.get_value(i, j, 'distance'), matrix[(from_, to_)]['distance'])
+                self.assertEqual(dense_matrix[(from_, to_)]['duration'], matrix[(from_, to_)]['duration'])
+
+    def test_missing_values(self):
+        locations, matrix = self.make_matrix(3)
+        dense_matrix = DenseDistanceMatrix(locations)
+        dense_matrix.set_value(0, 1, matrix[(locations[0], locations[1])])
+        self.assertEqual(len(dense_matrix), 1)
+        self.assertIn((locations[0], locations[1]), dense_matrix)
+        self.assertNotIn((locations[1], locations[0]), dense_matrix)
+        self.assertIsNone(dense_matrix.get((locations[1], locations[0])))
+        self.assertIsNone(dense_matrix.index_of({'lat': 'Fake', 'lng': 'location'}))
+        with self.assertRaises(KeyError):
+            dense_matrix.get_value(1, 0, 'duration')
+
+    @tag('performance')
+    def test_callback_lookup_throughput(self):
+        locations, matrix = self.make_matrix(self.points_count)
+        dense_matrix = DenseDistanceMatrix.from_distance_matrix(locations, matrix)
+        indices = list(range(self.points_count))
+        rnd = random.Random(0)
+        pairs = [(rnd.choice(indices), rnd.choice(indices)) for _ in range(200000)]
+
+        started = time.time()
+        for from_, to_ in pairs:
+            matrix[(locations[from_], locations[to_])]['duration']
+        dict_time = time.time() - started
+
+        started = time.time()
+        for from_, to_ in pairs:
+            dense_matrix.get_value(from_, to_, 'duration')
+        dense_time = time.time() - started
+
+        print('{} lookups on {} points. DistanceMatrix: {:.3f} sec, DenseDistanceMatrix: {:.3f} sec'.format(
+            len(pairs), self.points_count, dict_time, dense_time))
+        self.assertLess(dense_time, dict_time)
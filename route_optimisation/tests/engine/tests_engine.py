@@ -2,6 +2,7 @@ import json
 import logging
 import os
 from datetime import date, timedelta
+from unittest import mock
 
 from django.conf import settings as project_settings
 from django.test import TestCase, override_settings, tag
@@ -13,7 +14,10 @@ from radaro_utils.tests.utils import PerformanceMeasure
 from route_optimisation.engine import Engine
 from route_optimisation.engine.base_classes.parameters import EngineParameters, JobKind
 from route_optimisation.engine.const import Algorithms
-from route_optimisation.engine.events import EventHandler
+from route_optimisation.engine.dima import set_dima_cache
+from route_optimisation.engine.events import EventHandler, set_event_handler
+from route_optimisation.engine.ortools.algorithm.parallel import solve_in_processes
+from route_optimisation.engine.ortools.context import AssignmentContextManager, GroupAssignmentContext
 from route_optimisation.tests.engine.optimisation_expectation import (
     OptimisationExpectation,
     OrderExistsInRoute,
@@ -548,6 +552,102 @@ class TestEngineCase(BaseTestEngineMixin, TestCase):
         )
 
 
+@override_settings(ORTOOLS_SEARCH_TIME_LIMIT=1, ORTOOLS_SEARCH_TIME_LIMIT_WITH_PICKUP=1,
+                   ORTOOLS_PARALLEL_ASSIGNMENT_WORKERS=4)
+class TestParallelEngineCase(BaseTestEngineMixin, TestCase):
+    def get_settings(self, focus):
+        settings = EngineSettings(self.day, pytz.timezone('Australia/Melbourne'), focus=focus)
+        settings.hub('-37.869197,144.82028300000002', hub_id=1)
+        settings.hub('-37.7855699,144.84063459999993', hub_id=2)
+        settings.driver(member_id=1, start_hub=2, end_hub=2, capacity=10)
+        settings.driver(member_id=2, start_hub=2, end_hub=2, capacity=10)
+        settings.driver(member_id=3, start_hub=1, end_hub=1, capacity=10)
+        settings.order(1, '-37.8421644,144.9399743')
+        settings.order(2, '-37.8485871,144.6670881', driver=2)
+        settings.order(3, '-37.8238154,145.0108082', driver=3)
+        settings.order(4, '-37.755938,145.706767')
+        settings.order(5, '-37.8266637,145.2561718')
+        settings.order(6, '-37.5860885,144.1168696')
+        settings.service_time(5)
+        return settings
+
+    def optimise_in_processes(self, focus, in_processes=True):
+        expectation = OptimisationExpectation(max_distance=650000, skipped_orders=0)
+        with mock.patch('route_optimisation.engine.ortools.algorithm.algorithms.solve_in_processes',
+                        wraps=solve_in_processes) as solve_mock:
+            self.optimise(settings=self.get_settings(focus), expectation=expectation)
+        self.assertEqual(solve_mock.called, in_processes)
+
+    def test_parallel_all_focus(self):
+        self.optimise_in_processes(MerchantOptimisationFocus.ALL)
+
+    def test_parallel_old_focus(self):
+        self.optimise_in_processes(MerchantOptimisationFocus.OLD)
+
+    def test_parallel_in_daemonic_process(self):
+        # Prefork celery workers are daemonic processes, assignments are solved sequentially there
+        with mock.patch('multiprocessing.current_process', return_value=mock.Mock(daemon=True)):
+            self.optimise_in_processes(MerchantOptimisationFocus.ALL, in_processes=False)
+
+
+class TestTransitMatrices(BaseTestEngineMixin, TestCase):
+    def get_params(self):
+        settings = EngineSettings(self.day, pytz.timezone('Australia/Melbourne'))
+        settings.hub('-37.869197,144.82028300000002', hub_id=1)
+        settings.hub('-37.7855699,144.84063459999993', hub_id=2)
+        settings.driver(member_id=1, start_hub=2, end_hub=None, capacity=10)
+        settings.driver(member_id=2, start_hub=None, end_hub=1, capacity=10)
+        settings.driver(member_id=3, start_hub=2, end_hub=None, capacity=10)
+        settings.order(1, '-37.8421644,144.9399743')
+        settings.order(2, '-37.8485871,144.6670881', driver=2)
+        settings.order(3, '-37.8238154,145.0108082', capacity=3)
+        settings.service_time(5)
+        return EngineParameters(
+            timezone=settings.timezone,
+            day=settings.day,
+            focus=settings.focus,
+            default_job_service_time=settings.job_service_time,
+            default_pickup_service_time=settings.pickup_service_time,
+            optimisation_options=dict(
+                jobs=[order.to_dict() for order in settings.orders],
+                drivers=[driver.to_dict() for driver in settings.drivers],
+                use_vehicle_capacity=True,
+                required_start_sequence=settings.start_sequences,
+            ),
+        )
+
+    def test_transit_matrices_match_callbacks(self):
+        with set_event_handler(TestROEvents()), set_dima_cache(self.distance_matrix_cache):
+            with AssignmentContextManager(self.get_params(), GroupAssignmentContext) as context:
+                nodes = range(context.num_locations)
+                for vehicle_index in range(context.num_vehicles):
+                    time_matrix = context.get_transit_matrix(context.TRANSIT_TIME, vehicle_index)
+                    time_sf_matrix = context.get_transit_matrix(context.TRANSIT_TIME_SERVICE_FIRST, vehicle_index)
+                    for from_node in nodes:
+                        for to_node in nodes:
+                            self.assertEqual(time_matrix[from_node][to_node],
+                                             context.time_callback(vehicle_index, from_node, to_node))
+                            self.assertEqual(time_sf_matrix[from_node][to_node],
+                                             context.time_callback_service_first(vehicle_index, from_node, to_node))
+                capacity_demands = context.get_capacity_demands()
+                for from_node in nodes:
+                    for to_node in nodes:
+                        self.assertEqual(capacity_demands[to_node], context.capacity_callback(from_node, to_node))
+
+                # Drivers with the same start and end share one matrix
+                self.assertIs(context.get_transit_matrix(context.TRANSIT_TIME, 0),
+                              context.get_transit_matrix(context.TRANSIT_TIME, 2))
+                self.assertIsNot(context.get_transit_matrix(context.TRANSIT_TIME, 0),
+                                 context.get_transit_matrix(context.TRANSIT_TIME, 1))
+
+    def test_missing_capacity_is_not_defaulted(self):
+        with set_event_handler(TestROEvents()), set_dima_cache(self.distance_matrix_cache):
+            with AssignmentContextManager(self.get_params(), GroupAssignmentContext) as context:
+                context.orders[0].capacity = None
+                with self.assertRaises(ValueError):
+                    context.get_capacity_demands()
+
+
 class RealCase(BaseTestEngineMixin, TestCase):
     __unittest_skip__ = True
     __unittest_skip_why__ = 'This case only for development'
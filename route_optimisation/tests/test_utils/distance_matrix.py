@@ -15,8 +15,8 @@ dima_lock = RLock()
 
 
 class LocalCacheDiMa(RadaroDimaCache):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, polylines=False):
+        super().__init__(polylines=polylines)
         self.cache = caches['test_optimisation']
 
 
@@ -27,6 +27,9 @@ class CacheLikeAdapter(dict):
     def set(self, key, value):
         self[key] = value
 
+    def set_many(self, data):
+        self.update(data)
+
 
 class TestDiMaCache(DistanceMatrixCache):
     def __init__(self, cache_file_name=None, polylines=False):
@@ -62,6 +65,7 @@ class TestDiMaCache(DistanceMatrixCache):
                 start, end = direction.pop('start'), direction.pop('end')
                 key = self.cache_key(start, end)
                 self.cache[key] = direction
+                self.remember_cache_objects({key: direction})
         self.save_distance_matrix()
 
     def _update_cache_after_distance_matrix(self, response, origin, destination):
@@ -121,6 +125,9 @@ class FakeCacheAdapter:
     def set(self, key, value):
         pass
 
+    def set_many(self, data):
+        pass
+
 
 class TestFakeDiMaCache(DistanceMatrixCache):
     def __init__(self):
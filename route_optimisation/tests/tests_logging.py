@@ -0,0 +1,69 @@
+import time
+
+from django.test import TestCase, tag
+
+from route_optimisation.logging import EventLabel, EventType
+from route_optimisation.logging.log_handler import DataBaseLogWriter
+from route_optimisation.logging.logs.base import SimpleMessage
+from route_optimisation.logging.logs.progress import ProgressConst, ProgressLog
+from route_optimisation.models import EngineRun, ROLog, ROLogItem
+
+
+class ROLogStorageTestCase(TestCase):
+    def write_messages(self, ro_log, count, start=0):
+        for ind in range(start, start + count):
+            DataBaseLogWriter.write(SimpleMessage('Message {}'.format(ind), {}, None), ro_log, [EventLabel.DEV])
+
+    def test_messages_are_stored_as_separate_items(self):
+        ro_log = ROLog.objects.create()
+        self.write_messages(ro_log, 3)
+        self.assertEqual(ROLogItem.objects.filter(ro_log=ro_log).count(), 3)
+        self.assertNotIn('full', ROLog.objects.get(id=ro_log.id).log_state)
+
+        log = ROLog.objects.get(id=ro_log.id).log
+        self.assertEqual([item['params']['msg'] for item in log['full']], ['Message 0', 'Message 1', 'Message 2'])
+        self.assertEqual(log['full'][0]['event'], EventType.SIMPLE_MESSAGE)
+        self.assertEqual(log['full'][0]['labels'], [EventLabel.DEV])
+
+    def test_legacy_messages_go_first(self):
+        ro_log = ROLog.objects.create(log={'full': [{'event': EventType.SIMPLE_MESSAGE, 'params': {'msg': 'Old'}}]})
+        self.write_messages(ro_log, 1)
+        ro_log.refresh_from_db()
+        self.assertEqual([item['params']['msg'] for item in ro_log.log['full']], ['Old', 'Message 0'])
+
+    def test_progress_changes_log_state(self):
+        ro_log = ROLog.objects.create()
+        self.write_messages(ro_log, 2)
+        progress = ProgressLog(None, {'stage': ProgressConst.DISTANCE_MATRIX}, EngineRun())
+        DataBaseLogWriter.write(progress, ro_log, [])
+        ro_log = ROLog.objects.get(id=ro_log.id)
+        self.assertEqual(ro_log.log['progress'], 20)
+        self.assertEqual(len(ro_log.log['full']), 2)
+        self.assertEqual(ROLogItem.objects.filter(ro_log=ro_log).count(), 2)
+
+    def test_in_memory_log(self):
+        ro_log = ROLog(log={})
+        SimpleMessage('Message', {}, None).write_in_log(ro_log.log, [])
+        self.assertEqual(len(ro_log.log['full']), 1)
+
+    def test_write_does_not_depend_on_log_size(self):
+        ro_log = ROLog.objects.create()
+        with self.assertNumQueries(1):
+            self.write_messages(ro_log, 1)
+        self.write_messages(ro_log, 500, start=1)
+        with self.assertNumQueries(1):
+            self.write_messages(ro_log, 1, start=501)
+
+    @tag('performance')
+    def test_per_item_write_cost(self):
+        ro_log = ROLog.objects.create()
+        batch, written, timings = 500, 0, []
+        for log_size in (0, 2000, 5000, 10000):
+            self.write_messages(ro_log, log_size - written, start=written)
+            started = time.time()
+            self.write_messages(ro_log, batch, start=log_size)
+            per_item = (time.time() - started) / batch
+            written = log_size + batch
+            timings.append(per_item)
+            print('Log size: {}. Write time per item: {:.6f} sec'.format(log_size, per_item))
+        self.assertLess(timings[-1], timings[0] * 3)
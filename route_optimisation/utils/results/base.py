@@ -7,6 +7,7 @@ from django.contrib.contenttypes.models import ContentType
 
 from base.models import Member
 from merchant.models import Hub
+from reporting.signals import collect_events, get_event_collector
 from route_optimisation.const import RoutePointKind
 from route_optimisation.engine.base_classes.result import AssignmentResult, Point
 from route_optimisation.logging import EventType
@@ -96,7 +97,9 @@ class ResultKeeper:
             routes.append(DriverRouteResult(driver, tour_data, color_picker(used_colors)))
         return OptimisationResult(routes)
 
+    @collect_events()
     def save(self, result: AssignmentResult, optimisation_result: OptimisationResult):
+        # Events of the assigned orders are saved in batches before the pauses of the assignment and after all routes
         self._assigned_orders_store = []
         try:
             if result.good:
@@ -177,10 +180,13 @@ class ResultKeeper:
             self.log_driver_route(driver_route, not_assigned_orders, previously_assigned_orders, orders_count)
 
             # We need to save orders slowly enough, so there will be created only about 200 events per 15 seconds.
-            # So /new-events/ api will work.
+            # So /new-events/ api will work. Collected events of the saved orders are saved before the pause.
             period_15_sec = time.time() - 15
             saved_routes_counter = {k: v for k, v in saved_routes_counter.items() if k >= period_15_sec}
             if sum(saved_routes_counter.values()) > 200:
+                collector = get_event_collector()
+                if collector is not None:
+                    collector.flush()
                 time.sleep(15)
 
     def log_driver_route(self, driver_route, from_not_assigned, previously_assigned, orders_count):
@@ -2,7 +2,7 @@ import logging
 
 from django.db import transaction
 
-from reporting.signals import create_event
+from reporting.signals import collect_events, create_event
 from route_optimisation.const import RoutePointKind
 from route_optimisation.engine.base_classes.result import AssignmentResult
 from route_optimisation.push_messages.composers import (
@@ -41,6 +41,7 @@ class RefreshSoloResultKeeper(ResultKeeper):
         return prepared_optimisation_result
 
     @transaction.atomic
+    @collect_events()
     def save(self, result: AssignmentResult, optimisation_result: OptimisationResult, **params):
         if result.good:
             existing_points = self.get_existing_points()
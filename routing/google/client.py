@@ -149,10 +149,13 @@ class GoogleClient(object):
         return client.directions(**options)
 
     @create_client(GoogleMapsClientFactory)
-    def single_dima_element(self, client, origin, destination, language=None):
+    def single_dima_element(self, client, origin, destination, language=None, departure_time=None):
         options = dict(origins=[origin], destinations=[destination], avoid='ferries')
         if language:
             options['language'] = language
+        if departure_time:
+            # Element has `duration_in_traffic` in addition to `duration`
+            options['departure_time'] = departure_time
         res = client.distance_matrix(**options)['rows'][0]['elements'][0]
         google_api_request_event.send(None, api_name=ApiName.DIMA, options=options)
         return res
@@ -1,24 +1,32 @@
 import logging
 
+from django.conf import settings
+
 import googlemaps.convert
 from googlemaps.client import _DEFAULT_BASE_URL, urlencode_params
 
+from routing.google.transport import get_transport
 from routing.google.utils import MapsAPIClientFactory, empty
 
 logger = logging.getLogger('routing.google')
 
 
 class RadaroGoogleMapsClient(googlemaps.Client):
-    def __init__(self, key=None, client_id=empty, client_secret=empty, *args, **kwargs):
+    def __init__(self, key=None, client_id=empty, client_secret=empty, session=None, base_url=None, *args, **kwargs):
         super(RadaroGoogleMapsClient, self).__init__(
             key=key, client_id=client_id, client_secret=client_secret, *args, **kwargs
         )
         self.client_id = None if client_id is empty else client_id
         self.client_secret = None if client_secret is empty else client_secret
+        if session is not None:
+            self.session = session
+        self.base_url = base_url
 
     def _request(self, url, params, first_request_time=None, retry_counter=0,
                  base_url=_DEFAULT_BASE_URL, accepts_clientid=True,
                  extract_body=None, requests_kwargs=None, post_json=None, retry_transport_error_counter=0):
+        if self.base_url and base_url == _DEFAULT_BASE_URL:
+            base_url = self.base_url
         try:
             return super()._request(url, params, first_request_time,
                                     retry_counter, base_url, accepts_clientid,
@@ -60,4 +68,8 @@ class GoogleMapsClientFactory(MapsAPIClientFactory):
         client_kwargs = {}
         if proxies:
             client_kwargs['requests_kwargs'] = {'proxies': proxies}
-        return RadaroGoogleMapsClient(google_api_key, timeout=timeout, channel=channel, **client_kwargs)
+        transport = get_transport()
+        return RadaroGoogleMapsClient(
+            google_api_key, timeout=timeout, channel=channel, session=transport.limited_session(),
+            base_url=settings.GOOGLE_API_BASE_URL, **client_kwargs
+        )
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RateLimiter:
+    """
+    Sliding window limiter of requests per second shared by all threads of the process.
+    """
+
+    def __init__(self, queries_per_second):
+        if queries_per_second <= 0:
+            raise ValueError('Queries per second limit should be positive, got {}'.format(queries_per_second))
+        self.queries_per_second = queries_per_second
+        self.sent_times = deque(maxlen=queries_per_second)
+        self.lock = threading.Lock()
+
+    def wait(self):
+        # Time of the request is reserved under the lock, so waiting threads don't block each other
+        with self.lock:
+            send_at = time.monotonic()
+            if len(self.sent_times) == self.queries_per_second:
+                send_at = max(send_at, self.sent_times[0] + 1)
+            self.sent_times.append(send_at)
+        delay = send_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class LimitedSession:
+    """
+    Session given to maps clients instead of their own one.
+    Requests go through the pooled session of the transport and respect its concurrency and QPS limits.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def get(self, *args, **kwargs):
+        return self.transport.request('get', *args, **kwargs)
+
+    def post(self, *args, **kwargs):
+        return self.transport.request('post', *args, **kwargs)
+
+    def close(self):
+        # Pooled connections live as long as the process
+        pass
+
+
+class GoogleAPITransport:
+    def __init__(self, max_concurrent_requests, queries_per_second):
+        self.max_concurrent_requests = max_concurrent_requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_concurrent_requests)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.semaphore = threading.BoundedSemaphore(max_concurrent_requests)
+        self.rate_limiter = RateLimiter(queries_per_second)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def request(self, method, *args, **kwargs):
+        with self.semaphore:
+            self.rate_limiter.wait()
+            return getattr(self.session, method)(*args, **kwargs)
+
+    def limited_session(self):
+        return LimitedSession(self)
+
+    @property
+    def executor(self):
+        # Long-lived pool of threads for concurrent directions requests
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrent_requests, thread_name_prefix='google-api',
+                )
+            return self._executor
+
+
+_transport = None
+_transport_pid = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> GoogleAPITransport:
+    global _transport, _transport_pid
+    with _transport_lock:
+        # Connections and threads can't be shared with forked processes (e.g. celery workers)
+        if _transport is None or _transport_pid != os.getpid():
+            _transport = GoogleAPITransport(
+                max_concurrent_requests=settings.GOOGLE_API_MAX_CONCURRENT_REQUESTS,
+                queries_per_second=settings.GOOGLE_API_QUERIES_PER_SECOND,
+            )
+            _transport_pid = os.getpid()
+        return _transport
+
+
+def reset_transport():
+    global _transport
+    with _transport_lock:
+        _transport = None
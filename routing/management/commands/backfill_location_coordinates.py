@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+from django.db import connection
+
+from merchant.models import HubLocation
+from radaro_utils.db import backfill_coordinates
+from tasks.models import OrderLocation
+
+
+class Command(BaseCommand):
+    help = 'Fill numeric latitude/longitude of order and hub locations from their location strings.'
+
+    models = (OrderLocation, HubLocation)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='count of rows updated in one query')
+
+    def handle(self, *args, **options):
+        for model in self.models:
+            updated = backfill_coordinates(connection, model._meta.db_table, options['batch_size'])
+            self.stdout.write('{}: {} locations updated'.format(model.__name__, updated))
@@ -35,3 +35,43 @@ class Location(models.Model):
         from_location = latlng_dict(self.coordinates)
         to_location = latlng_dict(location.coordinates)
         return distance_between(from_location, to_location)
+
+
+def parse_coordinates(location):
+    try:
+        latitude, longitude = map(float, location.split(','))
+    except (AttributeError, ValueError):
+        return None, None
+    return latitude, longitude
+
+
+class PointLocationQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.fill_coordinates()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class PointLocationMixin(models.Model):
+    """
+    Keeps numeric coordinates of the location, so locations can be ordered by distance
+    using GiST index on `ll_to_earth(latitude, longitude)`.
+    """
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+
+    objects = PointLocationQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def fill_coordinates(self):
+        self.latitude, self.longitude = parse_coordinates(self.location)
+
+    def save(self, *args, **kwargs):
+        self.fill_coordinates()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'location' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'latitude', 'longitude'}
+        super().save(*args, **kwargs)
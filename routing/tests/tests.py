@@ -1,5 +1,18 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
 
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from radaro_utils.helpers import use_signal_receiver
+from radaro_utils.signals import google_api_request_event
+from routing.google import ApiName, GoogleClient
+from routing.google.registry import merchant_registry
+from routing.google.transport import RateLimiter, get_transport, reset_transport
 from routing.utils import nearest_point_on_line_segment
 
 
@@ -27,3 +40,114 @@ class RoutingUtilsTestCase(TestCase):
         assert_nearest_point((0, 1), (0., 0.))
         assert_nearest_point((-1, -2), (0., 0.))
         assert_nearest_point((0, -2), (0., 0.))
+
+
+class RateLimiterTestCase(SimpleTestCase):
+    def test_requests_are_spread_over_seconds(self):
+        limiter = RateLimiter(2)
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            sent_at = sorted(executor.map(lambda _: limiter.wait() or time.monotonic() - started, range(5)))
+        self.assertLess(sent_at[1], 0.5)
+        self.assertTrue(1 <= sent_at[2] <= sent_at[3] < 1.5)
+        self.assertTrue(2 <= sent_at[4] < 2.5)
+
+    def test_lock_is_released_while_waiting(self):
+        limiter = RateLimiter(1)
+        limiter.wait()
+        waiting = threading.Thread(target=limiter.wait)
+        waiting.start()
+        time.sleep(0.1)
+        self.assertTrue(waiting.is_alive())
+        self.assertTrue(limiter.lock.acquire(timeout=0.1))
+        limiter.lock.release()
+        waiting.join()
+
+    def test_limit_should_be_positive(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(0)
+
+
+class StubGoogleAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.requests.append(parse_qs(urlparse(self.path).query))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.response_delay)
+        body = json.dumps({'status': 'OK', 'routes': [{'legs': [
+            {'distance': {'value': 1000}, 'duration': {'value': 100}, 'steps': []},
+        ]}]}).encode()
+        with server.lock:
+            server.in_flight -= 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubGoogleAPIServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class GoogleAPITransportTestCase(SimpleTestCase):
+    def setUp(self):
+        self.server = StubGoogleAPIServer(('127.0.0.1', 0), StubGoogleAPIHandler)
+        self.server.lock = threading.Lock()
+        self.server.connections, self.server.requests = set(), []
+        self.server.in_flight = self.server.max_in_flight = 0
+        self.server.response_delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.settings_override = override_settings(
+            GOOGLE_API_KEY='AIzaStubKey', GOOGLE_API_PROXY=None, GOOGLE_API_MAX_CONCURRENT_REQUESTS=2,
+            GOOGLE_API_BASE_URL='http://127.0.0.1:{}'.format(self.server.server_address[1]),
+        )
+        self.settings_override.enable()
+        reset_transport()
+
+    def tearDown(self):
+        reset_transport()
+        self.settings_override.disable()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        requests_count = []
+
+        def count_google_request(api_name, *args, **kwargs):
+            requests_count.append(api_name)
+
+        with merchant_registry.suspend_warning(), use_signal_receiver(google_api_request_event, count_google_request):
+            for _ in range(5):
+                legs = GoogleClient().pure_directions_request('1,1', '2,2', track_merchant=True)
+                self.assertEqual(legs[0]['legs'][0]['distance']['value'], 1000)
+        self.assertEqual(requests_count, [ApiName.DIRECTIONS] * 5)
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_merchant_channel(self):
+        class Merchant:
+            merchant_identifier = 'stub-merchant'
+
+        with GoogleClient.track_merchant(Merchant()):
+            GoogleClient().pure_directions_request('1,1', '2,2', track_merchant=True)
+        self.assertEqual(self.server.requests[0]['channel'], ['stub-merchant'])
+
+    def test_concurrency_limit(self):
+        self.server.response_delay = 0.05
+        with merchant_registry.suspend_warning(), ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(
+                lambda _: GoogleClient().pure_directions_request('1,1', '2,2'), range(8)
+            ))
+        self.assertEqual(len(results), 8)
+        self.assertEqual(self.server.max_in_flight, 2)
+        self.assertLessEqual(len(self.server.connections), 2)
+        self.assertIs(get_transport(), get_transport())
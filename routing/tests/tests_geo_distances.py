@@ -0,0 +1,128 @@
+import math
+import operator as op_
+import random
+import time
+from collections import namedtuple
+
+from django.test import SimpleTestCase, tag
+
+import numpy as np
+
+from routing.utils import (
+    consecutive_geo_distances,
+    filter_driver_path,
+    geo_distances,
+    get_geo_distance,
+    speed_coefficient,
+)
+
+Location = namedtuple('Location', ('location', 'speed', 'accuracy'))
+
+
+def filter_driver_path_one_by_one(path, getter=op_.attrgetter):
+    # Scalar implementation the vectorised `filter_driver_path` is checked against
+    def get_params(_item):
+        return getters['location'](_item).split(',') + [getters['speed'](_item), getters['accuracy'](_item)]
+
+    getters = {field: getter(field) for field in ('location', 'speed', 'accuracy')}
+    new_path, path_length = [], 0.0
+    if not path:
+        return new_path, path_length
+    new_path.append(path[0])
+    lat1, lon1, prev_speed, prev_accuracy = get_params(path[0])
+    for item in path[1:]:
+        lat2, lon2, cur_speed, cur_accuracy = get_params(item)
+        distance = get_geo_distance(*tuple(map(float, (lon1, lat1, lon2, lat2))))
+        prev_coefficient, cur_coefficient = [speed_coefficient(_speed, 1.39, 13.9)
+                                             for _speed in (prev_speed, cur_speed)]
+        if prev_accuracy * prev_coefficient + cur_accuracy * cur_coefficient < distance:
+            lat1, lon1, prev_speed, prev_accuracy = lat2, lon2, cur_speed, cur_accuracy
+            new_path.append(item)
+            path_length += distance
+    return new_path, path_length
+
+
+class GeoDistancesTestCase(SimpleTestCase):
+    # Properties are checked on the random data, seeds make failures reproducible
+    examples_count = 200
+
+    def random_points(self, rnd, count):
+        return [(rnd.uniform(-90, 90), rnd.uniform(-180, 180)) for _ in range(count)]
+
+    def random_track(self, rnd, length):
+        lat, lng = rnd.uniform(-60, 60), rnd.uniform(-180, 180)
+        track = []
+        for _ in range(length):
+            # Parked driver gives a cloud of close points, moving driver gives the points far from each other
+            step = rnd.choice((0.00001, 0.0001, 0.001))
+            lat, lng = lat + rnd.uniform(-step, step), lng + rnd.uniform(-step, step)
+            speed = rnd.choice((0., rnd.uniform(0, 30)))
+            accuracy = rnd.choice((0., rnd.uniform(1, 100)))
+            track.append(Location('{:.6f},{:.6f}'.format(lat, lng), speed, accuracy))
+        return track
+
+    def test_distances_match_scalar_haversine(self):
+        rnd = random.Random(24)
+        # Same, antipodal and polar points are the edge cases of haversine
+        pairs = [((0, 0), (0, 0)), ((0, 0), (0, 180)), ((90, 0), (-90, 0)), ((-37.8, 144.9), (-37.8, 144.9))]
+        pairs += zip(self.random_points(rnd, self.examples_count), self.random_points(rnd, self.examples_count))
+        (lat1, lng1), (lat2, lng2) = (np.array(points).T for points in zip(*pairs))
+
+        distances = geo_distances(lng1, lat1, lng2, lat2)
+        for ind, ((point_1_lat, point_1_lng), (point_2_lat, point_2_lng)) in enumerate(pairs):
+            expected = get_geo_distance(point_1_lng, point_1_lat, point_2_lng, point_2_lat)
+            self.assertTrue(math.isclose(distances[ind], expected, rel_tol=1e-9, abs_tol=1e-6),
+                            (pairs[ind], distances[ind], expected))
+
+        # Distance is symmetric and not negative
+        np.testing.assert_allclose(distances, geo_distances(lng2, lat2, lng1, lat1), rtol=1e-9, atol=1e-6)
+        self.assertTrue((distances >= 0).all())
+
+    def test_pairwise_and_consecutive_distances(self):
+        rnd = random.Random(42)
+        lats, lngs = np.array(self.random_points(rnd, 30)).T
+
+        pairwise = geo_distances(lngs[:, np.newaxis], lats[:, np.newaxis], lngs, lats)
+        self.assertEqual(pairwise.shape, (30, 30))
+        np.testing.assert_allclose(pairwise, pairwise.T, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(np.diag(pairwise), 0, atol=1e-6)
+        np.testing.assert_allclose(consecutive_geo_distances(lats, lngs), np.diag(pairwise, k=1), rtol=1e-9)
+        self.assertEqual(len(consecutive_geo_distances(lats[:1], lngs[:1])), 0)
+
+    def test_filtered_path_matches_one_by_one_filtering(self):
+        rnd = random.Random(7)
+        for example in range(self.examples_count):
+            track = self.random_track(rnd, rnd.randint(0, 300))
+            with self.subTest(example=example, length=len(track)):
+                path, length = filter_driver_path(track)
+                expected_path, expected_length = filter_driver_path_one_by_one(track)
+                self.assertEqual(path, expected_path)
+                self.assertTrue(math.isclose(length, expected_length, rel_tol=1e-9, abs_tol=1e-6))
+
+                # Kept points are the subsequence of the track, starting from the first point
+                self.assertEqual(path[:1], track[:1])
+                positions = [track.index(point) for point in path]
+                self.assertEqual(positions, sorted(set(positions)))
+
+    def test_filtering_with_item_getter(self):
+        track = [location._asdict() for location in self.random_track(random.Random(3), 100)]
+        path, length = filter_driver_path(track, getter=op_.itemgetter)
+        expected_path, expected_length = filter_driver_path_one_by_one(track, getter=op_.itemgetter)
+        self.assertEqual(path, expected_path)
+        self.assertTrue(math.isclose(length, expected_length, rel_tol=1e-9, abs_tol=1e-6))
+
+    @tag('performance')
+    def test_filtering_long_track_performance(self):
+        track = self.random_track(random.Random(10000), 10000)
+
+        started_at = time.perf_counter()
+        path, length = filter_driver_path(track)
+        vectorised_duration = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        expected_path, expected_length = filter_driver_path_one_by_one(track)
+        one_by_one_duration = time.perf_counter() - started_at
+
+        self.assertEqual(path, expected_path)
+        self.assertTrue(math.isclose(length, expected_length, rel_tol=1e-9))
+        self.assertLess(vectorised_duration, one_by_one_duration)
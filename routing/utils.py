@@ -6,8 +6,11 @@ import os
 
 import gpxpy
 import gpxpy.gpx
+import numpy as np
 import shapely.geometry
 
+EARTH_RADIUS = 6371000
+
 
 def dump_track(folder, name, points):
     """
@@ -42,7 +45,33 @@ def get_geo_distance(lon1, lat1, lon2, lat2):
     dlat = lat2 - lat1
     a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
     c = 2 * math.asin(math.sqrt(a))
-    return 6371000 * c
+    return EARTH_RADIUS * c
+
+
+def geo_distances(lon1, lat1, lon2, lat2):
+    """ Vectorised `get_geo_distance`.
+    Arguments are arrays or numbers broadcast against each other, e.g. pairwise distances between the points
+    `a` and `b` are `geo_distances(lon_a[:, np.newaxis], lat_a[:, np.newaxis], lon_b, lat_b)`.
+    :return: Array of distances in meters
+    """
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(value, dtype=float)) for value in (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    # Rounding errors can move `a` out of the domain of arcsin for the antipodal points
+    return EARTH_RADIUS * 2 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def consecutive_geo_distances(lats, lngs):
+    """ Distances between the consecutive points of the path, one less than the points. """
+    lats, lngs = np.asarray(lats, dtype=float), np.asarray(lngs, dtype=float)
+    return geo_distances(lngs[:-1], lats[:-1], lngs[1:], lats[1:])
+
+
+def locations_to_arrays(locations):
+    """ Convert 'lat,lng' strings to arrays of latitudes and longitudes """
+    if not locations:
+        return np.empty(0), np.empty(0)
+    points = np.array([location.split(',') for location in locations], dtype=float)
+    return points[:, 0], points[:, 1]
 
 
 def y2lat(y):
@@ -193,35 +222,58 @@ def latlng_dict_from_str(latlng_str):
 
 
 def filter_driver_path(path, getter=op_.attrgetter):
-    def get_params(_item):
-        return getters['location'](_item).split(',') + [getters['speed'](_item), getters['accuracy'](_item)]
-
-    getters = {field: getter(field) for field in ('location', 'speed', 'accuracy')}
+    """ Drops the points of the path which are within accuracy of the previous kept point.
+    Accuracy of the point is weighted by the speed, see `speed_coefficient`.
+    :return: Kept points and length of the path through them in meters
+    """
     a_threshold = 1.39
     b_threshold = 13.9
-    new_path = []
-    path_length = 0.0
     if not path:
-        return new_path, path_length
-    initial = path[0]
-    new_path.append(initial)
-    lat1, lon1, prev_speed, prev_accuracy = get_params(initial)
-    for item in path[1:]:
-        lat2, lon2, cur_speed, cur_accuracy = get_params(item)
-        distance = get_geo_distance(*tuple(map(float, (lon1, lat1, lon2, lat2))))
-        prev_coefficient, cur_coefficient = [speed_coefficient(_item, a_threshold, b_threshold)
-                                             for _item in (prev_speed, cur_speed)]
-        if prev_accuracy * prev_coefficient + cur_accuracy * cur_coefficient < distance:
-            lat1, lon1 = lat2, lon2
-            prev_speed = cur_speed
-            prev_accuracy = cur_accuracy
-            new_path.append(item)
-            path_length += distance
-
-    return new_path, path_length
+        return [], 0.0
+
+    getters = {field: getter(field) for field in ('location', 'speed', 'accuracy')}
+    lats, lngs = locations_to_arrays([getters['location'](item) for item in path])
+    speeds = np.array([getters['speed'](item) for item in path], dtype=float)
+    accuracies = np.array([getters['accuracy'](item) for item in path], dtype=float)
+    weighted_accuracies = accuracies * speed_coefficients(speeds, a_threshold, b_threshold)
+
+    # Usually the previous point is kept, so the distance from the kept point is known in advance
+    consecutive_distances = consecutive_geo_distances(lats, lngs).tolist()
+    consecutive_accuracies = (weighted_accuracies[:-1] + weighted_accuracies[1:]).tolist()
+
+    kept = [0]
+    path_length = 0.0
+    ind, points_count = 1, len(path)
+    while ind < points_count:
+        prev_ind = kept[-1]
+        if prev_ind == ind - 1:
+            if consecutive_accuracies[prev_ind] >= consecutive_distances[prev_ind]:
+                ind += 1
+                continue
+            distance = consecutive_distances[prev_ind]
+        else:
+            # Distances from the kept point to the next points are calculated by windows
+            window_end = min(ind + 2 * (ind - prev_ind), points_count)
+            distances = geo_distances(lngs[prev_ind], lats[prev_ind], lngs[ind:window_end], lats[ind:window_end])
+            far_points = np.flatnonzero(weighted_accuracies[prev_ind] + weighted_accuracies[ind:window_end] < distances)
+            if not far_points.size:
+                ind = window_end
+                continue
+            distance = float(distances[far_points[0]])
+            ind += int(far_points[0])
+        kept.append(ind)
+        path_length += distance
+        ind += 1
+
+    return [path[ind] for ind in kept], path_length
 
 
 def speed_coefficient(speed, a, b):
     if speed > b:
         return 1
     return (1 - a) * speed / b + a
+
+
+def speed_coefficients(speeds, a, b):
+    """ Vectorised `speed_coefficient` """
+    return np.where(speeds > b, 1, (1 - a) * speeds / b + a)
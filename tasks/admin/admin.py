@@ -16,6 +16,7 @@ from django_markdown.widgets import AdminMarkdownWidget
 from base.models import Member
 from documents.models import OrderConfirmationDocument
 from driver.filters import DriverOnlyListFilter
+from driver.queries import refresh_drivers_statuses
 from integrations.models import RevelSystem
 from merchant.models import Label, SkillSet, SubBranding
 from radaro_utils.filters.date_filters import RadaroDateTimeRangeFilter
@@ -42,6 +43,7 @@ from tasks.models.external import ExternalJob
 from tasks.models.orders import OrderPickUpConfirmationPhoto, OrderPreConfirmationPhoto, OrderPrice, generate_id
 from tasks.models.terminate_code import SUCCESS_CODES_DISABLED_MSG, TerminateCode
 from tasks.utils import image_file, related_images_gallery
+from tasks.utils.customer_tracking import customer_tracking
 from webhooks.filters import ExternalOrderMerchantAPIKeyFilter, OrderMerchantAPIKeyFilter
 from webhooks.models import MerchantAPIKey
 
@@ -302,8 +304,12 @@ class OrderAdmin(RemoveDeleteActionMixin, Select2FiltersMixin, TrackableModelAdm
 
     def make_unassigned(self, request, queryset):
         qs = queryset.filter(status=Order.ASSIGNED)
-        post_admin_page_action.send(Order, ids=list(qs.values_list('id', flat=True)), action_type='unassign')
+        ids = list(qs.values_list('id', flat=True))
+        post_admin_page_action.send(Order, ids=ids, action_type='unassign')
+        driver_ids = set(qs.values_list('driver_id', flat=True))
         rows_updated = qs.update(status=Order.NOT_ASSIGNED, driver=None)
+        refresh_drivers_statuses(driver_ids)
+        customer_tracking.publish_orders(ids)
         if rows_updated == 1:
             message_bit = "1 order was"
         else:
@@ -1,6 +1,12 @@
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+
 from rest_framework import mixins, status
 from rest_framework.decorators import action
 from rest_framework.exceptions import APIException
+from rest_framework.renderers import BaseRenderer
 from rest_framework.response import Response
 
 from base.utils.views import ReadOnlyDBActionsViewSetMixin
@@ -9,10 +15,22 @@ from reporting.decorators import log_fields_on_object
 from reporting.models import Event
 from tasks.mixins.order_status import OrderStatus
 from tasks.models import ConcatenatedOrder, Order
+from tasks.utils.customer_tracking import customer_tracking
 
 from ..serializers import CustomerOrderSerializer, CustomerOrderStatsSerializer
 from .customer import CustomerViewSet, PickupViewSet
-from .mixins import CurrentLocationMixin, ObjectByUIDB64ApiBase
+from .mixins import CurrentLocationMixin, ObjectByUIDB64ApiBase, conditional_customer_tracking
+
+
+class EventStreamRenderer(BaseRenderer):
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only errors are rendered, the stream itself is returned by the view
+        if data is None:
+            return b''
+        return 'event: error\ndata: {}\n\n'.format(json.dumps(data))
 
 
 class BaseCustomerOrderViewSet(ReadOnlyDBActionsViewSetMixin,
@@ -38,6 +56,7 @@ class BaseCustomerOrderViewSet(ReadOnlyDBActionsViewSetMixin,
         return order
 
     @action(methods=['get'], detail=True)
+    @method_decorator(conditional_customer_tracking)
     def stats(self, request, **kwargs):
         instance = self.get_object()
         try:
@@ -62,6 +81,20 @@ class BaseCustomerOrderViewSet(ReadOnlyDBActionsViewSetMixin,
 
         return Response(data=CustomerOrderStatsSerializer(data, context=self.get_serializer_context()).data)
 
+    @action(methods=['get'], detail=True, renderer_classes=[EventStreamRenderer])
+    def stream(self, request, **kwargs):
+        # Pushes changes of the order, driver location and ETA, instead of polling `stats`
+        instance = self.get_object()
+        stream_id = customer_tracking.open_stream()
+        if stream_id is None:
+            # No content stops reconnecting of the browser, so the tracking page falls back to polling `stats`
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        response = StreamingHttpResponse(customer_tracking.listen(instance.order_token, stream_id),
+                                         content_type=EventStreamRenderer.media_type)
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
     def _get_related_events(self, instance):
         raise NotImplementedError()
 
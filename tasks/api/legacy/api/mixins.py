@@ -1,6 +1,10 @@
+from functools import wraps
+
 from django.http import Http404
+from django.utils.cache import patch_cache_control
 from django.utils.encoding import force_text
 from django.utils.http import urlsafe_base64_decode
+from django.views.decorators.http import condition
 
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -8,10 +12,29 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
 from tasks.models import Order
+from tasks.utils.customer_tracking import customer_tracking
 
 from ..serializers import OrderCurrentLocationSerializer
 
 
+def customer_tracking_etag(request, order_token, **kwargs):
+    return customer_tracking.get_etag(order_token, request.get_full_path())
+
+
+def conditional_customer_tracking(view_func):
+    """
+    Answers idle polls of the tracking page with 304 by ETag, before the order is fetched.
+    Responses are stored by the browser, but revalidated on every poll.
+    """
+    @condition(etag_func=customer_tracking_etag)
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True, max_age=0)
+        return response
+    return wrapper
+
+
 class CurrentLocationMixin(viewsets.GenericViewSet):
     @action(detail=True)
     def location(self, request, **kwargs):
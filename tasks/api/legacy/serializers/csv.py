@@ -1,6 +1,8 @@
 import collections
 import itertools as it_
 
+from django.utils.functional import cached_property
+
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import CharField
@@ -17,6 +19,7 @@ from tasks.mixins.order_status import OrderStatus
 from tasks.models import Barcode, Order
 from tasks.models.bulk import BulkDelayedUpload, OrderPrototype
 from tasks.models.bulk_serializer_mapping import prototype_serializers
+from tasks.utils import StringAddressToOrderLocation
 from webhooks.models import MerchantAPIKey
 
 from .barcode import BarcodeField, BarcodeListSerializer
@@ -283,11 +286,42 @@ class CSVOrderPrototypeChunkSerializer(OrderPrototypeChunkSerializer):
     since = 0
     progress = 0
     user = None
+    bulk = None
+
+    address_fields = (('job_address', 'job_address_2'), ('pickup_address', 'pickup_address_2'))
+
+    @cached_property
+    def address_converter(self):
+        # Shared by all chunks, so each address of the upload is resolved once
+        return StringAddressToOrderLocation()
 
     @property
     def context(self):
         base_context = super(CSVOrderPrototypeChunkSerializer, self).context
-        return dict(base_context, user=self.user)
+        return dict(base_context, user=self.user, address_converter=self.address_converter)
+
+    def get_serializer(self, chunk_data, line_since):
+        self.prefetch_addresses(chunk_data)
+        return super(CSVOrderPrototypeChunkSerializer, self).get_serializer(chunk_data, line_since)
+
+    def prefetch_addresses(self, chunk_data):
+        # Addresses of the chunk are geocoded together instead of one by one during validation
+        values = [
+            (row[address_field], row.get(address_2_field, ''))
+            for row in chunk_data for address_field, address_2_field in self.address_fields
+            if isinstance(row.get(address_field), str)
+        ]
+        chunk_progress = 100. * len(chunk_data) / len(self.initial_data)
+        chunk_start_progress = self.progress
+
+        def report_progress(geocoded, total):
+            reported_progress = self.progress
+            self.progress = min(chunk_start_progress + chunk_progress * geocoded / total, 100)
+            # Progress event is sent only when the whole percent changes, not for every geocoded address
+            if self.bulk is not None and int(self.progress) > int(reported_progress):
+                self.bulk.event(self.progress, BulkDelayedUpload.PROGRESS)
+
+        self.address_converter.prefetch(values, self.user, progress_callback=report_progress)
 
     def data_chunks(self, chunk_size, data_len):
         counter = 0
@@ -303,6 +337,7 @@ class CSVOrderPrototypeChunkSerializer(OrderPrototypeChunkSerializer):
 
     def validate_and_save(self, bulk, first_n=None, skip_n=0, *args, **kwargs):
         self.user = bulk.creator
+        self.bulk = bulk
         if first_n:
             for bulk_serializer in self.validate_in_chunks(chunk_size=first_n):
                 bulk_serializer.save(bulk=bulk)
@@ -11,7 +11,8 @@ class StringAddressField(serializers.Field):
         if not self.allow_empty and not data[0]:
             raise serializers.ValidationError('Address cannot be empty.')
 
-        value = StringAddressToOrderLocation().to_order_location(data, self.context.get('user'))
+        converter = self.context.get('address_converter') or StringAddressToOrderLocation()
+        value = converter.to_order_location(data, self.context.get('user'))
         if value is None:
             raise serializers.ValidationError('Address not found.')
         return value
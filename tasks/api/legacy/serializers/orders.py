@@ -230,6 +230,7 @@ class OrderDeltaSerializer(DeltaSerializer):
         model = Order
         track_change_event = ('status', 'pickup_geofence_entered', 'geofence_entered', 'geofence_entered_on_backend',
                               'rating',)
+        prefetch_related = ('labels', 'skill_sets', 'terminate_codes', 'barcodes', 'skids')
 
 
 @serializer_map.register_serializer_for_detailed_dump(version=1)
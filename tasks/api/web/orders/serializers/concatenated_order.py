@@ -183,6 +183,7 @@ class ConcatenatedOrderDeltaSerializer(serializers.ModelSerializer):
     class Meta:
         model = ConcatenatedOrder
         track_change_event = ('status', 'rating', 'geofence_entered')
+        prefetch_related = ('labels', 'skill_sets', 'terminate_codes')
         exclude = ('updated_at',)
 
     def get_order_ids(self, instance):
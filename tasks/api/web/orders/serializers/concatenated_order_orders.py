@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from driver.queries import refresh_drivers_statuses
 from radaro_utils.serializers.web.fields import WebPrimaryKeyWithMerchantRelatedField
 from reporting.context_managers import track_fields_on_change
 from tasks.models import ConcatenatedOrder, Order
@@ -8,6 +9,7 @@ from tasks.push_notification.push_messages.event_composers import (
     OrderRemovedFromConcatenatedMessage,
 )
 from tasks.signal_receivers import co_auto_processing
+from tasks.utils.customer_tracking import customer_tracking
 
 
 class AvailableOrdersPrimaryKeyRelatedField(WebPrimaryKeyWithMerchantRelatedField):
@@ -29,6 +31,8 @@ class AddedOrdersConcatenatedOrderSerializer(serializers.ModelSerializer):
         orders = Order.objects.filter(id__in=ids)
         with track_fields_on_change(list(orders), initiator=self.context['request'].user, sender=co_auto_processing):
             orders.update(concatenated_order=instance, driver=instance.driver, status=instance.status)
+        refresh_drivers_statuses({order.driver_id for order in validated_data['orders']} | {instance.driver_id})
+        customer_tracking.publish_orders(ids)
         instance.update_data()
 
         if instance.driver:
@@ -97,6 +101,8 @@ class ResetOrdersConcatenatedOrderSerializer(serializers.ModelSerializer):
                                     sender=co_auto_processing):
             removed_orders.update(concatenated_order=None)
             added_orders.update(concatenated_order=instance, driver=instance.driver, status=instance.status)
+        refresh_drivers_statuses({order.driver_id for order in added_orders_list} | {instance.driver_id})
+        customer_tracking.publish_orders(order.id for order in added_orders_list)
 
         instance.update_data()
 
@@ -1,9 +1,11 @@
+from django.utils.decorators import method_decorator
+
 from rest_framework import mixins, viewsets
 
 from merchant.models import Merchant
 from tasks.models import Order
 
-from ...legacy.api.mixins import ObjectByUIDB64ApiBase
+from ...legacy.api.mixins import ObjectByUIDB64ApiBase, conditional_customer_tracking
 from .serializers import WebPublicOrderSerializer
 
 
@@ -13,6 +15,7 @@ class WebPublicMerchantViewSet(viewsets.GenericViewSet):
     url_router_lookup = 'merchant'
 
 
+@method_decorator(conditional_customer_tracking, name='retrieve')
 class WebPublicOrderViewSet(mixins.RetrieveModelMixin, ObjectByUIDB64ApiBase):
     queryset = Order.objects.all()
     serializer_class = WebPublicOrderSerializer
@@ -22,7 +22,7 @@ class ListSubManagerOrderListSerializer(serializers.ListSerializer):
 
     @property
     def data(self):
-        self.eta_dict = ETAToOrders().get_eta_many_orders(self.instance, self.context['request'].user.current_merchant)
+        self.eta_dict = ETAToOrders().get_eta_many_orders(self.instance)
         return super(ListSubManagerOrderListSerializer, self).data
 
 
@@ -37,7 +37,7 @@ class ListShortSubManagerOrderSerializer(serializers.ListSerializer):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.eta_dict = ETAToOrders().get_eta_many_orders(self.instance, self.context['request'].user.current_merchant)
+        self.eta_dict = ETAToOrders().get_eta_many_orders(self.instance)
 
 
 class ShortSubManagerOrderSerializer(serializers.ModelSerializer):
@@ -12,7 +12,7 @@ from delivery.celery import app
 from radaro_utils import compat
 from radaro_utils.search import watson_index_bulk_update
 from reporting.models import Event
-from reporting.signals import send_create_event_signal
+from reporting.signals import collect_events, send_create_event_signal
 from tasks.models import Order
 from tasks.models.bulk import BulkDelayedUpload
 from tasks.push_notification.utils import send_notifications_for_assigned_jobs_by_bulk
@@ -25,6 +25,7 @@ def get_bulk(_bulk):
 
 
 @app.task(ignore_result=False)
+@collect_events()
 def create_orders_from_prototypes(_bulk, *slice):
     bulk = get_bulk(_bulk)
     bulk.create_orders(*slice)
@@ -32,6 +33,7 @@ def create_orders_from_prototypes(_bulk, *slice):
 
 
 @app.task()
+@collect_events()
 def process_bulk_created_orders(_bulk, set_confirmation=False):
     bulk = get_bulk(_bulk)
     if set_confirmation:
@@ -9,12 +9,14 @@ from django.utils import timezone
 from celery.schedules import crontab
 from celery.task import periodic_task
 
+from driver.queries import refresh_drivers_statuses
 from merchant.models import Merchant
 from merchant.models.mixins import MerchantTypes
 from notification.models import MerchantMessageTemplate
 from tasks.mixins.order_status import OrderStatus
 from tasks.models import Order
 from tasks.utils import generate_data_for_remind_upcoming_delivery, generate_data_for_today_remind_upcoming_delivery
+from tasks.utils.customer_tracking import customer_tracking
 
 CACHE_KEY_UPCOMING_DELIVERY = 'order_cache_time_upcoming_delivery'
 
@@ -137,6 +139,8 @@ def notify_miele_survey_customer():
         merchant_orders = orders.filter(merchant=merchant)
         orders_to_notify = list(merchant_orders)
         merchant_orders.update(status=OrderStatus.DELIVERED)
+        refresh_drivers_statuses({order.driver_id for order in orders_to_notify})
+        customer_tracking.publish_orders(order.id for order in orders_to_notify)
         for order in orders_to_notify:
             order.notify_customer(template_type=MerchantMessageTemplate.SPECIAL_MIELE_SURVEY,
                                   extra_context={"merchant": order.sub_branding or merchant,
@@ -0,0 +1,46 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import BaseCommand
+from django.db import connection
+
+from reporting.models import Event
+from tasks.models import ConcatenatedOrder, Order, OrderTransition
+
+
+class Command(BaseCommand):
+    help = 'Fill the latest transition times of jobs from their change events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='count of jobs processed in one query')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        quote_name = connection.ops.quote_name
+        orders_table = quote_name(Order._meta.db_table)
+        query = '''
+            INSERT INTO {transitions} (order_id, field, value, happened_at)
+            SELECT event.object_id, event.field, event.new_value, max(event.happened_at)
+            FROM {events} event INNER JOIN {orders} job ON job.id = event.object_id
+            WHERE event.object_id >= %s AND event.object_id < %s AND event.content_type_id = ANY(%s)
+                AND event.field = ANY(%s) AND event.new_value IS NOT NULL
+            GROUP BY event.object_id, event.field, event.new_value
+            ON CONFLICT (order_id, field, value) DO UPDATE
+            SET happened_at = GREATEST({transitions}.happened_at, EXCLUDED.happened_at)
+        '''.format(
+            transitions=quote_name(OrderTransition._meta.db_table),
+            events=quote_name(Event._meta.db_table),
+            orders=orders_table,
+        )
+        content_type_ids = [
+            content_type.id for content_type in
+            ContentType.objects.get_for_models(Order, ConcatenatedOrder, for_concrete_models=False).values()
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT min(id), max(id) FROM {orders}'.format(orders=orders_table))
+            min_id, max_id = cursor.fetchone()
+            saved = 0
+            if min_id is not None:
+                for start in range(min_id, max_id + 1, batch_size):
+                    cursor.execute(query, [start, start + batch_size, content_type_ids,
+                                           list(OrderTransition.TRACKED_FIELDS)])
+                    saved += cursor.rowcount
+        self.stdout.write('{} job transitions saved'.format(saved))
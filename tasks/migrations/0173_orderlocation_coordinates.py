@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+from radaro_utils.db import backfill_coordinates
+
+
+def fill_coordinates(apps, schema_editor):
+    OrderLocation = apps.get_model('tasks', 'OrderLocation')
+    backfill_coordinates(schema_editor.connection, OrderLocation._meta.db_table)
+
+
+class Migration(migrations.Migration):
+    # Index is built concurrently to not lock the order locations table
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0172_merge_20220711_2310'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderlocation',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderlocation',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_coordinates, reverse_code=migrations.RunPython.noop),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_orderlocation_earth_gist '
+            'ON tasks_orderlocation USING gist (ll_to_earth(latitude, longitude));',
+            'DROP INDEX CONCURRENTLY IF EXISTS tasks_orderlocation_earth_gist;',
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0174_ordertransition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodedAddress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized_address', models.TextField()),
+                ('regions', models.CharField(max_length=255)),
+                ('language', models.CharField(max_length=16)),
+                ('location', models.CharField(max_length=63)),
+                ('address', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('normalized_address', 'regions', 'language')},
+            },
+        ),
+    ]
@@ -3,10 +3,11 @@ from .bulk import BulkDelayedUpload
 from .cargoes import SKID
 from .concatenated_orders import ConcatenatedOrder
 from .customers import Customer, Pickup
-from .locations import OrderLocation
+from .locations import GeocodedAddress, OrderLocation
 from .orders import Order, OrderConfirmationPhoto, OrderPickUpConfirmationPhoto, OrderPreConfirmationPhoto, OrderStatus
 from .terminate_code import TerminateCode
+from .transitions import OrderTransition
 
-__all__ = ['Barcode', 'BulkDelayedUpload', 'Customer', 'OrderLocation', 'Order',
+__all__ = ['Barcode', 'BulkDelayedUpload', 'Customer', 'GeocodedAddress', 'OrderLocation', 'Order',
            'OrderConfirmationPhoto', 'OrderStatus', 'OrderPreConfirmationPhoto',
-           'OrderPickUpConfirmationPhoto', 'Pickup', 'SKID', 'TerminateCode', 'ConcatenatedOrder']
+           'OrderPickUpConfirmationPhoto', 'Pickup', 'SKID', 'TerminateCode', 'ConcatenatedOrder', 'OrderTransition']
@@ -1,9 +1,9 @@
 from django.db import models
 
-from routing.models.locations import Location
+from routing.models.locations import Location, PointLocationMixin
 
 
-class OrderLocation(Location):
+class OrderLocation(PointLocationMixin, Location):
     raw_address = models.CharField(max_length=255, blank=True)
     secondary_address = models.CharField(max_length=255, blank=True)
 
@@ -21,3 +21,26 @@ class OrderLocation(Location):
         if location is None:
             location = cls.objects.create(location=loc.location, address=loc.address, raw_address='')
         return location
+
+
+class GeocodedAddress(models.Model):
+    """
+    Geocoding result of the normalized address text.
+    Results depend on regions and language of the merchant, so they are the part of the key.
+    """
+    normalized_address = models.TextField()
+    regions = models.CharField(max_length=255)
+    language = models.CharField(max_length=16)
+    location = models.CharField(max_length=63)
+    address = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('normalized_address', 'regions', 'language')
+
+    def __str__(self):
+        return '{} ({})'.format(self.address, self.location)
+
+    @staticmethod
+    def regions_key(regions):
+        return ','.join(regions)
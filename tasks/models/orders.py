@@ -65,7 +65,7 @@ from merchant_extension.models import ResultChecklist, ResultChecklistConfirmati
 from notification.mixins import MessageTemplateStatus
 from notification.models import Device, MerchantMessageTemplate
 from notification.utils import date_template_format
-from radaro_utils.db import DistanceFunc, RoundFunc
+from radaro_utils.db import EarthDistanceFunc, RoundFunc
 from radaro_utils.files.utils import get_upload_path
 from radaro_utils.helpers import DateUTCOffset
 from radaro_utils.models import AttachedPhotoBase, ResizeImageMixin
@@ -142,7 +142,9 @@ class OrderQuerySet(BaseOrderQuerySet):
         ).select_related('bulk')
 
     def order_by_distance(self, latitude, longitude):
-        distance_calculation = DistanceFunc(latitude, longitude, self.model, Order.deliver_address)
+        # Orders are filtered by the driver before, so the distance is calculated from numeric coordinates of
+        # the few orders, locations without them are the last
+        distance_calculation = EarthDistanceFunc(latitude, longitude, 'deliver_address')
         distance_annotation = Case(
             When(status__in=[OrderStatus.ASSIGNED, OrderStatus.PICK_UP, OrderStatus.IN_PROGRESS],
                  then=distance_calculation),
@@ -337,6 +339,7 @@ class AggregatedOrderManager(models.Manager):
                 old_values[nested_order.order_id] = model_to_dict(nested_order, fields=track_fieldnames)
             old_orders[order.order_id] = order
 
+        driver_ids = set(Order.aggregated_objects.filter(id__in=ids).values_list('driver_id', flat=True))
         Order.aggregated_objects.filter(id__in=ids).update(driver=driver, status=to_status)
 
         for order in ConcatenatedOrder.objects.filter(id__in=ids).select_related('merchant'):
@@ -348,6 +351,11 @@ class AggregatedOrderManager(models.Manager):
             for event in AggregatedOrderManager._event_from_bulk(order, initiator, old_values, track_fieldnames):
                 events_for_create.append(event)
 
+        from driver.queries import refresh_drivers_statuses
+        refresh_drivers_statuses(driver_ids | {getattr(driver, 'id', None)})
+        from tasks.utils.customer_tracking import customer_tracking
+        customer_tracking.publish_orders(ids)
+
         created = Event.objects.bulk_create(events_for_create)
         post_bulk_create.send(Event, instances=created, background_notification=background_notification)
 
@@ -468,6 +476,8 @@ class OrderManager(models.Manager):
         created_orders = self.bulk_create(
             [order.prepare_save(existed_order=None) for order in orders]
         )
+        from driver.queries import refresh_drivers_statuses
+        refresh_drivers_statuses(order.driver_id for order in created_orders)
 
         balance_decrease = 0
         for order in created_orders:
@@ -483,7 +493,9 @@ class OrderManager(models.Manager):
         for driver_checklist, order in zip(driver_checklists, orders):
             order.driver_checklist = driver_checklist
 
-        created_orders = self.bulk_create(order.prepare_save(existed_order=None) for order in orders)
+        created_orders = self.bulk_create([order.prepare_save(existed_order=None) for order in orders])
+        from driver.queries import refresh_drivers_statuses
+        refresh_drivers_statuses(order.driver_id for order in created_orders)
         for order in created_orders:
             order.merchant.change_balance(-order.cost)
 
@@ -830,9 +842,25 @@ class Order(OrderTimeDistanceMixin, ResizeImageMixin, OrderStatus, TrackMixin, m
             order = existed_order
         self.prepare_save(order)
         super(Order, self).save(**kwargs)
+        self.refresh_driver_status(order)
         if not order:
             self.remind_about_upcoming_delivery()
 
+    def refresh_driver_status(self, existed_order):
+        # Concatenated orders don't define status of driver, their nested orders do
+        if self.is_concatenated_order:
+            return
+        driver_ids = {self.driver_id}
+        if existed_order:
+            if (existed_order.status, existed_order.driver_id, existed_order.deleted) \
+                    == (self.status, self.driver_id, self.deleted):
+                return
+            driver_ids.add(existed_order.driver_id)
+        from driver.queries import refresh_drivers_statuses
+        drift = refresh_drivers_statuses(driver_ids)
+        if self.driver_id in drift and Order.driver.is_cached(self):
+            self.driver.driver_status = drift[self.driver_id][1]
+
     def safe_delete(self):
         self.deleted = True
         self.save(update_fields=['deleted'])
@@ -998,13 +1026,13 @@ class Order(OrderTimeDistanceMixin, ResizeImageMixin, OrderStatus, TrackMixin, m
     @cached_property
     def eta(self):
         from tasks.utils.order_eta import ETAToOrders
-        eta = ETAToOrders.get_eta(self)
+        eta = ETAToOrders().get_eta(self)
         return None if eta is None else eta['text']
 
     @cached_property
     def eta_seconds(self):
         from tasks.utils.order_eta import ETAToOrders
-        eta = ETAToOrders.get_eta(self)
+        eta = ETAToOrders().get_eta(self)
         return None if eta is None else eta['value']
 
     def allow_order_completion_in_geofence(self, geofence_entered, check_order_status=False):
@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from django.db import connection, models
+
+
+class OrderTransitionQuerySet(models.QuerySet):
+    upsert_query = '''
+        INSERT INTO {table} (order_id, field, value, happened_at) VALUES {values}
+        ON CONFLICT (order_id, field, value) DO UPDATE
+        SET happened_at = GREATEST({table}.happened_at, EXCLUDED.happened_at)
+    '''
+
+    def track(self, transitions):
+        """
+        Saves times of the transitions given as (order_id, field, value, happened_at) tuples.
+        Only the latest time of each field value is kept, so transitions can be saved in any order.
+        """
+        transitions = list(transitions)
+        if not transitions:
+            return
+        query = self.upsert_query.format(
+            table=connection.ops.quote_name(self.model._meta.db_table),
+            values=', '.join(['(%s, %s, %s, %s)'] * len(transitions)),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(query, [param for transition in transitions for param in transition])
+
+    def _get_duration(self, order, first_field, first_value, second_field, second_value):
+        # Same as `EventManager.duration_query`, but the times of the latest transitions are already known
+        if not order:
+            return
+        times = {
+            (field, value): happened_at for field, value, happened_at in self.filter(
+                models.Q(field=first_field, value=first_value) | models.Q(field=second_field, value=second_value),
+                order_id=order.id,
+            ).values_list('field', 'value', 'happened_at')
+        }
+        start, finish = times.get((first_field, first_value)), times.get((second_field, second_value))
+        if start and finish and finish > start:
+            return finish - start + timedelta(minutes=1)
+
+    def time_inside_pickup_geofence(self, order=None):
+        return self._get_duration(order, first_field='pickup_geofence_entered', first_value='True',
+                                  second_field='pickup_geofence_entered', second_value='False')
+
+    def time_at_pickup(self, order=None, to_status=None):
+        return self._get_duration(order, first_field='pickup_geofence_entered', first_value='True',
+                                  second_field='status', second_value=to_status)
+
+    def time_inside_geofence(self, order=None):
+        return self._get_duration(order, first_field='geofence_entered', first_value='True',
+                                  second_field='geofence_entered', second_value='False')
+
+    def time_at_job(self, order=None):
+        return self._get_duration(order, first_field='geofence_entered', first_value='True',
+                                  second_field='status', second_value='delivered')
+
+
+class OrderTransition(models.Model):
+    """
+    The latest time when a tracked field of the job got the value.
+    It is updated on each change event of the field, durations of the job are calculated from these times.
+    """
+    TRACKED_FIELDS = ('status', 'geofence_entered', 'pickup_geofence_entered')
+
+    order = models.ForeignKey('tasks.Order', related_name='transitions', on_delete=models.CASCADE)
+    field = models.CharField(max_length=45)
+    value = models.CharField(max_length=255)
+    happened_at = models.DateTimeField()
+
+    objects = OrderTransitionQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('order', 'field', 'value')
+
+    def __str__(self):
+        return '{} of job {} changed to {} at {}'.format(self.field, self.order_id, self.value, self.happened_at)
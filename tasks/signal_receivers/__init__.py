@@ -2,6 +2,7 @@ from __future__ import absolute_import
 
 from .base import *
 from .concatenated_order import *
+from .customer_tracking import *
 from .external_job import *
 from .geofence import *
 from .notification import *
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from tasks.models import ConcatenatedOrder, Order
+from tasks.utils.customer_tracking import customer_tracking
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=ConcatenatedOrder)
+def publish_order_to_customer_tracking(instance, **kwargs):
+    def callback():
+        customer_tracking.publish_order(instance)
+
+    callback() if settings.TESTING_MODE else transaction.on_commit(callback)
+
+
+__all__ = ['publish_order_to_customer_tracking', ]
@@ -0,0 +1,132 @@
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+import mock
+from geopy.location import Location
+
+from radaro_utils.geo import normalize_address
+from tasks.models import BulkDelayedUpload, GeocodedAddress, OrderLocation
+from tasks.utils import StringAddressToOrderLocation
+
+from .tests_bulk import BaseBulkUploadTestCase
+
+
+class FakeGeocoder(object):
+    """
+    Answers instead of the geocoding API after the latency and counts requests.
+    """
+
+    def __init__(self, latency=0.):
+        self.latency = latency
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, value, region, **kwargs):
+        with self.lock:
+            self.requests.append(value)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+        checksum = zlib.crc32(normalize_address(value).encode())
+        return Location(normalize_address(value).title(), (checksum % 180 - 90, checksum % 360 - 180), {})
+
+
+@override_settings(GEOCODING_MAX_CONCURRENT_REQUESTS=5, GEOCODING_QUERIES_PER_SECOND=1000)
+class BulkUploadGeocodingTestCase(BaseBulkUploadTestCase):
+    addresses = ['{} Collins Street, Melbourne'.format(number) for number in range(1, 21)]
+
+    @classmethod
+    def setUpTestData(cls):
+        super(BulkUploadGeocodingTestCase, cls).setUpTestData()
+        cls.merchant.balance = 1000
+        cls.merchant.save()
+
+    def patch_geocoder(self, latency=0.):
+        geocoder = FakeGeocoder(latency)
+        patcher = mock.patch('radaro_utils.geo.GoogleClient.geocode', side_effect=geocoder)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return geocoder
+
+    def typed_address(self, ind):
+        # The same addresses are typed differently in the rows
+        address = self.addresses[ind % len(self.addresses)]
+        return address.upper().replace(', ', ' ,  ') if ind % 3 == 1 else address
+
+    def upload_addresses(self, rows_count):
+        csv_text = self.create_random_csv({'job_address': self.typed_address}, length=rows_count)
+        task_id = self.send_opened_file(csv_text).data['task']['id']
+        self.client.post('/api/bulk/%d/process' % (task_id,))
+        return BulkDelayedUpload.objects.get(id=task_id)
+
+    def test_addresses_of_upload_are_geocoded_once_concurrently(self):
+        geocoder = self.patch_geocoder(latency=0.1)
+        started_at = time.monotonic()
+        bulk = self.upload_addresses(rows_count=200)
+        duration = time.monotonic() - started_at
+
+        self.assertEqual(bulk.status, BulkDelayedUpload.COMPLETED)
+        self.assertFalse(bulk.errors.exists())
+        self.assertEqual(sorted(map(normalize_address, geocoder.requests)),
+                         sorted(map(normalize_address, self.addresses)))
+        self.assertGreater(geocoder.max_in_flight, 1)
+        self.assertLessEqual(geocoder.max_in_flight, 5)
+        # Sequential geocoding takes 2 seconds
+        self.assertLess(duration, len(self.addresses) * geocoder.latency / 2)
+
+        locations = OrderLocation.objects.filter(raw_address__in=[self.typed_address(ind) for ind in range(200)])
+        self.assertEqual(len(set(locations.values_list('location', flat=True))), len(self.addresses))
+        self.assertEqual(GeocodedAddress.objects.count(), len(self.addresses))
+        self.assertIn(BulkDelayedUpload.PROGRESS, [log['level'] for log in bulk.log])
+
+    def test_progress_is_reported_per_percent(self):
+        self.patch_geocoder()
+        rows_count = 400
+        csv_text = self.create_random_csv(
+            {'job_address': lambda ind: '{} Flinders Street, Melbourne'.format(ind + 1)}, length=rows_count
+        )
+        task_id = self.send_opened_file(csv_text).data['task']['id']
+        with mock.patch.object(BulkDelayedUpload, 'event', autospec=True,
+                               side_effect=BulkDelayedUpload.event) as event_mock:
+            self.client.post('/api/bulk/%d/process' % (task_id,))
+
+        progress = [call[0][1] for call in event_mock.call_args_list if call[0][2] == BulkDelayedUpload.PROGRESS]
+        self.assertEqual(progress, sorted(progress))
+        # Addresses are geocoded one by one, progress is reported once per percent and chunk
+        chunks_count = -(-rows_count // settings.BULK_JOB_CREATION_BATCH_SIZE)
+        self.assertLessEqual(len(progress), 100 + chunks_count)
+        self.assertLess(len(progress), rows_count)
+
+    def test_known_addresses_are_found_with_one_query(self):
+        geocoder = self.patch_geocoder()
+        self.upload_addresses(rows_count=len(self.addresses))
+        geocoder.requests.clear()
+        OrderLocation.objects.all().delete()
+
+        converter = StringAddressToOrderLocation()
+        values = [(self.typed_address(ind), '') for ind in range(100)]
+        with CaptureQueriesContext(connection) as queries:
+            converter.prefetch(values, self.manager)
+
+        self.assertEqual(geocoder.requests, [])
+        cache_queries = [query for query in queries if 'FROM "tasks_geocodedaddress"' in query['sql']]
+        self.assertEqual(len(cache_queries), 1)
+        for value in values:
+            self.assertIsNotNone(converter.to_order_location(value, self.manager))
+
+    @override_settings(GEOCODING_QUERIES_PER_SECOND=5)
+    def test_geocoding_rate_is_limited(self):
+        self.patch_geocoder()
+        started_at = time.monotonic()
+        StringAddressToOrderLocation().prefetch([(address, '') for address in self.addresses[:10]], self.manager)
+        self.assertGreaterEqual(time.monotonic() - started_at, 1)
@@ -0,0 +1,135 @@
+import json
+
+from django.test import override_settings
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+import fakeredis
+import mock
+
+from base.factories import DriverFactory, ManagerFactory
+from base.models import Member
+from driver.factories import DriverLocationFactory
+from merchant.factories import MerchantFactory
+from tasks.mixins.order_status import OrderStatus
+from tasks.models import Order
+from tasks.tests.factories import OrderFactory
+from tasks.utils.customer_tracking import customer_tracking
+
+
+@override_settings(CUSTOMER_TRACKING_STREAM_KEEPALIVE=60)
+class CustomerTrackingTestCase(APITestCase):
+    fixtures = ['fixtures/tests/constance.json', ]
+
+    customer_order_api_url = '/api/customers/{uid}/orders/{token}/{path}'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.merchant = MerchantFactory()
+        cls.manager = ManagerFactory(merchant=cls.merchant)
+        cls.driver = DriverFactory(merchant=cls.merchant)
+        cls.order, cls.other_order = [
+            OrderFactory(merchant=cls.merchant, manager=cls.manager, driver=cls.driver, status=OrderStatus.IN_PROGRESS)
+            for _ in range(2)
+        ]
+
+    def setUp(self):
+        patcher = mock.patch.object(customer_tracking, '_redis', fakeredis.FakeStrictRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_url(self, path):
+        return self.customer_order_api_url.format(
+            uid=urlsafe_base64_encode(force_bytes(self.order.customer_id)), token=self.order.order_token, path=path
+        )
+
+    def set_driver_location(self, location):
+        last_location = DriverLocationFactory(member=self.driver, location=location)
+        Member.objects.filter(id=self.driver.id).update(last_location=last_location)
+        return last_location
+
+    def test_idle_polls_are_not_modified(self):
+        resp = self.client.get(self.get_url('stats'))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        etag = resp['ETag']
+        # Browser keeps the response to revalidate it
+        self.assertNotIn('no-store', resp['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            resp = self.client.get(self.get_url('stats'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Data depends on the parameters
+        resp = self.client.get(self.get_url('stats?last_event=1'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        self.order.title = 'Changed title'
+        self.order.save()
+        resp = self.client.get(self.get_url('stats'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_bulk_status_change_is_not_modified_after(self):
+        resp = self.client.get(self.get_url('stats'))
+        etag = resp['ETag']
+
+        # Status is changed by queryset update, without `post_save`
+        Order.aggregated_objects.bulk_status_change([self.order.id], OrderStatus.NOT_ASSIGNED)
+        resp = self.client.get(self.get_url('stats'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_driver_location_is_pushed(self):
+        events = customer_tracking.listen(self.order.order_token)
+        self.assertTrue(next(events).startswith('retry:'))
+        version = json.loads(next(events).split('data: ')[1])['version']
+        # Keepalive marks the order watched
+        self.assertEqual(next(events), ': keepalive\n\n')
+        other_order_channel = customer_tracking.redis.pubsub(ignore_subscribe_messages=True)
+        other_order_channel.subscribe(customer_tracking.CHANNEL.format(self.other_order.order_token))
+
+        last_location = self.set_driver_location('-37.8136,144.9631')
+        eta = {'text': '5 mins', 'value': 300}
+        with mock.patch('tasks.utils.order_eta.ETAToOrders.get_eta_many_orders',
+                        return_value={self.order.id: eta}) as get_eta:
+            customer_tracking.publish_driver_location(self.driver.id)
+        self.assertEqual([order.id for order in get_eta.call_args[0][0]], [self.order.id])
+
+        event = next(events)
+        self.assertTrue(event.startswith('id: {}\nevent: delta\n'.format(version + 1)))
+        delta = json.loads(event.split('data: ')[1])
+        self.assertEqual(delta['driver']['last_location']['id'], last_location.id)
+        self.assertEqual(delta['eta'], eta)
+
+        # ETA is calculated only for the watched orders
+        message = other_order_channel.get_message(timeout=1)
+        self.assertNotIn('eta', json.loads(message['data']))
+        self.assertEqual(json.loads(message['data'])['driver']['last_location']['id'], last_location.id)
+        events.close()
+
+    def test_stream_is_opened(self):
+        resp = self.client.get(self.get_url('stream'), HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp['Content-Type'], 'text/event-stream')
+        content = iter(resp.streaming_content)
+        self.assertTrue(next(content).startswith(b'retry:'))
+        self.assertIn(b'event: version', next(content))
+        resp.close()
+
+    @override_settings(CUSTOMER_TRACKING_MAX_STREAMS=1)
+    def test_streams_are_limited(self):
+        stream_id = customer_tracking.open_stream()
+        self.assertIsNotNone(stream_id)
+
+        # Other tracking pages fall back to polling
+        resp = self.client.get(self.get_url('stream'), HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
+
+        events = customer_tracking.listen(self.order.order_token, stream_id)
+        next(events)
+        events.close()
+        self.assertIsNotNone(customer_tracking.open_stream())
@@ -8,6 +8,7 @@ from datetime import timedelta
 
 import django
 from django.forms.models import model_to_dict
+from django.test import TestCase
 from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
@@ -32,7 +33,7 @@ from tasks.api.legacy.serializers.orders import OrderDeadlineSerializer
 from tasks.mixins.order_status import OrderStatus
 from tasks.models import OrderLocation
 from tasks.models.orders import Order
-from tasks.tests.factories import CustomerFactory, OrderFactory
+from tasks.tests.factories import CustomerFactory, OrderFactory, OrderLocationFactory
 from tasks.utils import create_order_event_times, create_order_for_test
 
 from .base_test_cases import BaseOrderTestCase
@@ -721,3 +722,22 @@ class OrderTestCase(NotificationTestMixin, BaseOrderTestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(type(resp_json_data['results'][0]['deliver_address']['location']), dict)
         self.assertGreater(resp_json_data.get('count'), 0)
+
+
+class OrdersOrderingByDistanceTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.merchant = MerchantFactory()
+        cls.driver = DriverFactory(merchant=cls.merchant)
+        cls.far_order, cls.near_order = [
+            OrderFactory(merchant=cls.merchant, driver=cls.driver, status=OrderStatus.IN_PROGRESS,
+                         deliver_address=OrderLocationFactory(location=location))
+            for location in ('53.950000,27.700000', '53.900000,27.560000')
+        ]
+
+    def test_nearest_order_of_driver(self):
+        orders = self.driver.order_set.all().filter(status=OrderStatus.IN_PROGRESS).order_by_distance('53.9', '27.55')
+        self.assertEqual(list(orders), [self.near_order, self.far_order])
+        self.assertAlmostEqual(float(orders[0].distance), 0.407, places=2)
+        # Distance is calculated from numeric coordinates, not by the subquery for each order
+        self.assertNotIn('SubPlan', orders.explain())
@@ -0,0 +1,154 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+import mock
+
+from base.factories import DriverFactory, ManagerFactory
+from base.models import Member
+from driver.factories import DriverLocationFactory
+from merchant.factories import MerchantFactory
+from merchant.models import Merchant
+from route_optimisation.tests.test_utils.distance_matrix import LocalCacheDiMa
+from routing.google import GoogleClient
+from tasks.mixins.order_status import OrderStatus
+from tasks.models import Order
+from tasks.tests.factories import OrderFactory, OrderLocationFactory
+from tasks.utils.order_eta import ETAToOrders
+
+
+class FakeDirectionsClient(object):
+    """
+    Answers instead of Google Maps API and counts requests.
+    Leg takes one second per 0.0001 degree of latitude and longitude, twice more in traffic.
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    @staticmethod
+    def duration(origin, destination):
+        if isinstance(origin, str):
+            origin, destination = ({'lat': point.split(',')[0], 'lng': point.split(',')[1]}
+                                   for point in (origin, destination))
+        return int(round(10000 * (abs(float(origin['lat']) - float(destination['lat']))
+                                  + abs(float(origin['lng']) - float(destination['lng'])))))
+
+    def single_dima_element(self, origin, destination, departure_time=None, **kwargs):
+        self.requests.append('distance matrix')
+        duration = self.duration(origin, destination)
+        element = {'status': 'OK', 'distance': {'value': duration}, 'duration': {'value': duration}}
+        if departure_time:
+            element['duration_in_traffic'] = {'value': duration * 2}
+        return element
+
+    def pure_directions_request(self, origin, destination, waypoints=None, **kwargs):
+        self.requests.append('directions')
+        points = [origin] + list(waypoints or []) + [destination]
+        legs = [
+            {'distance': {'value': self.duration(*pair)}, 'duration': {'value': self.duration(*pair)}, 'steps': []}
+            for pair in zip(points[:-1], points[1:])
+        ]
+        return [{'legs': legs}]
+
+
+class ETAToOrdersTestCase(TestCase):
+    fixtures = ['fixtures/tests/constance.json', ]
+
+    # The last two jobs are at the same place
+    job_locations = ['53.9100,27.5600', '53.9200,27.5700', '53.9250,27.5900', '53.9250,27.5900']
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.merchant = MerchantFactory(job_service_time=5)
+        cls.manager = ManagerFactory(merchant=cls.merchant)
+        cls.driver = DriverFactory(merchant=cls.merchant)
+        cls.driver.last_location = DriverLocationFactory(member=cls.driver, location='53.9000,27.5500')
+        cls.driver.save(update_fields=('last_location',))
+        now = timezone.now()
+        cls.jobs = [
+            OrderFactory(merchant=cls.merchant, manager=cls.manager, driver=cls.driver, status=OrderStatus.IN_PROGRESS,
+                         deliver_address=OrderLocationFactory(location=location),
+                         deliver_before=now + timedelta(hours=ind + 1))
+            for ind, location in enumerate(cls.job_locations)
+        ]
+
+    def set_driver_location(self, location):
+        Member.objects.filter(id=self.driver.id).update(
+            last_location=DriverLocationFactory(member=self.driver, location=location)
+        )
+        ETAToOrders.invalidate(self.driver.id)
+
+    def setUp(self):
+        self.maps = FakeDirectionsClient()
+        for method in ('single_dima_element', 'pure_directions_request'):
+            patcher = mock.patch.object(GoogleClient, method, side_effect=getattr(self.maps, method))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch('tasks.utils.order_eta.RadaroDimaCache', LocalCacheDiMa)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        LocalCacheDiMa().cache.clear()
+        ETAToOrders.invalidate(self.driver.id)
+        self.addCleanup(ETAToOrders.invalidate, self.driver.id)
+
+    def refresh_etas(self, jobs=None):
+        # Each refresh is a separate request to the API
+        self.maps.requests.clear()
+        orders = Order.objects.filter(driver=self.driver).select_related('driver__last_location', 'deliver_address')
+        etas = ETAToOrders().get_eta_many_orders(orders)
+        return [etas[job.id]['value'] for job in jobs or self.jobs]
+
+    def expected_etas(self, driver_location, jobs, traffic=1):
+        points = [driver_location] + [job.deliver_address.location for job in jobs]
+        etas = [FakeDirectionsClient.duration(points[0], points[1]) * traffic]
+        for from_, to_ in zip(points[1:-1], points[2:]):
+            etas.append(etas[-1] + 5 * 60 + FakeDirectionsClient.duration(from_, to_))
+        return etas
+
+    def test_etas_are_propagated_along_route(self):
+        etas = self.refresh_etas()
+        self.assertEqual(etas, self.expected_etas('53.9000,27.5500', self.jobs))
+        # Driver location changes only the first leg, legs between the jobs are cached
+        self.assertEqual(self.maps.requests, ['distance matrix', 'directions'])
+
+    def test_external_calls_per_refresh(self):
+        self.refresh_etas()
+
+        # Location is the same, ETAs are not calculated again
+        for _ in range(3):
+            self.refresh_etas()
+            self.assertEqual(self.maps.requests, [])
+
+        self.set_driver_location('53.9050,27.5550')
+        etas = self.refresh_etas()
+        self.assertEqual(self.maps.requests, ['distance matrix'])
+        self.assertEqual(etas, self.expected_etas('53.9050,27.5550', self.jobs))
+
+        # Finished job is not on the route anymore
+        Order.objects.filter(id=self.jobs[0].id).update(status=OrderStatus.DELIVERED)
+        etas = self.refresh_etas(jobs=self.jobs[1:])
+        self.assertEqual(self.maps.requests, ['distance matrix'])
+        self.assertEqual(etas, self.expected_etas('53.9050,27.5550', self.jobs[1:]))
+
+    def test_first_leg_with_traffic(self):
+        Merchant.objects.filter(id=self.merchant.id).update(eta_with_traffic=True)
+        etas = self.refresh_etas()
+        self.assertEqual(etas[0], self.expected_etas('53.9000,27.5500', self.jobs, traffic=2)[0])
+        self.assertEqual(etas[1] - etas[0], self.expected_etas('53.9000,27.5500', self.jobs)[1]
+                         - self.expected_etas('53.9000,27.5500', self.jobs)[0])
+
+    def test_single_order_eta(self):
+        order = Order.objects.get(id=self.jobs[2].id)
+        self.assertEqual(order.eta_seconds, self.expected_etas('53.9000,27.5500', self.jobs)[2])
+        self.assertEqual(order.eta, ETAToOrders.format_duration(order.eta_seconds))
+
+    def test_eta_text_format(self):
+        # Format of the duration text of Google Maps
+        self.assertEqual(ETAToOrders.format_duration(20), '1 min')
+        self.assertEqual(ETAToOrders.format_duration(12 * 60 + 10), '12 mins')
+        self.assertEqual(ETAToOrders.format_duration(60 * 60), '1 hour')
+        self.assertEqual(ETAToOrders.format_duration(2 * 60 * 60 + 61), '2 hours 1 min')
+        self.assertEqual(ETAToOrders.format_duration(26 * 60 * 60), '1 day 2 hours')
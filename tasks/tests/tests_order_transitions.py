@@ -0,0 +1,85 @@
+import random
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from base.factories import ManagerFactory
+from merchant.factories import MerchantFactory
+from reporting.models import Event
+from reporting.signals import event_created
+from tasks.mixins.order_status import OrderStatus
+from tasks.models import OrderTransition
+from tasks.tests.factories import OrderFactory
+
+
+class OrderTransitionsTestCase(TestCase):
+    fixtures = ['fixtures/tests/constance.json', ]
+
+    # Changes of the jobs as (minutes since start, field, value)
+    scenarios = {
+        'completed': [
+            (1, 'status', OrderStatus.PICK_UP), (2, 'pickup_geofence_entered', True),
+            (8, 'status', OrderStatus.PICKED_UP), (9, 'pickup_geofence_entered', False),
+            (10, 'status', OrderStatus.IN_PROGRESS), (20, 'geofence_entered', True),
+            (25, 'status', OrderStatus.DELIVERED), (27, 'geofence_entered', False),
+        ],
+        're-entered': [
+            (1, 'status', OrderStatus.IN_PROGRESS), (2, 'geofence_entered', True), (5, 'geofence_entered', False),
+            (20, 'geofence_entered', True), (30, 'geofence_entered', False), (31, 'status', OrderStatus.DELIVERED),
+        ],
+        'still inside': [
+            (1, 'status', OrderStatus.IN_PROGRESS), (2, 'geofence_entered', True), (5, 'geofence_entered', False),
+            (20, 'geofence_entered', True), (21, 'status', OrderStatus.FAILED),
+        ],
+        'pickup skipped': [
+            (1, 'status', OrderStatus.PICK_UP), (2, 'pickup_geofence_entered', True),
+            (6, 'status', OrderStatus.IN_PROGRESS), (7, 'status', OrderStatus.DELIVERED),
+        ],
+        'no events': [],
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.merchant = MerchantFactory()
+        cls.manager = ManagerFactory(merchant=cls.merchant)
+        start = timezone.now() - timedelta(hours=1)
+        cls.orders, cls.events = [], []
+        for scenario in cls.scenarios.values():
+            order = OrderFactory(merchant=cls.merchant, manager=cls.manager, driver=None, external_job=None)
+            cls.orders.append(order)
+            for minutes, field, value in scenario:
+                cls.events.append(Event.objects.create(
+                    object=order, merchant=cls.merchant, event=Event.CHANGED, field=field, new_value=str(value),
+                    happened_at=start + timedelta(minutes=minutes),
+                ))
+
+    def assertDurationsMatchEvents(self):
+        for order in self.orders:
+            for method, args in (('time_inside_pickup_geofence', ()),
+                                 ('time_at_pickup', (OrderStatus.PICKED_UP, )),
+                                 ('time_at_pickup', (OrderStatus.IN_PROGRESS, )),
+                                 ('time_inside_geofence', ()),
+                                 ('time_at_job', ())):
+                with self.subTest(order=order.id, method=method, args=args):
+                    self.assertEqual(getattr(OrderTransition.objects, method)(order, *args),
+                                     getattr(Event.objects, method)(order, *args))
+
+    def test_backfilled_durations_match_events(self):
+        call_command('backfill_order_transitions', batch_size=2)
+        self.assertDurationsMatchEvents()
+        self.assertIsNotNone(OrderTransition.objects.time_at_job(self.orders[0]))
+
+        # Backfill can be repeated
+        call_command('backfill_order_transitions')
+        self.assertDurationsMatchEvents()
+
+    def test_durations_tracked_on_events_match_events(self):
+        # Offline events can come in any order
+        events = list(self.events)
+        random.shuffle(events)
+        for event in events:
+            event_created.send(sender=None, event=event)
+        self.assertDurationsMatchEvents()
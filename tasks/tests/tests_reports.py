@@ -1,9 +1,12 @@
 from __future__ import absolute_import, unicode_literals
 
+import csv
+import tracemalloc
 from datetime import timedelta
 
-from django.db import transaction
+from django.db import connection, transaction
 from django.test import override_settings, tag
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from rest_framework.status import HTTP_200_OK
@@ -11,12 +14,44 @@ from rest_framework.status import HTTP_200_OK
 from six.moves import xrange
 
 from radaro_utils.tests.utils import PerformanceMeasure
+from reporting.models import ExportReportInstance
+from tasks.mixins.order_status import OrderStatus
+from tasks.models import Order
 
 from .utils import CreateJobsForReportMixin
 
 
 class CSVReportTestCase(CreateJobsForReportMixin):
 
+    def export_orders(self):
+        now = timezone.now()
+        resp = self.client.get('/api/v2/reports/orders/', {
+            'date_from': now - timedelta(weeks=4),
+            'date_to': now,
+            'driver_id': '',
+            'export': 'csv'
+        })
+        self.assertEqual(resp.status_code, HTTP_200_OK)
+        report = ExportReportInstance.objects.get(id=resp.data['id'])
+        self.assertEqual(report.status, ExportReportInstance.COMPLETED)
+        return report
+
+    def read_report_rows(self, report):
+        report.file.open('r')
+        try:
+            return list(csv.reader(report.file))[1:]
+        finally:
+            report.file.close()
+
+    def create_orders_in_bulk(self, count, batch_size=10000):
+        order = self.create_default_order(driver=None)
+        for start in range(0, count, batch_size):
+            Order.objects.create_in_bulk([
+                Order(merchant=self.merchant, manager=self.manager, customer=self.customer,
+                      deliver_address=order.deliver_address, status=OrderStatus.NOT_ASSIGNED)
+                for _ in range(min(batch_size, count - start))
+            ])
+
     def test_csv_download(self):
         self.create_orders_for_report(self.steps, size=16)
         self.client.force_authenticate(self.manager)
@@ -45,6 +80,36 @@ class CSVReportTestCase(CreateJobsForReportMixin):
     def test_csv_download_with_small_chunk_size(self):
         self.test_csv_download()
 
+    @override_settings(BULK_JOB_REPORT_BATCH_SIZE=5)
+    def test_csv_is_written_in_chunks(self):
+        self.create_orders_for_report(self.steps, size=16)
+        self.client.force_authenticate(self.manager)
+        with CaptureQueriesContext(connection) as queries:
+            report = self.export_orders()
+
+        rows = self.read_report_rows(report)
+        expected_ids = Order.objects.filter(merchant=self.merchant).order_by('id').values_list('order_id', flat=True)
+        self.assertEqual([int(row[0]) for row in rows], list(expected_ids))
+        # Jobs are not paginated with OFFSET, the heavy report query is executed once per chunk
+        self.assertFalse([query for query in queries if 'OFFSET' in query['sql']])
+
+    @tag('performance')
+    def test_csv_export_memory_does_not_grow_with_jobs_count(self):
+        self.client.force_authenticate(self.manager)
+        peaks = []
+        for count in (20000, 180000):
+            self.create_orders_in_bulk(count)
+            tracemalloc.start()
+            try:
+                report = self.export_orders()
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+            print('Peak memory of export: {:.1f} MB'.format(peaks[-1] / 2 ** 20))
+        self.assertEqual(len(self.read_report_rows(report)), 200000)
+        # Ten times more jobs are written with about the same memory
+        self.assertLess(peaks[1], peaks[0] * 2)
+
     @tag('performance')
     def test_large_csv_download(self):
         self.client.force_authenticate(self.manager)
@@ -0,0 +1,183 @@
+import json
+import time
+import uuid
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from django_redis import get_redis_connection
+
+
+class CustomerTrackingChannel:
+    """
+    Versions and pushes changes of the orders tracked by customers.
+
+    Every change of the order increments its counter in `VERSION_KEY`, so idle polls of the tracking page are
+    answered by ETag without touching the database. The change is published as a delta to `CHANNEL` of the order,
+    which is streamed to the tracking page as server-sent events.
+    Streams mark the order in `WATCHED_KEY`, so ETAs are calculated for deltas of the watched orders only.
+
+    Each stream holds a sync worker, so streams are closed before the worker timeout and at most
+    `CUSTOMER_TRACKING_MAX_STREAMS` of them are open in `STREAMS_KEY`. Other tracking pages poll with ETags.
+    """
+    VERSION_KEY = 'customer-tracking-version-{}'
+    WATCHED_KEY = 'customer-tracking-watched-{}'
+    STREAMS_KEY = 'customer-tracking-streams'
+    CHANNEL = 'customer-tracking-{}'
+    # Counters of the orders not changed for a day are dropped
+    VERSION_TIMEOUT = 24 * 60 * 60
+    RECONNECT_DELAY_MS = 1000
+
+    def __init__(self, redis=None):
+        self._redis = redis
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_connection('default')
+        return self._redis
+
+    def get_version(self, order_token):
+        key = self.VERSION_KEY.format(order_token)
+        version = self.redis.get(key)
+        if version is None:
+            # Counter starts from the current time, so versions of the dropped counter are not repeated
+            self.redis.set(key, int(time.time() * 1000), ex=self.VERSION_TIMEOUT, nx=True)
+            version = self.redis.get(key)
+        return int(version)
+
+    def get_etag(self, order_token, path):
+        # Related objects (merchant, sub-branding, etc.) are not versioned, so ETags expire after the lifetime
+        lifetime_period = int(time.time() // settings.CUSTOMER_TRACKING_ETAG_LIFETIME)
+        return '{}-{}-{:x}'.format(self.get_version(order_token), lifetime_period, zlib.crc32(path.encode()))
+
+    def get_watched(self, order_tokens):
+        order_tokens = list(order_tokens)
+        if not order_tokens:
+            return set()
+        watched = self.redis.mget([self.WATCHED_KEY.format(order_token) for order_token in order_tokens])
+        return {order_token for order_token, is_watched in zip(order_tokens, watched) if is_watched}
+
+    def publish(self, deltas):
+        """
+        Increments versions of the orders and publishes their deltas.
+        `deltas` maps order tokens to the changed data.
+        """
+        if not deltas:
+            return
+        pipeline = self.redis.pipeline()
+        for order_token in deltas:
+            pipeline.incr(self.VERSION_KEY.format(order_token))
+            pipeline.expire(self.VERSION_KEY.format(order_token), self.VERSION_TIMEOUT)
+        versions = pipeline.execute()[::2]
+
+        pipeline = self.redis.pipeline()
+        for (order_token, delta), version in zip(deltas.items(), versions):
+            pipeline.publish(self.CHANNEL.format(order_token),
+                             json.dumps(dict(delta, version=version), cls=DjangoJSONEncoder))
+        pipeline.execute()
+
+    def publish_order(self, order):
+        self.publish({str(order.order_token): {'status': order.status, 'updated_at': order.updated_at}})
+
+    def publish_orders(self, order_ids):
+        """
+        Publishes the orders after commit. Should be called after any change of status of orders,
+        that is done without `Order.save()`.
+        """
+        from tasks.models import Order
+
+        order_ids = list(order_ids)
+
+        def callback():
+            orders = Order.aggregated_objects.filter(id__in=order_ids).only('order_token', 'status', 'updated_at')
+            self.publish({
+                str(order.order_token): {'status': order.status, 'updated_at': order.updated_at} for order in orders
+            })
+
+        callback() if settings.TESTING_MODE else transaction.on_commit(callback)
+
+    def publish_driver_location(self, driver_id):
+        """
+        Publishes the last location of the driver to the orders of the driver, with ETAs for the watched orders.
+        """
+        from tasks.api.legacy.serializers.customer_tracking import CustomerDriverLocationSerializer
+        from tasks.models import Order
+        from tasks.utils.order_eta import ETAToOrders
+
+        orders = list(Order.aggregated_objects.filter(
+            driver_id=driver_id, status__in=Order.status_groups.MONITORED,
+        ).select_related('driver__last_location', 'deliver_address', 'merchant'))
+        if not orders or orders[0].driver.last_location is None:
+            return
+
+        location = CustomerDriverLocationSerializer(orders[0].driver.last_location).data
+        deltas = {str(order.order_token): {'driver': {'last_location': location}} for order in orders}
+        watched = self.get_watched(deltas.keys())
+        if watched:
+            watched_orders = [order for order in orders if str(order.order_token) in watched]
+            etas = ETAToOrders().get_eta_many_orders(watched_orders)
+            for order in watched_orders:
+                deltas[str(order.order_token)]['eta'] = etas[order.id]
+        self.publish(deltas)
+
+    def open_stream(self):
+        """
+        Registers a new stream, returns its id or `None` if there are too many open streams.
+        Streams which were not closed are dropped after their timeout.
+        """
+        stream_id, now = uuid.uuid4().hex, time.time()
+        pipeline = self.redis.pipeline()
+        pipeline.zremrangebyscore(self.STREAMS_KEY, '-inf', now)
+        pipeline.zadd(self.STREAMS_KEY, {stream_id: now + settings.CUSTOMER_TRACKING_STREAM_TIMEOUT})
+        pipeline.zcard(self.STREAMS_KEY)
+        pipeline.expire(self.STREAMS_KEY, settings.CUSTOMER_TRACKING_STREAM_TIMEOUT)
+        streams_count = pipeline.execute()[2]
+        if streams_count > settings.CUSTOMER_TRACKING_MAX_STREAMS:
+            self.close_stream(stream_id)
+            return None
+        return stream_id
+
+    def close_stream(self, stream_id):
+        self.redis.zrem(self.STREAMS_KEY, stream_id)
+
+    def listen(self, order_token, stream_id=None):
+        """
+        Yields server-sent events with the deltas of the order until the stream timeout.
+        The first event is the current version, so the changes made before the subscription are not missed.
+        Comments are sent periodically to keep the connection alive and the order watched.
+        Stream registered by `open_stream()` is closed at the end.
+        """
+        keepalive = settings.CUSTOMER_TRACKING_STREAM_KEEPALIVE
+        deadline = time.monotonic() + settings.CUSTOMER_TRACKING_STREAM_TIMEOUT
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.CHANNEL.format(order_token))
+        try:
+            version = self.get_version(order_token)
+            yield 'retry: {}\n\n'.format(self.RECONNECT_DELAY_MS)
+            yield self._format_event('version', {'version': version})
+            next_keepalive = time.monotonic()
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                if now >= next_keepalive:
+                    self.redis.set(self.WATCHED_KEY.format(order_token), 1, ex=keepalive * 2)
+                    yield ': keepalive\n\n'
+                    next_keepalive = now + keepalive
+                message = pubsub.get_message(timeout=min(next_keepalive, deadline) - now)
+                if message is not None:
+                    yield self._format_event('delta', json.loads(message['data']))
+        finally:
+            pubsub.close()
+            if stream_id is not None:
+                self.close_stream(stream_id)
+
+    @staticmethod
+    def _format_event(event, data):
+        return 'id: {}\nevent: {}\ndata: {}\n\n'.format(data['version'], event, json.dumps(data))
+
+
+customer_tracking = CustomerTrackingChannel()
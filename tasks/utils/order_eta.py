@@ -1,29 +1,40 @@
 from collections import defaultdict
 
 from django.core.cache import cache
+from django.utils import translation
+from django.utils.translation import ngettext
 
 import googlemaps
 
-from radaro_utils.helpers import chunks
+from route_optimisation.dima import RadaroDimaCache
 from routing.google import GoogleClient
+from routing.utils import latlng_dict_from_str
+
+from ..models import Order
 
 
 class ETAToOrders(object):
+    """
+    ETAs of the monitored jobs are calculated along the route of the driver, jobs are visited in order of deadlines.
+    Only the leg from the driver to the first job is requested with the current location (and traffic, if merchant
+    uses it). Legs between the jobs are taken from the distance matrix cache of route optimisation, missing ones are
+    requested once and cached there. ETAs of the driver are kept until the location or the jobs of the driver change.
+    """
     gc = GoogleClient()
-    ETA_STORAGE_TIME_IN_CACHE = 120  # In seconds
+    ETA_KEY = 'driver-route-eta-{}'
+    # Only drops ETAs of the drivers who don't send locations anymore
+    ETA_STORAGE_TIME_IN_CACHE = 60 * 60
 
-    @staticmethod
-    def get_eta_from_cache(order):
-        if order.id:
-            return cache.get('order-eta-{}'.format(order.id))
-        return None
+    def __init__(self, dima_cache=None):
+        self.dima_cache = dima_cache or RadaroDimaCache()
+
+    @classmethod
+    def invalidate(cls, driver_id):
+        cache.delete(cls.ETA_KEY.format(driver_id))
 
     @staticmethod
-    def save_eta_in_cache(order, value, seconds=ETA_STORAGE_TIME_IN_CACHE):
-        if order.id:
-            cache_key = 'order-eta-{}'.format(order.id)
-            cache.set(cache_key, value, seconds)
-        return value
+    def get_driver_location(driver):
+        return driver.last_location.improved_location or driver.last_location.location
 
     def _filter_orders(self, items):
         filtered_items = {}
@@ -40,7 +51,7 @@ class ETAToOrders(object):
             if order.driver.last_location is None:
                 continue
 
-            start_point = order.driver.last_location.improved_location or order.driver.last_location.location
+            start_point = self.get_driver_location(order.driver)
             end_point = order.deliver_address.location
             if not start_point or not end_point:
                 continue
@@ -50,74 +61,101 @@ class ETAToOrders(object):
         return list(filtered_items.values())
 
     @staticmethod
-    def _get_orders_requiring_calculate_eta(orders):
-        # the method filters out those eta that do not need to be calculated, or can be obtained from the cache
-        orders_without_eta = []
-        eta_values = defaultdict(lambda: {'text': None, 'value': None})
-
-        for order in orders:
-            eta = ETAToOrders.get_eta_from_cache(order)
-            if eta:
-                eta_values[order.id] = eta
-            else:
-                orders_without_eta.append(order)
-
-        return orders_without_eta, eta_values
+    def _get_routes(drivers):
+        # All monitored jobs of the drivers, not only requested ones, are on the route
+        jobs = Order.aggregated_objects.filter(
+            driver_id__in=drivers.keys(), status__in=Order.status_groups.MONITORED, concatenated_order__isnull=True,
+        ).select_related('deliver_address', 'merchant').order_by('deliver_before', 'id')
+        routes = defaultdict(list)
+        for job in jobs:
+            if job.deliver_address.location:
+                routes[job.driver_id].append(job)
+        return routes
+
+    def get_driver_etas(self, driver, jobs):
+        route = [self.get_driver_location(driver)] + [(job.id, job.deliver_address.location) for job in jobs]
+        cache_key = self.ETA_KEY.format(driver.id)
+        cached = cache.get(cache_key)
+        if cached is not None and cached['route'] == route:
+            return cached['etas']
 
-    def _get_information_on_the_route_of_orders(self, orders, merchant):
-        # Build a list of driver locations and their goals
-        points = []
-        for order in orders:
-            points.append(order.driver.last_location.improved_location or order.driver.last_location.location)
-            points.append(order.deliver_address.location)
-
-        with self.gc.track_merchant(merchant):
-            res = self.gc.pure_directions_request(
-                origin=points[0],
-                destination=points[-1],
-                waypoints=points[1:-1],
+        try:
+            etas = self.calculate_route_etas(driver, jobs)
+        except (googlemaps.exceptions.ApiError, KeyError):
+            return {}
+        cache.set(cache_key, {'route': route, 'etas': etas}, self.ETA_STORAGE_TIME_IN_CACHE)
+        return etas
+
+    def calculate_route_etas(self, driver, jobs):
+        merchant = jobs[0].merchant
+        with GoogleClient.track_merchant(merchant):
+            first_leg = self.gc.single_dima_element(
+                origin=self.get_driver_location(driver),
+                destination=jobs[0].deliver_address.location,
                 track_merchant=True,
+                language=merchant.language,
+                departure_time='now' if merchant.eta_with_traffic else None,
             )
-        # In addition to data on how much the driver will go to the destination,
-        # there is data on how much you need to go from the goal to the next driver. The second is to filter
-        return zip(orders, res[0]['legs'][::2])
+            if first_leg['status'] != 'OK':
+                return {}
+            legs = self.get_legs_between_jobs(jobs)
+
+        seconds = (first_leg.get('duration_in_traffic') or first_leg['duration'])['value']
+        etas = {jobs[0].id: self.format_eta(seconds, merchant)}
+        for job, leg in zip(jobs[1:], legs):
+            if leg is None:
+                break
+            seconds += merchant.job_service_time * 60 + leg['duration']['value']
+            etas[job.id] = self.format_eta(seconds, merchant)
+        return etas
+
+    def get_legs_between_jobs(self, jobs):
+        locations = [latlng_dict_from_str(job.deliver_address.location) for job in jobs]
+        pairs = [(from_, to_) for from_, to_ in zip(locations[:-1], locations[1:]) if from_ != to_]
+        legs = self.dima_cache.get_elements(pairs)
+        if None in legs:
+            self.dima_cache.ensure_chain_cashed(locations, track_merchant=True)
+            legs = self.dima_cache.get_elements(pairs)
+        legs_by_pair = {self.dima_cache.cache_key(*pair): leg for pair, leg in zip(pairs, legs)}
+        # Jobs at the same place have no leg between them
+        return [
+            legs_by_pair[self.dima_cache.cache_key(from_, to_)] if from_ != to_ else {'duration': {'value': 0}}
+            for from_, to_ in zip(locations[:-1], locations[1:])
+        ]
 
-    def get_eta_many_orders(self, orders, merchant):
+    @staticmethod
+    def format_duration(seconds):
+        # Same as the duration text of Google Maps responses, e.g. "1 hour 12 mins", that ETA was taken from before
+        minutes = max(int(round(seconds / 60.)), 1)
+        days, minutes = divmod(minutes, 24 * 60)
+        hours, minutes = divmod(minutes, 60)
+        if days:
+            units = [(days, ngettext('%d day', '%d days', days)), (hours, ngettext('%d hour', '%d hours', hours))]
+        elif hours:
+            units = [(hours, ngettext('%d hour', '%d hours', hours)), (minutes, ngettext('%d min', '%d mins', minutes))]
+        else:
+            units = [(minutes, ngettext('%d min', '%d mins', minutes))]
+        return ' '.join(text % value for value, text in units if value)
+
+    @classmethod
+    def format_eta(cls, seconds, merchant):
+        with translation.override(merchant.language):
+            text = cls.format_duration(seconds)
+        return {'text': text, 'value': seconds}
+
+    def get_eta_many_orders(self, orders):
         orders = self._filter_orders(list(orders))
-        orders_without_eta, eta_values = self._get_orders_requiring_calculate_eta(orders)
-
-        # Here the list of orders is divided into lists of 12 elements each
-        segments = chunks(orders_without_eta, 12)
-
-        for segment in segments:
-            try:
-                routes = self._get_information_on_the_route_of_orders(segment, merchant)
-                for order, leg in routes:
-                    self.save_eta_in_cache(order, leg['duration'])
-                    eta_values[order.id] = leg['duration']
-            except (googlemaps.exceptions.ApiError, KeyError):
-                pass
-
+        eta_values = defaultdict(lambda: {'text': None, 'value': None})
+        drivers = {order.driver_id: order.driver for order in orders}
+        etas = {}
+        for driver_id, jobs in self._get_routes(drivers).items():
+            etas.update(self.get_driver_etas(drivers[driver_id], jobs))
+        for order in orders:
+            if order.id in etas:
+                eta_values[order.id] = etas[order.id]
         return eta_values
 
-    @staticmethod
-    def calculate_eta(order):
-        driver_last_location = order.driver.last_location.improved_location or order.driver.last_location.location
-        try:
-            with GoogleClient.track_merchant(order.merchant):
-                res = GoogleClient().single_dima_element(
-                    origin=driver_last_location,
-                    destination=order.deliver_address.location,
-                    track_merchant=True,
-                    language=order.merchant.language
-                )
-                ETAToOrders.save_eta_in_cache(order, res['duration'])
-                return res['duration']
-        except (googlemaps.exceptions.ApiError, KeyError):
-            pass
-
-    @staticmethod
-    def get_eta(order):
+    def get_eta(self, order):
         if not (order.driver and order.driver.last_location):
             return None
         if order.status not in order.status_groups.MONITORED:
@@ -126,8 +164,4 @@ class ETAToOrders(object):
         if order.concatenated_order is not None:
             order = order.concatenated_order
 
-        eta = ETAToOrders.get_eta_from_cache(order)
-        if eta is not None:
-            return eta
-
-        return ETAToOrders.calculate_eta(order)
+        return self.get_eta_many_orders([order]).get(order.id)
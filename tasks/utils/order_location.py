@@ -1,20 +1,28 @@
 from __future__ import absolute_import
 
 import re
+from collections import defaultdict
 
+from django.conf import settings
 from django.db.models import Q
 from django.utils.encoding import smart_text
 
-from radaro_utils.geo import AddressGeocoder
+from radaro_utils.geo import AddressGeocoder, normalize_address
 from routing.google import GoogleClient
 
-from ..models import OrderLocation
+from ..models import GeocodedAddress, OrderLocation
 
 
 class StringAddressToOrderLocation(object):
+    def __init__(self):
+        # Order locations found by `prefetch`, keys are (address, secondary address)
+        self.resolved = {}
+
     def to_order_location(self, value: tuple, user):
         address, secondary_address = value
         secondary_address = secondary_address or ''
+        if (address, secondary_address) in self.resolved:
+            return self.resolved[(address, secondary_address)]
         processing_chain = [self.check_value_is_location, self.find_existing_order_location, self.geocode_value]
         for processing_func in processing_chain:
             loc_obj = processing_func(address, secondary_address, user)
@@ -47,5 +55,83 @@ class StringAddressToOrderLocation(object):
             geocoded_data.update({'secondary_address': secondary_address})
             return OrderLocation.objects.get_or_create(**geocoded_data)[0]
 
+    def prefetch(self, values, user, progress_callback=None):
+        """
+        Resolves many (address, secondary address) values in advance, so that `to_order_location` doesn't
+        query them one by one. Known addresses are found with one query per source, the rest are geocoded
+        concurrently. `progress_callback` is called with the counts of geocoded and all addresses to geocode.
+        """
+        pending = set()
+        for address, secondary_address in values:
+            key = (address, secondary_address or '')
+            if address and key not in self.resolved:
+                pending.add(key)
+        for key in list(pending):
+            loc_obj = self.check_value_is_location(*key)
+            if loc_obj is not None:
+                self.resolved[key] = loc_obj
+                pending.discard(key)
+        pending = self.find_existing_order_locations(pending)
+        merchant = getattr(user, 'current_merchant', None)
+        if pending and merchant is not None:
+            self.geocode_values(pending, merchant, progress_callback)
+
+    def find_existing_order_locations(self, keys):
+        if not keys:
+            return keys
+        order_locations = OrderLocation.objects.filter(
+            Q(address__in={address for address, _ in keys}) | Q(raw_address__in={address for address, _ in keys}),
+            secondary_address__in={secondary_address for _, secondary_address in keys},
+        )
+        found = {}
+        for loc_obj in order_locations:
+            for address in (loc_obj.address, loc_obj.raw_address):
+                key = (address, loc_obj.secondary_address)
+                if key in keys and key not in found:
+                    found[key] = loc_obj
+        self.resolved.update(found)
+        return keys - found.keys()
+
+    def geocode_values(self, keys, merchant, progress_callback=None):
+        regions, language = merchant.countries, merchant.language or settings.LANGUAGE_CODE
+        regions_key = GeocodedAddress.regions_key(regions)
+        keys_by_address = defaultdict(list)
+        for key in keys:
+            keys_by_address[normalize_address(key[0])].append(key)
+
+        geocoded = {
+            cached.normalized_address: {'location': cached.location, 'address': cached.address}
+            for cached in GeocodedAddress.objects.filter(
+                normalized_address__in=keys_by_address.keys(), regions=regions_key, language=language,
+            )
+        }
+        # One of the texts of the same address is geocoded
+        to_geocode = {
+            address_keys[0][0]: address for address, address_keys in keys_by_address.items()
+            if address not in geocoded
+        }
+        to_cache = []
+        with GoogleClient.track_merchant(merchant):
+            results = AddressGeocoder().geocode_many(to_geocode.keys(), regions, language)
+            for count, (value, geocoded_data) in enumerate(results, start=1):
+                if geocoded_data:
+                    address = to_geocode[value]
+                    geocoded[address] = {'location': geocoded_data['location'], 'address': geocoded_data['address']}
+                    to_cache.append(GeocodedAddress(
+                        normalized_address=address, regions=regions_key, language=language, **geocoded[address]
+                    ))
+                if progress_callback is not None:
+                    progress_callback(count, len(to_geocode))
+        GeocodedAddress.objects.bulk_create(to_cache, ignore_conflicts=True)
+
+        for address, address_keys in keys_by_address.items():
+            for raw_address, secondary_address in address_keys:
+                loc_obj = None
+                if address in geocoded:
+                    loc_obj = OrderLocation.objects.get_or_create(
+                        raw_address=raw_address, secondary_address=secondary_address, **geocoded[address]
+                    )[0]
+                self.resolved[(raw_address, secondary_address)] = loc_obj
+
     def is_location_string(self, value):
         return re.match(r"^([-\d.]+),\s*([-\d.]+)$", value)
@@ -9,7 +9,13 @@ from base.models import Member
 from merchant.models import Merchant
 from radaro_utils.filters.date_filters import RadaroDateTimeRangeFilter
 from radaro_utils.radaro_admin.admin import Select2FiltersMixin
-from webhooks.models import MerchantAPIKey, MerchantAPIKeyEvents, MerchantAPIMultiKey, MerchantWebhookEvent
+from webhooks.models import (
+    MerchantAPIKey,
+    MerchantAPIKeyEvents,
+    MerchantAPIKeyUsage,
+    MerchantAPIMultiKey,
+    MerchantWebhookEvent,
+)
 
 
 class APIKeyAdmin(Select2FiltersMixin, admin.ModelAdmin):
@@ -111,6 +117,16 @@ class MerchantAPIKeyEventsAdmin(Select2FiltersMixin, admin.ModelAdmin):
     get_merchant.short_description = 'Merchant'
 
 
+class MerchantAPIKeyUsageAdmin(Select2FiltersMixin, admin.ModelAdmin):
+    list_display = ('hour', 'merchant_api_key', 'requests_count', 'errors_count')
+    readonly_fields = ('hour', 'merchant_api_key', 'requests_count', 'errors_count')
+    list_filter = ('merchant_api_key__merchant', ('hour', RadaroDateTimeRangeFilter))
+    list_select_related = ('merchant_api_key', )
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 class MerchantWebhookEventAdmin(Select2FiltersMixin, admin.ModelAdmin):
     list_display = ('happened_at', 'webhook_url', 'response_status', 'topic', 'order_id', 'order_title',
                     'external_id', 'merchant', 'sub_branding')
@@ -136,4 +152,5 @@ class MerchantWebhookEventAdmin(Select2FiltersMixin, admin.ModelAdmin):
 admin.site.register(MerchantAPIKey, APIKeyAdmin)
 admin.site.register(MerchantAPIMultiKey, MerchantAPIMultiKeyAdmin)
 admin.site.register(MerchantAPIKeyEvents, MerchantAPIKeyEventsAdmin)
+admin.site.register(MerchantAPIKeyUsage, MerchantAPIKeyUsageAdmin)
 admin.site.register(MerchantWebhookEvent, MerchantWebhookEventAdmin)
@@ -1,35 +1,27 @@
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 
-import requests
-from requests import RequestException
-from requests.auth import HTTPBasicAuth
-from requests.utils import get_auth_from_url, urldefragauth
+from celery.schedules import crontab
+from celery.task import periodic_task
 
 from delivery.celery import app
+from merchant.models import Merchant, SubBranding
 from merchant_extension.models import ResultChecklist
 from route_optimisation.models import RouteOptimisation
 from tasks.models import ConcatenatedOrder, Order
 from webhooks.serializers import ExternalJobEventsSerializer
 
 from .api.route_optimisation.v1.serializers.optimisation import ExternalRouteOptimisationEventsSerializer
-from .models import MerchantWebhookEvent
+from .delivery import get_delivery_engine, webhook_events_buffer
+from .models import MerchantAPIKeyEvents, MerchantWebhookEvent
 from .serializers.external_checklists import (
     ExternalDailyChecklistEventsSerializer,
     ExternalJobChecklistEventsSerializer,
     ExternalJobChecklistEventsSerializerV2,
 )
 from .serializers.external_concatenated_orders import ExternalConcatenatedOrderEventsSerializer
-
-
-def make_request(url, request_data):
-    post_params = dict(
-        url=url, json=request_data, timeout=settings.EXTERNAL_JOB_EVENT_TIMEOUT
-    )
-    url_auth = get_auth_from_url(url)
-    if url_auth[0] and url_auth[1]:
-        post_params['url'] = urldefragauth(url)
-        post_params['auth'] = HTTPBasicAuth(*url_auth)
-    return requests.post(**post_params)
+from .usage import api_key_usage
 
 
 @app.task()
@@ -148,39 +140,109 @@ def send_external_concatenated_order_event(concatenated_order_id, updated_at, to
 
 def send_external_event(merchant, data, updated_at, topic, order=None, sub_brand=None):
     urls = set(merchant.webhook_url + (sub_brand.webhook_url if sub_brand else []))
+    deliver_external_event(merchant, [url for url in urls if url], data, updated_at, topic, order, sub_brand)
+
+
+@app.task()
+def retry_external_event(merchant_id, urls, data, updated_at, topic, order_id=None, sub_brand_id=None, attempt=1):
+    merchant = Merchant.objects.filter(id=merchant_id).first()
+    if not merchant:
+        return
+    order = Order.all_objects.filter(id=order_id).first() if order_id else None
+    sub_brand = SubBranding.objects.filter(id=sub_brand_id).first() if sub_brand_id else None
+    deliver_external_event(merchant, urls, data, updated_at, topic, order, sub_brand, attempt)
+
+
+WEBHOOK_EVENTS_FLUSH_SCHEDULED_KEY = 'webhook-events-flush-scheduled'
+
+
+def schedule_webhook_events_flush():
+    # Events of the burst of deliveries are saved by one flush
+    delay = settings.WEBHOOK_EVENTS_FLUSH_DELAY
+    if cache.add(WEBHOOK_EVENTS_FLUSH_SCHEDULED_KEY, True, timeout=delay + 60):
+        flush_webhook_events.apply_async(countdown=delay)
+
+
+@app.task()
+def flush_webhook_events():
+    # Events buffered from now on schedule the next flush
+    cache.delete(WEBHOOK_EVENTS_FLUSH_SCHEDULED_KEY)
+    webhook_events_buffer.flush()
+
+
+@periodic_task(run_every=crontab(minute='*/5'))
+def flush_stuck_webhook_events():
+    # Events returned to the buffer by the failed flush
+    webhook_events_buffer.flush()
+
+
+def deliver_external_event(merchant, urls, data, updated_at, topic, order=None, sub_brand=None, attempt=0):
+    engine = get_delivery_engine()
+    circuit_breaker = engine.circuit_breaker
     webhook_failed_times = merchant.webhook_failed_times
+    is_last_attempt = attempt >= settings.WEBHOOK_MAX_RETRIES
+
+    paused_urls = [url for url in urls if circuit_breaker.is_open(url)]
+    urls_to_send = [url for url in urls if url not in paused_urls]
+    webhook_events, failed_urls = [], list(paused_urls)
+
+    def make_webhook_event(url, **kwargs):
+        return MerchantWebhookEvent(
+            merchant_id=merchant.id, sub_branding=sub_brand, request_data=data, happened_at=updated_at,
+            webhook_url=url, topic=topic, order=order, **kwargs
+        )
 
-    for url in urls:
-        if not url:
-            continue
-
-        webhook_event_data = {
-            'merchant_id': merchant.id,
-            'sub_branding': sub_brand,
-            'request_data': data,
-            'happened_at': updated_at,
-            'webhook_url': url,
-            'topic': topic,
-            'order': order
-        }
-
-        try:
-            resp = make_request(url, data)
-            webhook_event_data.update({
-                'elapsed_time': resp.elapsed,
-                'response_status': resp.status_code,
-                'response_text': resp.text,
-            })
-        except RequestException as ex:
-            webhook_event_data.update({
-                'exception_detail': str(ex),
-            })
+    for result in engine.deliver(urls_to_send, data):
+        if result.exception is not None:
+            webhook_events.append(make_webhook_event(result.url, exception_detail=str(result.exception)))
             webhook_failed_times += 1
         else:
+            webhook_events.append(make_webhook_event(
+                result.url, elapsed_time=result.response.elapsed,
+                response_status=result.response.status_code, response_text=result.response.text,
+            ))
             webhook_failed_times = 0
-        finally:
-            MerchantWebhookEvent.objects.create(**webhook_event_data)
+        if result.is_failed:
+            circuit_breaker.record_failure(result.url)
+            failed_urls.append(result.url)
+        else:
+            circuit_breaker.record_success(result.url)
+
+    if is_last_attempt:
+        for url in paused_urls:
+            webhook_events.append(make_webhook_event(
+                url, exception_detail='Delivery is paused after repeated failures of the endpoint.',
+            ))
+    webhook_events_buffer.record(webhook_events)
+    schedule_webhook_events_flush()
+
+    if failed_urls and not is_last_attempt:
+        retry_external_event.apply_async(
+            args=(merchant.id, failed_urls, data, updated_at, topic),
+            kwargs={'order_id': order.id if order else None, 'sub_brand_id': sub_brand.id if sub_brand else None,
+                    'attempt': attempt + 1},
+            countdown=engine.retry_delay(attempt),
+        )
 
     if webhook_failed_times != merchant.webhook_failed_times:
         merchant.webhook_failed_times = webhook_failed_times
         merchant.save(update_fields=['webhook_failed_times'])
+
+
+@periodic_task(run_every=crontab(minute='*/1'))
+def flush_api_key_usage():
+    api_key_usage.flush()
+
+
+@periodic_task(run_every=crontab(minute=30, hour=3))
+def delete_outdated_api_key_events():
+    if settings.MERCHANT_API_KEY_EVENTS_RETENTION_DAYS is None:
+        return
+    outdated_before = timezone.now() - timezone.timedelta(days=settings.MERCHANT_API_KEY_EVENTS_RETENTION_DAYS)
+    # Events of keys creation and changes are kept
+    events = MerchantAPIKeyEvents.objects.filter(event_type=MerchantAPIKeyEvents.USED, happened_at__lt=outdated_before)
+    while True:
+        ids = list(events.values_list('id', flat=True)[:10000])
+        if not ids:
+            break
+        MerchantAPIKeyEvents.objects.filter(id__in=ids).delete()
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import random
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_duration
+
+import requests
+from requests import RequestException
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from requests.utils import get_auth_from_url, urldefragauth
+
+from django_redis import get_redis_connection
+
+
+class DeliveryResult(namedtuple('DeliveryResult', ('url', 'response', 'exception'))):
+    @property
+    def is_failed(self):
+        # Endpoint is considered unavailable, delivery should be retried
+        if self.exception is not None:
+            return True
+        return self.response.status_code >= 500 or self.response.status_code == 429
+
+
+class CircuitBreaker:
+    """
+    Pauses delivery to an endpoint after `failures_threshold` failures in a row.
+    After `open_timeout` seconds one more request is allowed, its failure pauses the endpoint again.
+    State is kept in the cache, so it is shared by all workers.
+    """
+    FAILURES_KEY = 'webhook-circuit-failures-{}'
+    OPEN_KEY = 'webhook-circuit-open-{}'
+    FAILURES_TIMEOUT = 24 * 60 * 60
+
+    def __init__(self, failures_threshold, open_timeout):
+        self.failures_threshold = failures_threshold
+        self.open_timeout = open_timeout
+
+    @staticmethod
+    def endpoint(url):
+        parts = urlsplit(urldefragauth(url))
+        return hashlib.md5('{}://{}{}'.format(parts.scheme, parts.netloc, parts.path).encode()).hexdigest()
+
+    def is_open(self, url):
+        return cache.get(self.OPEN_KEY.format(self.endpoint(url))) is not None
+
+    def record_success(self, url):
+        cache.delete(self.FAILURES_KEY.format(self.endpoint(url)))
+
+    def record_failure(self, url):
+        endpoint = self.endpoint(url)
+        failures_key = self.FAILURES_KEY.format(endpoint)
+        cache.add(failures_key, 0, timeout=self.FAILURES_TIMEOUT)
+        if cache.incr(failures_key) >= self.failures_threshold:
+            cache.set(self.OPEN_KEY.format(endpoint), True, timeout=self.open_timeout)
+
+
+class WebhookDeliveryEngine:
+    """
+    Posts webhooks of a process through one pooled session, so connections to merchant endpoints are reused.
+    Requests to several urls are sent concurrently, a slow endpoint doesn't delay delivery to the others.
+    """
+
+    def __init__(self, max_concurrent_requests, timeout, circuit_breaker):
+        self.max_concurrent_requests = max_concurrent_requests
+        self.timeout = timeout
+        self.circuit_breaker = circuit_breaker
+        self.session = requests.Session()
+        # Pool of connections is kept for each host
+        adapter = HTTPAdapter(pool_connections=max_concurrent_requests, pool_maxsize=max_concurrent_requests)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrent_requests, thread_name_prefix='webhooks',
+                )
+            return self._executor
+
+    def post(self, url, request_data):
+        post_params = dict(url=url, json=request_data, timeout=self.timeout)
+        url_auth = get_auth_from_url(url)
+        if url_auth[0] and url_auth[1]:
+            post_params['url'] = urldefragauth(url)
+            post_params['auth'] = HTTPBasicAuth(*url_auth)
+        return self.session.post(**post_params)
+
+    def _deliver(self, url, request_data):
+        try:
+            return DeliveryResult(url, self.post(url, request_data), None)
+        except RequestException as ex:
+            return DeliveryResult(url, None, ex)
+
+    def deliver(self, urls, request_data):
+        """
+        Posts the data to the urls concurrently and returns results in the order of urls.
+        """
+        futures = [self.executor.submit(self._deliver, url, request_data) for url in urls]
+        return [future.result() for future in futures]
+
+    @staticmethod
+    def retry_delay(attempt):
+        # Exponential backoff with jitter, so retries of many events don't hit the endpoint at once
+        delay = min(settings.WEBHOOK_RETRY_MAX_DELAY, settings.WEBHOOK_RETRY_BASE_DELAY * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+
+def get_delivery_engine() -> WebhookDeliveryEngine:
+    global _engine, _engine_pid
+    with _engine_lock:
+        # Connections and threads can't be shared with forked processes (e.g. celery workers)
+        if _engine is None or _engine_pid != os.getpid():
+            _engine = WebhookDeliveryEngine(
+                max_concurrent_requests=settings.WEBHOOK_MAX_CONCURRENT_REQUESTS,
+                timeout=settings.EXTERNAL_JOB_EVENT_TIMEOUT,
+                circuit_breaker=CircuitBreaker(
+                    failures_threshold=settings.WEBHOOK_CIRCUIT_FAILURES_THRESHOLD,
+                    open_timeout=settings.WEBHOOK_CIRCUIT_OPEN_TIMEOUT,
+                ),
+            )
+            _engine_pid = os.getpid()
+        return _engine
+
+
+def reset_delivery_engine():
+    global _engine
+    with _engine_lock:
+        _engine = None
+
+
+class WebhookEventsBuffer:
+    """
+    Buffers audit rows of webhook deliveries in redis instead of inserting them by every delivery task.
+
+    Rows are appended to `EVENTS_KEY` list and saved by one flush scheduled for the whole burst of deliveries.
+    For the flush the list is renamed to `FLUSHING_KEY`, rows of a failed flush are returned to the buffer.
+    """
+    EVENTS_KEY = 'webhook-events'
+    FLUSHING_KEY = 'webhook-events-flushing'
+    LOCK_KEY = 'webhook-events-flush-lock'
+    LOCK_TIMEOUT = 10 * 60
+    FLUSH_BATCH_SIZE = 500
+
+    def __init__(self, redis=None):
+        self._redis = redis
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_connection('default')
+        return self._redis
+
+    def record(self, webhook_events):
+        """
+        Buffers unsaved `MerchantWebhookEvent` objects.
+        """
+        if not webhook_events:
+            return
+        rows = [
+            json.dumps({
+                field.attname: getattr(webhook_event, field.attname)
+                for field in webhook_event._meta.concrete_fields if not field.primary_key
+            }, cls=DjangoJSONEncoder)
+            for webhook_event in webhook_events
+        ]
+        self.redis.rpush(self.EVENTS_KEY, *rows)
+
+    def flush(self):
+        if not self.redis.set(self.LOCK_KEY, 1, nx=True, ex=self.LOCK_TIMEOUT):
+            return 0
+        try:
+            return self._flush_events()
+        finally:
+            self.redis.delete(self.LOCK_KEY)
+
+    def _flush_events(self):
+        if not self.redis.exists(self.FLUSHING_KEY):
+            if not self.redis.exists(self.EVENTS_KEY):
+                return 0
+            self.redis.rename(self.EVENTS_KEY, self.FLUSHING_KEY)
+        saved = 0
+        try:
+            while True:
+                batch = self.redis.lrange(self.FLUSHING_KEY, 0, self.FLUSH_BATCH_SIZE - 1)
+                if not batch:
+                    break
+                self._save_batch(batch)
+                self.redis.ltrim(self.FLUSHING_KEY, len(batch), -1)
+                saved += len(batch)
+        finally:
+            self._return_events()
+        return saved
+
+    def _return_events(self):
+        pipeline = self.redis.pipeline()
+        events = self.redis.lrange(self.FLUSHING_KEY, 0, -1)
+        if events:
+            pipeline.lpush(self.EVENTS_KEY, *reversed(events))
+        pipeline.delete(self.FLUSHING_KEY)
+        pipeline.execute()
+
+    def _save_batch(self, batch):
+        from merchant.models import Merchant, SubBranding
+        from tasks.models import Order
+        from webhooks.models import MerchantWebhookEvent
+
+        rows = [json.loads(raw_row) for raw_row in batch]
+        # Merchant, job or sub brand could be deleted after the delivery
+        existing_ids = {
+            field: set(manager.filter(id__in={row[field] for row in rows}).values_list('id', flat=True))
+            for field, manager in (('merchant_id', Merchant.objects), ('order_id', Order.all_objects),
+                                   ('sub_branding_id', SubBranding.objects))
+        }
+        webhook_events = []
+        for row in rows:
+            if row['merchant_id'] not in existing_ids['merchant_id']:
+                continue
+            for field in ('order_id', 'sub_branding_id'):
+                if row[field] not in existing_ids[field]:
+                    row[field] = None
+            row['elapsed_time'] = parse_duration(row['elapsed_time']) if row['elapsed_time'] else None
+            webhook_events.append(MerchantWebhookEvent(**row))
+        MerchantWebhookEvent.objects.bulk_create(webhook_events)
+
+
+webhook_events_buffer = WebhookEventsBuffer()
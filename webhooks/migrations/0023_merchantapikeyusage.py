@@ -0,0 +1,34 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0022_merge_20220204_2234'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='merchantapikeyevents',
+            name='happened_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='MerchantAPIKeyUsage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('requests_count', models.PositiveIntegerField(default=0)),
+                ('errors_count', models.PositiveIntegerField(default=0)),
+                ('merchant_api_key', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, related_name='hourly_usage',
+                    to='webhooks.MerchantAPIKey',
+                )),
+            ],
+            options={
+                'unique_together': {('merchant_api_key', 'hour')},
+            },
+        ),
+    ]
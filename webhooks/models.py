@@ -7,6 +7,7 @@ from django.conf import settings
 from django.contrib.postgres.fields import JSONField
 from django.core.files import File
 from django.db import models, transaction
+from django.utils import timezone
 
 from rest_framework import status
 
@@ -16,6 +17,7 @@ from model_utils import FieldTracker
 from base.models import Member
 from tasks.models import Order
 from tasks.models.external import ExternalSource
+from webhooks.usage import api_key_usage
 from webhooks.utils import get_client_ip
 
 MERCHANT_API_KEY_LIMIT = getattr(settings, 'MERCHANT_API_KEY_LIMIT', 0)
@@ -38,7 +40,7 @@ class MerchantAPIKeyEvents(models.Model):
                                          on_delete=models.SET_NULL)
     ip_address = models.CharField(max_length=120)
     user_agent = models.CharField(max_length=250, null=True, blank=True)
-    happened_at = models.DateTimeField(auto_now_add=True)
+    happened_at = models.DateTimeField(default=timezone.now)
     event_type = models.IntegerField(choices=API_KEY_EVENTS, default=CREATED)
     field = models.CharField(max_length=45, null=True, blank=True)
     new_value = models.CharField(max_length=256, null=True, blank=True)
@@ -78,6 +80,31 @@ class MerchantAPIKeyEvents(models.Model):
             info['response_data'] = response.data
         return info
 
+    @staticmethod
+    def record_usage(request, request_log, response, merchant_api_key=None):
+        # Usage events are buffered and saved in bulk by `flush_api_key_usage` task
+        data = {
+            'merchant_api_key_id': merchant_api_key.id if merchant_api_key else None,
+            'ip_address': get_client_ip(request),
+            'user_agent': request.META.get('HTTP_USER_AGENT'),
+            'event_type': MerchantAPIKeyEvents.USED,
+            'initiator_id': getattr(request.user, 'id', None) if merchant_api_key else None,
+        }
+        data.update(request_log or {})
+        if response is not None:
+            data.update(MerchantAPIKeyEvents.get_response_log(response))
+        api_key_usage.record(data)
+
+
+class MerchantAPIKeyUsage(models.Model):
+    merchant_api_key = models.ForeignKey('MerchantAPIKey', related_name='hourly_usage', on_delete=models.CASCADE)
+    hour = models.DateTimeField()
+    requests_count = models.PositiveIntegerField(default=0)
+    errors_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('merchant_api_key', 'hour')
+
 
 class MerchantAPIKey(ExternalSource, models.Model):
     SINGLE = 'single'
@@ -118,25 +145,11 @@ class MerchantAPIKey(ExternalSource, models.Model):
         return data
 
     def used(self, request, request_log, response):
-        MerchantAPIKeyEvents.objects.create(**self.create_event_data(request, request_log=request_log,
-                                                                     response=response))
+        MerchantAPIKeyEvents.record_usage(request, request_log, response, merchant_api_key=self)
 
     @staticmethod
     def anonymous_used(request, request_log, response):
-        data = {
-            'merchant_api_key': None,
-            'ip_address': get_client_ip(request),
-            'user_agent': request.META.get('HTTP_USER_AGENT'),
-            'event_type': MerchantAPIKeyEvents.USED,
-            'field': None,
-            'new_value': None,
-            'initiator': None,
-        }
-        data.update(request_log or {})
-        if response is not None:
-            data.update(MerchantAPIKeyEvents.get_response_log(response))
-
-        MerchantAPIKeyEvents.objects.create(**data)
+        MerchantAPIKeyEvents.record_usage(request, request_log, response)
 
     def save(self, **kwargs):
         if not self.creator:
@@ -0,0 +1,138 @@
+from django.test import override_settings
+from django.utils import timezone
+
+from rest_framework import status
+
+import fakeredis
+from mock import patch
+
+from base.factories import ManagerFactory
+from webhooks.celery_tasks import delete_outdated_api_key_events
+from webhooks.models import MerchantAPIKeyEvents, MerchantAPIKeyUsage
+from webhooks.usage import APIKeyUsageBuffer, api_key_usage
+
+from .base_test_cases import APIKeyTestCase
+
+
+class APIKeyUsageTestCase(APIKeyTestCase):
+    fixtures = ['fixtures/tests/constance.json', ]
+
+    def setUp(self):
+        self.redis_server = fakeredis.FakeServer()
+        patcher = patch.object(api_key_usage, '_redis', fakeredis.FakeStrictRedis(server=self.redis_server))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_jobs(self, job_id=None):
+        url = '/api/webhooks/jobs/{}?key={}'.format('{}/'.format(job_id) if job_id else '', self.apikey.key)
+        return self.client.get(url)
+
+    def restarted_buffer(self):
+        # Buffer of another worker process, it shares only redis
+        return APIKeyUsageBuffer(redis=fakeredis.FakeStrictRedis(server=self.redis_server))
+
+    def test_usage_is_saved_on_flush(self):
+        resp = self.get_jobs()
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertFalse(MerchantAPIKeyEvents.objects.filter(event_type=MerchantAPIKeyEvents.USED).exists())
+
+        self.assertEqual(api_key_usage.flush(), 1)
+        event = MerchantAPIKeyEvents.objects.get(event_type=MerchantAPIKeyEvents.USED)
+        self.assertEqual(event.merchant_api_key, self.apikey)
+        self.assertEqual(event.response_status, status.HTTP_200_OK)
+        self.assertEqual(event.request_path, '/api/webhooks/jobs/')
+        usage = MerchantAPIKeyUsage.objects.get(merchant_api_key=self.apikey)
+        self.assertEqual((usage.requests_count, usage.errors_count), (1, 0))
+        self.assertEqual(api_key_usage.flush(), 0)
+
+    def test_events_are_not_lost_across_worker_restart(self):
+        for _ in range(5):
+            self.get_jobs()
+
+        original_bulk_create = MerchantAPIKeyEvents.objects.bulk_create
+        batches = []
+
+        def crash_on_second_batch(events):
+            batches.append(events)
+            if len(batches) == 2:
+                raise RuntimeError('Worker is killed')
+            return original_bulk_create(events)
+
+        buffer = self.restarted_buffer()
+        buffer.FLUSH_BATCH_SIZE = 2
+        with patch.object(MerchantAPIKeyEvents.objects, 'bulk_create', side_effect=crash_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                buffer.flush()
+        self.assertEqual(MerchantAPIKeyEvents.objects.filter(event_type=MerchantAPIKeyEvents.USED).count(), 2)
+        # Events that aren't saved are returned to the buffer
+        self.assertFalse(buffer.redis.exists(buffer.FLUSHING_KEY))
+
+        self.get_jobs()
+        self.assertEqual(self.restarted_buffer().flush(), 4)
+        self.assertEqual(self.restarted_buffer().flush(), 0)
+        self.assertEqual(MerchantAPIKeyEvents.objects.filter(event_type=MerchantAPIKeyEvents.USED).count(), 6)
+        self.assertEqual(MerchantAPIKeyUsage.objects.get(merchant_api_key=self.apikey).requests_count, 6)
+
+    def test_events_of_killed_worker_are_saved(self):
+        for _ in range(3):
+            self.get_jobs()
+        # Worker is killed after taking the events for the flush
+        buffer = self.restarted_buffer()
+        buffer.redis.rename(buffer.EVENTS_KEY, buffer.FLUSHING_KEY)
+
+        self.get_jobs()
+        self.assertEqual(self.restarted_buffer().flush(), 3)
+        self.assertEqual(self.restarted_buffer().flush(), 1)
+        self.assertEqual(MerchantAPIKeyEvents.objects.filter(event_type=MerchantAPIKeyEvents.USED).count(), 4)
+
+    def test_invalid_events_are_cleaned_or_parked(self):
+        initiator = ManagerFactory(merchant=self.merchant)
+        base_data = {'merchant_api_key_id': self.apikey.id, 'event_type': MerchantAPIKeyEvents.USED,
+                     'response_status': status.HTTP_200_OK}
+        api_key_usage.record(dict(base_data, ip_address='1' * 200, user_agent='a' * 1000, initiator_id=initiator.id))
+        api_key_usage.record(dict(base_data, ip_address=None, response_status=-1))
+        initiator.delete()
+
+        self.assertEqual(api_key_usage.flush(), 2)
+        event = MerchantAPIKeyEvents.objects.get(event_type=MerchantAPIKeyEvents.USED)
+        self.assertEqual((len(event.ip_address), len(event.user_agent)), (120, 250))
+        self.assertIsNone(event.initiator_id)
+        # Event rejected by the database doesn't block the next flushes
+        self.assertEqual(api_key_usage.redis.llen(api_key_usage.FAILED_KEY), 1)
+        self.assertFalse(api_key_usage.redis.exists(api_key_usage.FLUSHING_KEY))
+
+    @override_settings(MERCHANT_API_KEY_USAGE_ROLLUP=False)
+    def test_requests_are_not_counted_without_rollup(self):
+        self.get_jobs()
+        self.assertFalse(api_key_usage.redis.exists(api_key_usage.COUNTERS_KEY))
+        self.assertEqual(api_key_usage.flush(), 1)
+        self.assertFalse(MerchantAPIKeyUsage.objects.exists())
+
+    @override_settings(MERCHANT_API_KEY_USAGE_SAMPLE_RATE=0)
+    def test_sampling_keeps_failed_requests(self):
+        self.get_jobs()
+        resp = self.get_jobs(job_id=999999999)
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+        api_key_usage.flush()
+        event = MerchantAPIKeyEvents.objects.get(event_type=MerchantAPIKeyEvents.USED)
+        self.assertEqual(event.response_status, status.HTTP_404_NOT_FOUND)
+        usage = MerchantAPIKeyUsage.objects.get(merchant_api_key=self.apikey)
+        self.assertEqual((usage.requests_count, usage.errors_count), (2, 1))
+
+    @override_settings(MERCHANT_API_KEY_EVENTS_RETENTION_DAYS=30)
+    def test_outdated_usage_events_are_deleted(self):
+        outdated = timezone.now() - timezone.timedelta(days=31)
+        used_event = MerchantAPIKeyEvents.objects.create(
+            merchant_api_key=self.apikey, event_type=MerchantAPIKeyEvents.USED, happened_at=outdated,
+        )
+        created_event = MerchantAPIKeyEvents.objects.create(
+            merchant_api_key=self.apikey, event_type=MerchantAPIKeyEvents.CREATED, happened_at=outdated,
+        )
+        recent_event = MerchantAPIKeyEvents.objects.create(
+            merchant_api_key=self.apikey, event_type=MerchantAPIKeyEvents.USED,
+        )
+
+        delete_outdated_api_key_events()
+        events = MerchantAPIKeyEvents.objects.filter(id__in=[used_event.id, created_event.id, recent_event.id])
+        self.assertEqual(set(events.values_list('id', flat=True)), {created_event.id, recent_event.id})
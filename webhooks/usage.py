@@ -0,0 +1,231 @@
+import json
+import logging
+import random
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+
+class APIKeyUsageBuffer:
+    """
+    Buffers usage events of merchant API keys in redis instead of inserting a row on every request.
+
+    Events are appended to `EVENTS_KEY` list and saved with `bulk_create` by the periodic flush.
+    For the flush the list is renamed to `FLUSHING_KEY` and trimmed after each saved batch,
+    so events of a killed worker are saved by the next flush. Events and counters failed to be saved
+    are returned to the buffer, events rejected by the database are parked in `FAILED_KEY` list.
+    Requests of every key are also counted per hour in `COUNTERS_KEY` hash, so the counters stay exact
+    when only a sample of successful requests is saved as events.
+    """
+    EVENTS_KEY = 'api-key-usage-events'
+    FLUSHING_KEY = 'api-key-usage-events-flushing'
+    FAILED_KEY = 'api-key-usage-events-failed'
+    FAILED_LIMIT = 10000
+    COUNTERS_KEY = 'api-key-usage-counters'
+    FLUSHING_COUNTERS_KEY = 'api-key-usage-counters-flushing'
+    LOCK_KEY = 'api-key-usage-flush-lock'
+    LOCK_TIMEOUT = 10 * 60
+    FLUSH_BATCH_SIZE = 500
+    # Lengths of the `MerchantAPIKeyEvents` fields, values from the request are cut to fit them
+    FIELDS_MAX_LENGTH = {
+        'ip_address': 120,
+        'user_agent': 250,
+        'request_path': 512,
+        'request_method': 10,
+    }
+
+    def __init__(self, redis=None):
+        self._redis = redis
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_connection('default')
+        return self._redis
+
+    def should_save_event(self, event_data):
+        # Failed requests are always saved, successful ones are sampled
+        response_status = event_data.get('response_status')
+        if response_status is None or response_status >= 400:
+            return True
+        return random.random() < settings.MERCHANT_API_KEY_USAGE_SAMPLE_RATE
+
+    def clean_event_data(self, event_data):
+        event_data = dict(event_data, happened_at=timezone.now())
+        for field, max_length in self.FIELDS_MAX_LENGTH.items():
+            if event_data.get(field) is not None:
+                event_data[field] = str(event_data[field])[:max_length]
+        event_data['ip_address'] = event_data.get('ip_address') or ''
+        return event_data
+
+    def record(self, event_data):
+        event_data = self.clean_event_data(event_data)
+        pipeline = self.redis.pipeline()
+        if settings.MERCHANT_API_KEY_USAGE_ROLLUP and event_data.get('merchant_api_key_id') is not None:
+            response_status = event_data.get('response_status')
+            is_error = response_status is None or response_status >= 400
+            hour = event_data['happened_at'].replace(minute=0, second=0, microsecond=0)
+            pipeline.hincrby(self.COUNTERS_KEY, self._counter_field(event_data['merchant_api_key_id'], hour, is_error))
+        if self.should_save_event(event_data):
+            pipeline.rpush(self.EVENTS_KEY, json.dumps(event_data, cls=DjangoJSONEncoder))
+        pipeline.execute()
+
+    def flush(self):
+        if not self.redis.set(self.LOCK_KEY, 1, nx=True, ex=self.LOCK_TIMEOUT):
+            return 0
+        try:
+            if settings.MERCHANT_API_KEY_USAGE_ROLLUP:
+                self._flush_counters()
+            return self._flush_events()
+        finally:
+            self.redis.delete(self.LOCK_KEY)
+
+    def _take_for_flush(self, key, flushing_key):
+        # Existing flushing key is left by a crashed flush, it is saved first
+        if self.redis.exists(flushing_key):
+            return True
+        if not self.redis.exists(key):
+            return False
+        self.redis.rename(key, flushing_key)
+        return True
+
+    def _return_events(self):
+        # Events left by the failed flush are returned to the head of the buffer in the original order
+        pipeline = self.redis.pipeline()
+        events = self.redis.lrange(self.FLUSHING_KEY, 0, -1)
+        if events:
+            pipeline.lpush(self.EVENTS_KEY, *reversed(events))
+        pipeline.delete(self.FLUSHING_KEY)
+        pipeline.execute()
+
+    def _park_events(self, raw_events):
+        logger.error('%s API key usage events are rejected by the database, they are parked in "%s"',
+                     len(raw_events), self.FAILED_KEY)
+        pipeline = self.redis.pipeline()
+        pipeline.rpush(self.FAILED_KEY, *raw_events)
+        pipeline.ltrim(self.FAILED_KEY, -self.FAILED_LIMIT, -1)
+        pipeline.execute()
+
+    def _build_events(self, batch):
+        from base.models import Member
+        from webhooks.models import MerchantAPIKey, MerchantAPIKeyEvents
+
+        events_data = [json.loads(raw_event) for raw_event in batch]
+        # Key and initiator could be deleted after the request
+        existing_key_ids = set(MerchantAPIKey.objects.filter(
+            id__in={event_data.get('merchant_api_key_id') for event_data in events_data}
+        ).values_list('id', flat=True))
+        existing_initiator_ids = set(Member.all_objects.filter(
+            id__in={event_data.get('initiator_id') for event_data in events_data}
+        ).values_list('id', flat=True))
+        events = []
+        for event_data in events_data:
+            event_data['happened_at'] = parse_datetime(event_data['happened_at'])
+            if event_data.get('merchant_api_key_id') not in existing_key_ids:
+                event_data['merchant_api_key_id'] = None
+            if event_data.get('initiator_id') not in existing_initiator_ids:
+                event_data['initiator_id'] = None
+            events.append(MerchantAPIKeyEvents(**event_data))
+        return events
+
+    def _save_batch(self, batch):
+        from webhooks.models import MerchantAPIKeyEvents
+
+        events = self._build_events(batch)
+        try:
+            with transaction.atomic():
+                MerchantAPIKeyEvents.objects.bulk_create(events)
+            return
+        except DatabaseError:
+            pass
+        # Events of the batch are saved one by one, so only the rejected ones are parked
+        rejected = []
+        for raw_event, event in zip(batch, events):
+            try:
+                with transaction.atomic():
+                    event.save()
+            except DatabaseError:
+                rejected.append(raw_event)
+        if rejected:
+            self._park_events(rejected)
+
+    def _flush_events(self):
+        if not self._take_for_flush(self.EVENTS_KEY, self.FLUSHING_KEY):
+            return 0
+        saved = 0
+        try:
+            while True:
+                batch = self.redis.lrange(self.FLUSHING_KEY, 0, self.FLUSH_BATCH_SIZE - 1)
+                if not batch:
+                    break
+                self._save_batch(batch)
+                self.redis.ltrim(self.FLUSHING_KEY, len(batch), -1)
+                saved += len(batch)
+        finally:
+            self._return_events()
+        return saved
+
+    def _flush_counters(self):
+        if not self._take_for_flush(self.COUNTERS_KEY, self.FLUSHING_COUNTERS_KEY):
+            return
+        try:
+            self._save_counters()
+        except Exception:
+            self._return_counters()
+            raise
+        self.redis.delete(self.FLUSHING_COUNTERS_KEY)
+
+    def _return_counters(self):
+        pipeline = self.redis.pipeline()
+        for field, count in self.redis.hgetall(self.FLUSHING_COUNTERS_KEY).items():
+            pipeline.hincrby(self.COUNTERS_KEY, field, int(count))
+        pipeline.delete(self.FLUSHING_COUNTERS_KEY)
+        pipeline.execute()
+
+    def _save_counters(self):
+        from webhooks.models import MerchantAPIKey, MerchantAPIKeyUsage
+
+        counters = defaultdict(lambda: {'requests_count': 0, 'errors_count': 0})
+        for field, count in self.redis.hgetall(self.FLUSHING_COUNTERS_KEY).items():
+            key_id, hour, is_error = self._parse_counter_field(field)
+            counters[(key_id, hour)]['requests_count'] += int(count)
+            if is_error:
+                counters[(key_id, hour)]['errors_count'] += int(count)
+
+        existing_key_ids = set(MerchantAPIKey.objects.filter(
+            id__in={key_id for key_id, _ in counters}
+        ).values_list('id', flat=True))
+        with transaction.atomic():
+            new_usages = []
+            for (key_id, hour), counts in counters.items():
+                if key_id not in existing_key_ids:
+                    continue
+                updated = MerchantAPIKeyUsage.objects.filter(merchant_api_key_id=key_id, hour=hour).update(
+                    requests_count=F('requests_count') + counts['requests_count'],
+                    errors_count=F('errors_count') + counts['errors_count'],
+                )
+                if not updated:
+                    new_usages.append(MerchantAPIKeyUsage(merchant_api_key_id=key_id, hour=hour, **counts))
+            MerchantAPIKeyUsage.objects.bulk_create(new_usages)
+
+    @staticmethod
+    def _counter_field(key_id, hour, is_error):
+        return '{}:{}:{}'.format(key_id, int(hour.timestamp()), int(is_error))
+
+    @staticmethod
+    def _parse_counter_field(field):
+        key_id, hour, is_error = field.decode().split(':')
+        return int(key_id), datetime.fromtimestamp(int(hour), tz=timezone.utc), is_error == '1'
+
+
+api_key_usage = APIKeyUsageBuffer()